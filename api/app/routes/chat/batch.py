@@ -0,0 +1,231 @@
+from fastapi import APIRouter, HTTPException, status, Request, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from app.services.detector_batcher import MicroBatcher
+from app.services.database.actions.prompts.storePrompts import store_prompt_analyses
+from app.routes.dependencies import get_batcher
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Prompts read, analyzed, streamed back and stored together
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "512"))
+
+# A JSON array body is parsed in one go, so it is capped; larger uploads should use NDJSON
+BATCH_MAX_JSON_PROMPTS = int(os.getenv("BATCH_MAX_JSON_PROMPTS", "10000"))
+
+# Longest accepted NDJSON line; longer lines are reported as errors and skipped
+BATCH_MAX_LINE_BYTES = int(os.getenv("BATCH_MAX_LINE_BYTES", str(1024 * 1024)))
+
+# NDJSON bodies larger than this are spooled to disk instead of memory
+BATCH_SPOOL_MEMORY_BYTES = int(os.getenv("BATCH_SPOOL_MEMORY_BYTES", str(8 * 1024 * 1024)))
+
+# Bytes read from the spooled body at a time
+READ_BLOCK_BYTES = 1024 * 1024
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Keep references to chunk writes so one outliving a disconnected client isn't garbage collected mid-flight
+_background_tasks: set = set()
+
+# (prompt text, error) for one input item; exactly one of the two is set
+PromptItem = Tuple[Optional[str], Optional[str]]
+
+
+@router.post("/chat/prompt/batch", response_description="Analyze many prompts for potential attacks", tags=["chat"])
+async def analyze_prompt_batch(
+    request: Request,
+    store: bool = Query(True, description="Store the prompts and their analysis in the database"),
+    batcher: MicroBatcher = Depends(get_batcher)
+) -> StreamingResponse:
+    """
+    Analyze many prompts in one request. Prompts are classified only; no LLM response is generated.
+    The body is either a JSON array (or {"prompts": [...]}) of strings or {"text": ...} objects,
+    or, with Content-Type application/x-ndjson, one such string or object per line.
+    NDJSON bodies are spooled to a temporary file and read back incrementally, so uploads
+    of any size use constant memory.
+    Verdicts are streamed back as NDJSON, one line per input prompt in input order:
+    {"index": 0, "isAttack": ..., "attackType": ..., "confidence": ..., "matches": [...]}
+    or {"index": 0, "error": "..."} for an item that could not be read.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_MEDIA_TYPES:
+        items = _read_ndjson(await _spool_body(request))
+    else:
+        items = _iterate(await _read_json_array(request))
+
+    return StreamingResponse(
+        _stream_verdicts(items, batcher, store),
+        media_type="application/x-ndjson"
+    )
+
+
+async def _read_json_array(request: Request) -> List[PromptItem]:
+    """Parse a JSON array body, rejecting bodies too large to hold in memory"""
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body must be a JSON array of prompts or NDJSON"
+        )
+
+    if isinstance(payload, dict) and "prompts" in payload:
+        payload = payload["prompts"]
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request must be a JSON array of prompts or an object with a 'prompts' field"
+        )
+    if len(payload) > BATCH_MAX_JSON_PROMPTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"JSON bodies are limited to {BATCH_MAX_JSON_PROMPTS} prompts, use NDJSON for larger uploads"
+        )
+    return [_parse_item(item) for item in payload]
+
+
+async def _iterate(items: List[PromptItem]) -> AsyncIterator[PromptItem]:
+    for item in items:
+        yield item
+
+
+async def _spool_body(request: Request) -> tempfile.SpooledTemporaryFile:
+    """
+    Copy the request body to a temporary file before responding.
+    The body can't be read while the streaming response is open, since the
+    server may consume request messages while it listens for a disconnect.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_MEMORY_BYTES)
+    try:
+        async for data in request.stream():
+            spool.write(data)
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+async def _read_ndjson(spool: tempfile.SpooledTemporaryFile) -> AsyncIterator[PromptItem]:
+    """Yield one item per NDJSON line of the spooled body, reading it block by block"""
+    try:
+        buffer = b""
+        skipping = False
+        while True:
+            data = await asyncio.to_thread(spool.read, READ_BLOCK_BYTES)
+            if not data:
+                break
+            *lines, buffer = (buffer + data).split(b"\n")
+            for line in lines:
+                if skipping:
+                    # End of an oversized line that was already reported
+                    skipping = False
+                    continue
+                if len(line) > BATCH_MAX_LINE_BYTES:
+                    yield None, f"Line exceeds {BATCH_MAX_LINE_BYTES} bytes"
+                elif line.strip():
+                    yield _parse_line(line)
+
+            if len(buffer) > BATCH_MAX_LINE_BYTES:
+                if not skipping:
+                    yield None, f"Line exceeds {BATCH_MAX_LINE_BYTES} bytes"
+                    skipping = True
+                buffer = b""
+
+        if buffer.strip() and not skipping:
+            yield _parse_line(buffer)
+    finally:
+        spool.close()
+
+
+def _parse_line(line: bytes) -> PromptItem:
+    try:
+        return _parse_item(json.loads(line))
+    except ValueError:
+        return None, "Line is not valid JSON"
+
+
+def _parse_item(item: Any) -> PromptItem:
+    """Accept a bare string or an object with a "text" field"""
+    if isinstance(item, str):
+        return item, None
+    if isinstance(item, dict) and isinstance(item.get("text"), str):
+        return item["text"], None
+    return None, "Item must be a string or an object with a 'text' field"
+
+
+async def _chunks(items: AsyncIterator[PromptItem]) -> AsyncIterator[List[PromptItem]]:
+    chunk: List[PromptItem] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _stream_verdicts(
+    items: AsyncIterator[PromptItem],
+    batcher: MicroBatcher,
+    store: bool
+) -> AsyncIterator[bytes]:
+    """
+    Analyze the input chunk by chunk and yield NDJSON verdict lines.
+    Each chunk is stored with one bulk write that runs while the next chunk is
+    analyzed; at most one write is in flight, so memory stays bounded by the chunk size.
+    """
+    index = 0
+    write_task: Optional[asyncio.Task] = None
+    analyzed = 0
+    try:
+        async for chunk in _chunks(items):
+            texts = [text for text, error in chunk if error is None]
+            try:
+                results = iter(await batcher.analyze_many(texts))
+                chunk_error = None
+            except Exception as e:
+                logger.error(f"Failed to analyze batch chunk: {str(e)}")
+                results = iter(())
+                chunk_error = f"Failed to analyze prompt: {str(e)}"
+
+            lines = []
+            analyses = []
+            for text, error in chunk:
+                if error is None and chunk_error is None:
+                    result = next(results)
+                    lines.append({"index": index, **result})
+                    analyses.append({"prompt": text, **result})
+                else:
+                    lines.append({"index": index, "error": error or chunk_error})
+                index += 1
+            analyzed += len(analyses)
+
+            if store and analyses:
+                if write_task is not None:
+                    await write_task
+                write_task = asyncio.create_task(_store_chunk(analyses))
+                _background_tasks.add(write_task)
+                write_task.add_done_callback(_background_tasks.discard)
+
+            yield "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+
+        if write_task is not None:
+            await write_task
+    finally:
+        # If the client went away the last chunk's write keeps running from _background_tasks
+        logger.info(f"Batch analysis finished: {analyzed} of {index} prompts analyzed")
+
+
+async def _store_chunk(analyses: List[Dict[str, Any]]) -> None:
+    try:
+        await store_prompt_analyses(analyses)
+    except Exception as db_error:
+        logger.error(f"Failed to store batch chunk: {str(db_error)}")
+        # Verdicts were already returned; a failed write only loses the history
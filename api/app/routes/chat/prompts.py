@@ -1,21 +1,50 @@
-from fastapi import APIRouter, HTTPException, status, Body
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, status, Body, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator
+import asyncio
+import json
 import logging
-from app.services.PromptDetectorService import PromptDetectorService
-from app.services.llm_service import LLMService
+import os
+import time
+from app.services.detector_batcher import MicroBatcher
+from app.services.llm_service import get_llm_service
+from app.services.speculative_chat import SpeculativeCall, ChatMetrics, get_chat_metrics
 from app.services.database.actions.prompts.storePrompt import store_prompt_analysis
+from app.services.exceptions import DetectorNotReadyError, DetectorOverloadedError
+from app.routes.dependencies import get_batcher
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Speculative mode: start the LLM call while the prompt is classified and store in the background
+CHAT_SPECULATIVE = os.getenv("CHAT_SPECULATIVE", "false").lower() == "true"
+
+# Keep references to background writes so they aren't garbage collected mid-flight
+_background_tasks: set = set()
+
 @router.post("/chat/prompt", response_description="Analyze prompt for potential attacks", tags=["chat"])
-async def analyze_prompt(payload: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+async def analyze_prompt(
+    request: Request,
+    payload: Dict[str, Any] = Body(...),
+    stream: bool = Query(False, description="Stream the LLM response as server-sent events"),
+    batcher: MicroBatcher = Depends(get_batcher)
+):
     """
     Analyze a text prompt for potential attacks.
     Request body should contain a JSON object with a "text" field containing the prompt to analyze.
     Returns analysis results including whether the prompt is detected as an attack,
     the attack type if applicable, and a confidence score.
+    If the prompt is clean and the client sends "Accept: text/event-stream" (or ?stream=true),
+    the LLM response is streamed as server-sent events (see _sse_events); attacks are
+    always answered with the JSON rejection.
+    With CHAT_SPECULATIVE=true the LLM call starts at the same time as classification and is
+    cancelled if the prompt is an attack, and the prompt is stored after responding.
     """
+    received = time.perf_counter()
+    metrics = get_chat_metrics()
+    streaming = stream or "text/event-stream" in request.headers.get("accept", "")
+    speculation = None
+    handed_off = False
     try:
         # Extract the text from the request body
         if "text" not in payload:
@@ -26,26 +55,54 @@ async def analyze_prompt(payload: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
             
         prompt_text = payload["text"]
         
-        # Analyze the prompt using the PromptDetectorService
-        detector = PromptDetectorService()
-        analysis_result = detector.analyze_prompt(prompt_text)
-
+        if CHAT_SPECULATIVE:
+            try:
+                speculation = SpeculativeCall(get_llm_service(), prompt_text, stream=streaming)
+            except ValueError as e:
+                # No LLM configured; attacks are still rejected below
+                logger.warning(f"Speculative LLM call not started: {str(e)}")
+        mode = "speculative" if speculation is not None else "sequential"
+        
+        # Analyze the prompt; concurrent requests share one batched forward pass
         try:
-            await store_prompt_analysis(
-                prompt=prompt_text,
-                is_attack=analysis_result["isAttack"],
-                attack_type=analysis_result["attackType"],
-                confidence=analysis_result["confidence"],
-                matches=analysis_result["matches"]
+            analysis_result = await batcher.analyze(prompt_text)
+        except DetectorOverloadedError as overloaded:
+            logger.warning(f"Shedding prompt: {str(overloaded)}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Prompt detector is busy, please retry",
+                headers={"Retry-After": str(overloaded.retry_after)}
             )
-        except Exception as db_error:
-            logger.error(f"Failed to store prompt: {str(db_error)}")
-            # Continue processing even if storage fails
+        except DetectorNotReadyError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Prompt detector is not ready",
+                headers={"Retry-After": "5"}
+            )
+
+        verdict_at = time.perf_counter()
+        detect_ms = (verdict_at - received) * 1000
+        if speculation is not None:
+            metrics.record_speculation(speculation, verdict_at, attack=analysis_result["isAttack"])
+            if analysis_result["isAttack"]:
+                # An attack never reaches the LLM's answer; stop the call if it's still running
+                speculation.cancel()
+            # Off the critical path: the response doesn't wait for the write
+            task = asyncio.create_task(_store_in_background(prompt_text, analysis_result, metrics))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        else:
+            try:
+                await _store(prompt_text, analysis_result)
+            except Exception as db_error:
+                logger.error(f"Failed to store prompt: {str(db_error)}")
+                # Continue processing even if storage fails
         
         logger.info(f"Prompt analyzed: {'ATTACK' if analysis_result['isAttack'] else 'CLEAN'}")
 
         # If it's an attack
         if analysis_result["isAttack"]:
+            metrics.record_chat(mode, detect_ms, attack=True)
             return {
                 "status": "rejected",
                 "reason": "Potential attack detected",
@@ -53,8 +110,24 @@ async def analyze_prompt(payload: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
             }
         
         # If it's safe
-        llm_service = LLMService()
-        llm_response = await llm_service.generate_response(prompt_text)
+        if speculation is not None:
+            events = speculation.events() if streaming else None
+        else:
+            llm_service = get_llm_service()
+            events = llm_service.stream_response(prompt_text) if streaming else None
+        if streaming:
+            handed_off = True
+            return StreamingResponse(
+                _sse_events(events, received, mode, detect_ms, metrics),
+                media_type="text/event-stream",
+                # Keep proxies from buffering the stream
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        if speculation is not None:
+            llm_response = await speculation.result()
+        else:
+            llm_response = await llm_service.generate_response(prompt_text)
+        metrics.record_chat(mode, detect_ms, latency_ms=(time.perf_counter() - received) * 1000)
         
         return llm_response
         
@@ -66,4 +139,54 @@ async def analyze_prompt(payload: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to analyze prompt: {str(e)}"
-        )
\ No newline at end of file
+        )
+    finally:
+        # Stop a speculative call the response didn't take over (no-op once it has finished)
+        if speculation is not None and not handed_off:
+            speculation.cancel()
+
+
+async def _store(prompt_text: str, analysis_result: Dict[str, Any]) -> None:
+    await store_prompt_analysis(
+        prompt=prompt_text,
+        is_attack=analysis_result["isAttack"],
+        attack_type=analysis_result["attackType"],
+        confidence=analysis_result["confidence"],
+        matches=analysis_result["matches"]
+    )
+
+
+async def _store_in_background(prompt_text: str, analysis_result: Dict[str, Any], metrics: ChatMetrics) -> None:
+    started = time.perf_counter()
+    failed = False
+    try:
+        await _store(prompt_text, analysis_result)
+    except Exception as db_error:
+        failed = True
+        logger.error(f"Failed to store prompt: {str(db_error)}")
+    metrics.record_background_store((time.perf_counter() - started) * 1000, failed=failed)
+
+
+async def _sse_events(
+    events: AsyncIterator[Dict[str, Any]],
+    received: float,
+    mode: str,
+    detect_ms: float,
+    metrics: ChatMetrics
+) -> AsyncIterator[str]:
+    """
+    Relay LLMService.stream_response events as server-sent events:
+    event: token  data: {"text": "..."}
+    event: done   data: {"generated_text": "...", "ttftMs": ..., "totalMs": ...}
+    event: error  data: {"error": "..."}
+    Logs and records the time from receiving the request to sending the first token.
+    """
+    first_token = True
+    async for event in events:
+        event_type = event.pop("type")
+        if event_type == "token" and first_token:
+            first_token = False
+            ttft_ms = (time.perf_counter() - received) * 1000
+            logger.info(f"Chat time to first token: {ttft_ms:.0f} ms ({mode})")
+            metrics.record_chat(mode, detect_ms, latency_ms=ttft_ms)
+        yield f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Dict, Any, Optional
+from app.services.database.actions.prompts.exportPrompts import open_prompt_export
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
+from app.services.export_stream import (
+    encode_documents, compress_stream, available_compressions, FORMATS, MEDIA_TYPES
+)
+from app.routes.dependencies import database_unavailable
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/prompts/export", response_description="Export all prompts", tags=["prompts"])
+async def export_all_prompts(
+    format: str = Query("ndjson", description="ndjson or json (a single array)"),
+    compress: str = Query("none", description="none, gzip or zstd (sets Content-Encoding)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to export"),
+    since: Optional[datetime] = Query(None, description="Only prompts created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only prompts created before this time")
+) -> StreamingResponse:
+    """
+    Stream every prompt in the database (see _export).
+    """
+    return await _export({}, "prompts", format, compress, fields, since, until)
+
+
+@router.get("/prompts/attacks/export", response_description="Export all attacks", tags=["prompts"])
+async def export_attack_prompts(
+    format: str = Query("ndjson", description="ndjson or json (a single array)"),
+    compress: str = Query("none", description="none, gzip or zstd (sets Content-Encoding)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to export"),
+    since: Optional[datetime] = Query(None, description="Only prompts created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only prompts created before this time")
+) -> StreamingResponse:
+    """
+    Stream every prompt that is an attack (see _export).
+    """
+    return await _export({"isAttack": True}, "attacks", format, compress, fields, since, until)
+
+
+@router.get("/prompts/clean/export", response_description="Export all clean prompts", tags=["prompts"])
+async def export_clean_prompts(
+    format: str = Query("ndjson", description="ndjson or json (a single array)"),
+    compress: str = Query("none", description="none, gzip or zstd (sets Content-Encoding)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to export"),
+    since: Optional[datetime] = Query(None, description="Only prompts created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only prompts created before this time")
+) -> StreamingResponse:
+    """
+    Stream every prompt that is not an attack (see _export).
+    """
+    return await _export({"isAttack": False}, "clean", format, compress, fields, since, until)
+
+
+@router.get("/prompts/attacks/{attack_type}/export", response_description="Export attacks by type", tags=["prompts"])
+async def export_attacks_by_type(
+    attack_type: str,
+    format: str = Query("ndjson", description="ndjson or json (a single array)"),
+    compress: str = Query("none", description="none, gzip or zstd (sets Content-Encoding)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to export"),
+    since: Optional[datetime] = Query(None, description="Only prompts created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only prompts created before this time")
+) -> StreamingResponse:
+    """
+    Stream every attack prompt of one type (see _export).
+    """
+    return await _export(
+        {"isAttack": True, "attackType": attack_type}, f"attacks-{attack_type}",
+        format, compress, fields, since, until
+    )
+
+
+async def _export(
+    base_filter: Dict[str, Any],
+    name: str,
+    format: str,
+    compress: str,
+    fields: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> StreamingResponse:
+    """
+    Stream prompts straight from the database cursor as NDJSON or a JSON array.
+    Documents are serialized and (optionally) compressed as they arrive, so the
+    first bytes go out immediately and memory stays flat however many prompts
+    are exported. With compress=gzip or zstd the body is sent with a matching
+    Content-Encoding, which curl --compressed and browsers decode transparently.
+    Raises:
+        HTTPException: 400 for an unknown format, compression or field, 500 if the database can't be read
+    """
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(FORMATS)}"
+        )
+    if compress not in available_compressions():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"compress must be one of: {', '.join(available_compressions())}"
+        )
+
+    try:
+        documents = await open_prompt_export(base_filter, fields, since, until)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except DatabaseUnavailableError as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error exporting prompts: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to export prompts"
+        )
+
+    extension = "ndjson" if format == "ndjson" else "json"
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+    if compress != "none":
+        headers["Content-Encoding"] = compress
+    return StreamingResponse(
+        compress_stream(encode_documents(documents, format), compress),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
@@ -1,19 +1,30 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from typing import List, Dict, Any
 from app.services.database.actions.prompts.getAllCleanPrompts import get_all_clean_prompts
+from app.routes.dependencies import PageParams, set_next_cursor, not_modified, database_unavailable
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.get("/prompts/clean", response_description="List all prompts", tags=["prompts"])
-async def list_all_clean_prompts() -> List[Dict[str, Any]]:
+async def list_all_clean_prompts(request: Request, response: Response, page: PageParams = Depends()) -> List[Dict[str, Any]]:
    """
-   Fetch all prompts that are not attacks from the database.
-   Returns a list of prompts as JSON.
+   Fetch one page of prompts that are not attacks from the database, newest first.
+   Returns a list of prompts as JSON; the X-Next-Cursor header holds the cursor for the next page.
    """
+   unchanged = not_modified(request, response)
+   if unchanged is not None:
+      return unchanged
    try:
-      return await get_all_clean_prompts()
+      prompts, next_cursor = await get_all_clean_prompts(**page.as_kwargs())
+      set_next_cursor(response, next_cursor)
+      return prompts
+   except InvalidQueryError as e:
+      raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+   except DatabaseUnavailableError as e:
+      raise database_unavailable(e)
    except Exception as e:
         logger.error(f"Error retrieving prompts: {str(e)}")
         raise HTTPException(
@@ -1,23 +1,35 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from typing import List, Dict, Any
 from app.services.database.actions.prompts.getAllPrompts import get_all_prompts
+from app.routes.dependencies import PageParams, set_next_cursor, not_modified, database_unavailable
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.get("/prompts", response_description="List all prompts", tags=["prompts"])
-async def list_all_prompts() -> List[Dict[str, Any]]:
+async def list_all_prompts(request: Request, response: Response, page: PageParams = Depends()) -> List[Dict[str, Any]]:
     """
-    Retrieves all prompts from the database.
+    Retrieves one page of prompts from the database, newest first.
     Returns:
         List[Dict[str, Any]]: A list of prompts as dictionaries.
-        FastAPI converts this to json
+        FastAPI converts this to json. The X-Next-Cursor header holds the
+        cursor for the next page and is missing on the last page.
     Raises:
-        HTTPException: If database operation fails
+        HTTPException: 400 for an invalid cursor or field, 500 if database operation fails
     """
+    unchanged = not_modified(request, response)
+    if unchanged is not None:
+        return unchanged
     try:
-      return await get_all_prompts()
+      prompts, next_cursor = await get_all_prompts(**page.as_kwargs())
+      set_next_cursor(response, next_cursor)
+      return prompts
+    except InvalidQueryError as e:
+      raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except DatabaseUnavailableError as e:
+      raise database_unavailable(e)
     except Exception as e:
         logger.error(f"Error retrieving prompts: {str(e)}")
         raise HTTPException(
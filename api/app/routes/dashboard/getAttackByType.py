@@ -1,26 +1,41 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from typing import List, Dict, Any
 from app.services.database.actions.prompts.getAttackByType import get_attack_by_type
+from app.routes.dependencies import PageParams, set_next_cursor, not_modified, database_unavailable
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.get("/prompts/attacks/{attack_type}", response_description="Get attacks by type", tags=["prompts"])
-async def list_attacks_by_type(attack_type: str) -> List[Dict[str, Any]]:
+async def list_attacks_by_type(
+    attack_type: str,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends()
+) -> List[Dict[str, Any]]:
     """
-    Fetch all attack prompts of a specific type from the database.
+    Fetch one page of attack prompts of a specific type from the database, newest first.
     Parameters:
     - attack_type: The type of attack to filter b
+    - limit, after, fields, since, until: see PageParams
     Returns:
-    - List of attack prompts of the specified type as JSON
+    - List of attack prompts of the specified type as JSON; the X-Next-Cursor
+      header holds the cursor for the next page
     Raises:
+    - 400: If the cursor or fields are invalid
     - 404: If no attacks of the specified type are found
     - 500: If there's a server error
+    - 503: If the database is unavailable
     """
+    unchanged = not_modified(request, response)
+    if unchanged is not None:
+        return unchanged
     try:
-        attacks = await get_attack_by_type(attack_type)
-        if not attacks:
+        attacks, next_cursor = await get_attack_by_type(attack_type, **page.as_kwargs())
+        set_next_cursor(response, next_cursor)
+        if not attacks and page.after is None:
             logger.info(f"No attacks found for type: {attack_type}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -30,6 +45,10 @@ async def list_attacks_by_type(attack_type: str) -> List[Dict[str, Any]]:
     except HTTPException:
         # Re-raise HTTP exceptions to preserve status code
         raise
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except DatabaseUnavailableError as e:
+        raise database_unavailable(e)
     except Exception as e:
         logger.error(f"Error retrieving attacks by type '{attack_type}': {str(e)}")
         raise HTTPException(
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, status, Query, Request, Response
+from datetime import datetime
+from typing import Dict, Any, Optional
+from app.services.database.actions.prompts.getPromptStats import get_prompt_stats
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
+from app.routes.dependencies import not_modified, database_unavailable
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/prompts/stats", response_description="Prompt and attack statistics", tags=["prompts"])
+async def prompt_stats(
+    request: Request,
+    response: Response,
+    since: Optional[datetime] = Query(None, description="Only prompts created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only prompts created before this time"),
+    bucket: str = Query("day", description="Time series bucket: minute, hour, day, week or month")
+) -> Dict[str, Any]:
+    """
+    Dashboard statistics computed by the database: totals, attack rate, counts
+    per attack type, confidence histograms and a time series over the window.
+    Returns a few hundred bytes instead of every prompt.
+    Raises:
+    - 400: If the bucket or window is invalid
+    - 500: If there's a server error
+    - 503: If the database is unavailable
+    """
+    unchanged = not_modified(request, response)
+    if unchanged is not None:
+        return unchanged
+    try:
+        return await get_prompt_stats(since, until, bucket)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except DatabaseUnavailableError as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error computing prompt stats: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to compute prompt stats"
+        )
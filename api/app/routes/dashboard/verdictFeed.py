@@ -0,0 +1,74 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
+from typing import Optional
+import asyncio
+import logging
+
+from app.services.verdict_feed import FeedSubscriber, DROP_POLICIES, get_verdict_feed
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def _send_loop(websocket: WebSocket, subscriber: FeedSubscriber) -> None:
+    """Send the client's queued messages until it disconnects or is dropped"""
+    while True:
+        message = await subscriber.get()
+        if message is None:
+            # Disconnected by the "disconnect" drop policy
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Client too slow")
+            return
+        await websocket.send_text(message)
+
+
+async def _receive_loop(websocket: WebSocket) -> None:
+    """Wait for the client to go away; messages from the client are ignored"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        return
+
+
+@router.websocket("/ws/verdicts")
+async def verdict_feed(
+    websocket: WebSocket,
+    attackType: Optional[str] = Query(None, description="Comma separated attack types, e.g. jailbreak,prompt-injection"),
+    attacksOnly: bool = Query(False, description="Leave out clean prompts"),
+    minConfidence: float = Query(0.0, ge=0.0, le=1.0, description="Only verdicts with at least this confidence"),
+    queueSize: Optional[int] = Query(None, ge=1, description="Messages buffered for this client"),
+    drop: Optional[str] = Query(None, description="When the buffer is full: oldest, newest or disconnect")
+):
+    """
+    Push every new analysis result to the dashboard as soon as it is stored.
+    Each message is {"type": "verdict", "data": {id, prompt, isAttack, attackType,
+    confidence, matches, created_at}}. A client that falls behind loses messages
+    according to its drop policy and is told with {"type": "dropped", "count": n}
+    before the next verdict, so it can refetch the lists.
+    Closes with:
+    - 1008: If drop is not a known policy
+    - 1013: If the server has too many clients, or the client is too slow with drop=disconnect
+    """
+    # Accept first so the client sees the close code and reason
+    await websocket.accept()
+    if drop is not None and drop not in DROP_POLICIES:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=f"drop must be one of: {', '.join(DROP_POLICIES)}")
+        return
+
+    feed = get_verdict_feed()
+    attack_types = [name.strip() for name in attackType.split(",") if name.strip()] if attackType else None
+    subscriber = feed.subscribe(attack_types, minConfidence, queueSize, drop, attacksOnly)
+    if subscriber is None:
+        logger.warning("Rejecting verdict feed client: too many clients")
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many clients")
+        return
+
+    sender = asyncio.create_task(_send_loop(websocket, subscriber))
+    receiver = asyncio.create_task(_receive_loop(websocket))
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        feed.unsubscribe(subscriber)
+        for task in (sender, receiver):
+            task.cancel()
+        # A send to a client that has just gone away fails; that's expected
+        await asyncio.gather(sender, receiver, return_exceptions=True)
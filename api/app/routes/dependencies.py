@@ -0,0 +1,119 @@
+from fastapi import HTTPException, status, Query, Request, Response
+from datetime import datetime
+from typing import Optional, Dict, Any
+import logging
+
+from app.services.PromptDetectorService import PromptDetectorService
+from app.services.detector_registry import get_detector_registry
+from app.services.detector_batcher import MicroBatcher, get_micro_batcher
+from app.services.exceptions import DetectorNotReadyError
+from app.services.database.exceptions import DatabaseUnavailableError
+from app.services.database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.database.prompt_cache import get_prompt_cache
+
+logger = logging.getLogger(__name__)
+
+
+def get_detector() -> PromptDetectorService:
+    """
+    FastAPI dependency that returns the shared prompt detector.
+    The detector is resolved once per request so a hot-swap never changes it mid-request.
+    Raises:
+        HTTPException: 503 if the detector is not loaded yet
+    """
+    try:
+        return get_detector_registry().get_detector()
+    except DetectorNotReadyError as e:
+        raise _detector_not_ready(e)
+
+
+def get_batcher() -> MicroBatcher:
+    """
+    FastAPI dependency that returns the shared micro-batcher in front of the detector.
+    Raises:
+        HTTPException: 503 if the detector is not loaded yet
+    """
+    try:
+        get_detector_registry().get_detector()
+    except DetectorNotReadyError as e:
+        raise _detector_not_ready(e)
+    return get_micro_batcher()
+
+
+def _detector_not_ready(error: DetectorNotReadyError) -> HTTPException:
+    """Build the 503 response used while the detector is unavailable"""
+    logger.warning(f"Rejecting request: {str(error)}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Prompt detector is not ready",
+        headers={"Retry-After": "5"}
+    )
+
+
+def database_unavailable(error: DatabaseUnavailableError) -> HTTPException:
+    """Build the 503 response used while MongoDB is unreachable"""
+    logger.warning(f"Rejecting request: {str(error)}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Database is unavailable",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+class PageParams:
+    """
+    FastAPI dependency holding the query parameters shared by the paginated prompt lists.
+    The cursor for the next page is returned in the X-Next-Cursor response header.
+    Prompts are cut to a preview unless fullPrompts is set.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Prompts per page, newest first"),
+        after: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+        fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. isAttack,attackType"),
+        since: Optional[datetime] = Query(None, description="Only prompts created at or after this time"),
+        until: Optional[datetime] = Query(None, description="Only prompts created before this time"),
+        fullPrompts: bool = Query(False, description="Return whole prompt texts instead of previews")
+    ):
+        self.limit = limit
+        self.after = after
+        self.fields = fields
+        self.since = since
+        self.until = until
+        self.full_prompts = fullPrompts
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "after": self.after,
+            "fields": self.fields,
+            "since": self.since,
+            "until": self.until,
+            "full_prompts": self.full_prompts,
+        }
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next page's cursor; the header is left out on the last page"""
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+
+def not_modified(request: Request, response: Response) -> Optional[Response]:
+    """
+    Tag a dashboard response with the prompt cache's version (ETag).
+    Read the tag before the data so a response is never older than its tag.
+    Returns:
+        A 304 Not Modified response if the client's If-None-Match already holds
+        this version, otherwise None (also while the cache isn't synced)
+    """
+    etag = get_prompt_cache().etag
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(headers)
+    client_tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in client_tags or "*" in client_tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+import logging
+
+from app.services.speculative_chat import get_chat_metrics
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/chat/stats", response_description="Chat pipeline metrics", tags=["system"])
+async def chat_stats() -> Dict[str, Any]:
+    """
+    Report /chat/prompt latency per mode (sequential, speculative), how often
+    speculative LLM calls were used or wasted, and background store timing.
+    """
+    return get_chat_metrics().stats()
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+import logging
+
+from app.services.database.write_buffer import get_write_buffer
+from app.services.database.prompt_cache import get_prompt_cache
+from app.services.database.rollups import get_prompt_rollups
+from app.services.database.prompt_bodies import get_prompt_body_store
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/db/stats", response_description="Database write buffer, cache, rollup and prompt storage metrics", tags=["system"])
+async def database_stats() -> Dict[str, Any]:
+    """
+    Report write-behind buffer metrics: documents pending and written,
+    backpressure waits, and the state of the local write journal; and prompt
+    cache metrics: sync mode, cached prompts, hits and misses; and prompt
+    rollup metrics: prompts counted, upserts, errors and scan fallbacks; and
+    prompt storage metrics: deduplicated prompts, new bodies and bytes saved.
+    """
+    return {
+        "writeBuffer": get_write_buffer().stats(),
+        "promptCache": get_prompt_cache().info(),
+        "rollups": get_prompt_rollups().info(),
+        "promptBodies": get_prompt_body_store().info(),
+    }
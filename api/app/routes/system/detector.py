@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException, status, Body, Header
+from typing import Dict, Any, Optional
+import logging
+import os
+import secrets
+
+from app.services.detector_registry import get_detector_registry
+from app.services.detector_batcher import get_micro_batcher
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/detector/status", response_description="Prompt detector status", tags=["system"])
+async def detector_status() -> Dict[str, Any]:
+    """
+    Report whether the prompt detector is loaded and which model is active.
+    """
+    return get_detector_registry().status()
+
+
+@router.get("/detector/stats", response_description="Prompt detector batching metrics", tags=["system"])
+async def detector_stats() -> Dict[str, Any]:
+    """
+    Report micro-batching metrics: queue depth, batch counts and batch-size histogram.
+    """
+    return get_micro_batcher().stats()
+
+
+@router.post("/detector/reload", response_description="Hot-swap the prompt detector", tags=["system"])
+async def reload_detector(
+    payload: Dict[str, Any] = Body(default={}),
+    x_admin_token: Optional[str] = Header(default=None)
+) -> Dict[str, Any]:
+    """
+    Load a new model or checkpoint and atomically swap it in.
+    Request body may contain "model_id" and/or "checkpoint"; missing values fall
+    back to the HF_MODEL_ID / HF_MODEL_CHECKPOINT environment variables.
+    Requests already in flight finish on the previous detector.
+    Requires the X-Admin-Token header to match DETECTOR_ADMIN_TOKEN. The endpoint
+    is disabled when DETECTOR_ADMIN_TOKEN is not set.
+    """
+    admin_token = os.getenv("DETECTOR_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Detector reload is disabled"
+        )
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token"
+        )
+
+    registry = get_detector_registry()
+    try:
+        await registry.swap(
+            model_id=payload.get("model_id"),
+            checkpoint=payload.get("checkpoint")
+        )
+    except Exception as e:
+        logger.error(f"Detector reload failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to reload detector: {str(e)}"
+        )
+    return registry.status()
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+import logging
+
+from app.services.verdict_feed import get_verdict_feed
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/feed/stats", response_description="Verdict feed metrics", tags=["system"])
+async def feed_stats() -> Dict[str, Any]:
+    """
+    Report /ws/verdicts metrics: connected clients (in total and per attack
+    type filter), verdicts published, messages queued and dropped, and
+    clients disconnected for being too slow.
+    """
+    return get_verdict_feed().stats()
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Response, status
+from typing import Dict, Any
+import logging
+import os
+
+from app.services.detector_registry import get_detector_registry
+from app.services.database.connection import get_connection_status
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Detection works without MongoDB (verdicts are journaled), so by default it doesn't gate readiness
+READYZ_REQUIRE_DATABASE = os.getenv("READYZ_REQUIRE_DATABASE", "false").lower() == "true"
+
+
+@router.get("/healthz", response_description="Liveness and component health", tags=["system"])
+async def healthz() -> Dict[str, Any]:
+    """
+    Liveness probe: answers 200 whenever the process can serve requests, with
+    the detector's state and the MongoDB connection's state, last probe and
+    connection pool settings. A database outage doesn't fail it, so a
+    restart isn't triggered for something a restart can't fix.
+    """
+    return {
+        "status": "ok",
+        "detector": get_detector_registry().status(),
+        "database": get_connection_status(),
+    }
+
+
+@router.get("/readyz", response_description="Readiness to serve traffic", tags=["system"])
+async def readyz(response: Response) -> Dict[str, Any]:
+    """
+    Readiness probe: 200 once the detector is loaded, 503 before. With
+    READYZ_REQUIRE_DATABASE=true MongoDB must be up as well.
+    """
+    detector_ready = get_detector_registry().is_ready
+    database = get_connection_status()
+    database_ready = database["state"] == "up"
+    ready = detector_ready and (database_ready or not READYZ_REQUIRE_DATABASE)
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "ready": ready,
+        "detector": detector_ready,
+        "database": database_ready,
+        "databaseRequired": READYZ_REQUIRE_DATABASE,
+        "databaseState": database["state"],
+        "pool": database.get("pool"),
+    }
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException, status
+from typing import Dict, Any
+import logging
+
+from app.services.llm_service import get_llm_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/llm/stats", response_description="LLM client metrics", tags=["system"])
+async def llm_stats() -> Dict[str, Any]:
+    """
+    Report LLM client metrics: calls, retries and failures, circuit breaker
+    state and rate limiter usage.
+    """
+    try:
+        return get_llm_service().stats()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"LLM client is not configured: {str(e)}"
+        )
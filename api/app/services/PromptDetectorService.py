@@ -5,18 +5,49 @@ import torch
 import traceback
 from pathlib import Path
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, DebertaV2ForSequenceClassification
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from app.services.detector_backends import create_backend
+from app.services.model_store import ModelStore
 
 logger = logging.getLogger(__name__)
 
+# Maximum sequence length supported by the model
+MAX_SEQUENCE_LENGTH = 512
+
+# Default token-length bucket boundaries used to split a batch
+DEFAULT_LENGTH_BUCKETS = "32,64,128,256,512"
+
+# Characters of window text reported in matches
+WINDOW_SNIPPET_CHARS = 120
+
 class PromptDetectorService:
     """
     Service for detecting potentially harmful prompts using a fine-tuned model.
     Uses a DeBERTa-v2 model hosted on Hugging Face.
     """
     
-    def __init__(self):
-        """Initialize the PromptDetectorService with model from Hugging Face"""
+    def __init__(
+        self,
+        model_id: Optional[str] = None,
+        checkpoint: Optional[str] = None,
+        mapping_file: Optional[str] = None,
+        precision: Optional[str] = None,
+        backend: Optional[str] = None,
+        source: Optional[str] = None,
+        check_parity: bool = True
+    ):
+        """
+        Initialize the PromptDetectorService with model from Hugging Face
+        Args:
+            model_id: Optional Hugging Face model ID. Defaults to HF_MODEL_ID.
+            checkpoint: Optional checkpoint subfolder. Defaults to HF_MODEL_CHECKPOINT.
+            mapping_file: Optional path to the id2label mapping. Defaults to ID2LABEL_PATH.
+            precision: Optional inference precision (fp32, int8, bf16). Defaults to DETECTOR_PRECISION.
+            backend: Optional inference backend (eager, compile, onnx). Defaults to DETECTOR_BACKEND.
+            source: Optional model source (hub, local). Defaults to DETECTOR_MODEL_SOURCE.
+            check_parity: Check a compiled/exported backend against eager mode now.
+                False when forked workers will serve the detector (see detector_backends.verify_backend)
+        """
         try:
             # --- determine base paths ---
             this_file = Path(__file__).resolve()
@@ -26,36 +57,53 @@ class PromptDetectorService:
             default_mapping_file = app_dir / "artifacts" / "id2label.json"
             
             # Allow override via env var
-            mapping_file = Path(os.getenv("ID2LABEL_PATH", default_mapping_file))
+            mapping_file = Path(mapping_file or os.getenv("ID2LABEL_PATH", default_mapping_file))
             
-            # Hugging Face model ID
-            model_id = os.getenv("HF_MODEL_ID", "jonastuttle/NobleGuardClassifier")
+            # Hugging Face model ID and checkpoint subfolder
+            model_id = model_id or os.getenv("HF_MODEL_ID", "jonastuttle/NobleGuardClassifier")
+            checkpoint = checkpoint or os.getenv("HF_MODEL_CHECKPOINT", "checkpoint-2320")
+            self.model_id = model_id
+            self.checkpoint = checkpoint
             
-            logger.info(f"Using model from Hugging Face: {model_id}")
-            logger.info(f"Using mapping file: {mapping_file}")
+            self.source = (source or os.getenv("DETECTOR_MODEL_SOURCE", "hub")).lower()
             
-            # --- Step 1: Load tokenizer from Hugging Face ---
-            logger.info(f"Loading tokenizer from Hugging Face: {model_id}...")
-            try:
-                self.tokenizer = AutoTokenizer.from_pretrained(
+            if self.source == "local":
+                # Load from the local model store; local_files_only keeps from_pretrained off the Hub
+                model_path = ModelStore().require(
                     model_id,
-                    subfolder="checkpoint-2320",
-                    trust_remote_code=True
+                    checkpoint,
+                    verify_checksums=os.getenv("MODEL_STORE_VERIFY", "false").lower() == "true"
                 )
+                logger.info(f"Using model from local store: {model_path}")
+                pretrained = str(model_path)
+                load_kwargs = {"local_files_only": True}
+                # safetensors weights are memory-mapped and loaded without an extra copy
+                model_kwargs = {"use_safetensors": True, "low_cpu_mem_usage": True}
+            else:
+                logger.info(f"Using model from Hugging Face: {model_id} ({checkpoint})")
+                pretrained = model_id
+                load_kwargs = {"subfolder": checkpoint, "trust_remote_code": True}
+                model_kwargs = {}
+            logger.info(f"Using mapping file: {mapping_file}")
+            
+            # --- Step 1: Load tokenizer ---
+            logger.info(f"Loading tokenizer from {pretrained}...")
+            try:
+                self.tokenizer = AutoTokenizer.from_pretrained(pretrained, **load_kwargs)
                 logger.info("Tokenizer loaded successfully")
             except Exception as e:
                 logger.error(f"Error loading tokenizer: {str(e)}")
                 logger.error(traceback.format_exc())
                 raise RuntimeError(f"Failed to load tokenizer: {str(e)}")
             
-            # --- Step 2: Load model from Hugging Face ---
-            logger.info("Loading model from Hugging Face as DeBERTa-v2...")
+            # --- Step 2: Load model ---
+            logger.info("Loading model as DeBERTa-v2...")
             try:
                 # Try explicit DeBERTa-v2 model class
                 self.model = DebertaV2ForSequenceClassification.from_pretrained(
-                    model_id,
-                    subfolder="checkpoint-2320",
-                    trust_remote_code=True
+                    pretrained,
+                    **load_kwargs,
+                    **model_kwargs
                 )
                 logger.info("Successfully loaded model as DeBERTa-v2")
             except Exception as e:
@@ -64,9 +112,9 @@ class PromptDetectorService:
                 logger.info("Falling back to AutoModelForSequenceClassification...")
                 try:
                     self.model = AutoModelForSequenceClassification.from_pretrained(
-                        model_id,
-                        subfolder="checkpoint-2320",
-                        trust_remote_code=True,
+                        pretrained,
+                        **load_kwargs,
+                        **model_kwargs,
                         ignore_mismatched_sizes=True
                     )
                     logger.info("Model loaded successfully with AutoModelForSequenceClassification")
@@ -102,6 +150,41 @@ class PromptDetectorService:
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
             logger.info(f"Using device: {self.device}")
             self.model.to(self.device)
+            self.model.eval()
+            
+            # --- Step 4b: Inference precision ---
+            self.precision = self._apply_precision(
+                (precision or os.getenv("DETECTOR_PRECISION", "fp32")).lower()
+            )
+            
+            # --- Step 4c: Inference backend ---
+            # Falls back to eager mode if compiling/exporting fails or doesn't match eager output
+            self.backend = create_backend(
+                (backend or os.getenv("DETECTOR_BACKEND", "eager")).lower(), self, check_parity
+            )
+            
+            # --- Step 5: Padding strategy ---
+            # "dynamic" pads each length bucket only to its longest prompt,
+            # "max_length" pads every prompt to 512 tokens (legacy behaviour)
+            self.padding = os.getenv("DETECTOR_PADDING", "dynamic").lower()
+            self.length_buckets = self._parse_length_buckets(
+                os.getenv("DETECTOR_LENGTH_BUCKETS", DEFAULT_LENGTH_BUCKETS)
+            )
+            logger.info(f"Using {self.padding} padding with length buckets {self.length_buckets}")
+            
+            # --- Step 6: Long input handling ---
+            # "window" scores overlapping 512-token windows, "truncate" only the first 512 tokens
+            self.long_input = os.getenv("DETECTOR_LONG_INPUT", "window").lower()
+            self.window_overlap = int(os.getenv("DETECTOR_WINDOW_OVERLAP", "128"))
+            self.max_windows = max(1, int(os.getenv("DETECTOR_MAX_WINDOWS", "16")))
+            self.window_aggregation = os.getenv("DETECTOR_WINDOW_AGGREGATION", "max_attack").lower()
+            self.benign_id = next(
+                (i for i, label in self.id2label.items() if str(label).lower() == "benign"), None
+            )
+            logger.info(
+                f"Long inputs: {self.long_input} (overlap={self.window_overlap}, "
+                f"max_windows={self.max_windows}, aggregation={self.window_aggregation})"
+            )
             
             logger.info("PromptDetectorService initialization complete")
             
@@ -120,65 +203,335 @@ class PromptDetectorService:
         Returns:
             Dict containing analysis results (isAttack, attackType, confidence, matches)
         """
-        if not prompt_text:
-            logger.warning("Empty prompt text provided for analysis")
-            return {"isAttack": False, "attackType": None, "confidence": 0.0, "matches": []}
+        return self.analyze_prompts([prompt_text])[0]
+    
+    def analyze_prompts(self, prompt_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze several prompt texts in a single batched forward pass
+        
+        Args:
+            prompt_texts: The text prompts to analyze
             
-        return self._analyze_with_ml(prompt_text)
+        Returns:
+            List of analysis result dicts, in the same order as prompt_texts
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(prompt_texts)
+        
+        # Empty prompts never reach the model
+        pending = []
+        for i, prompt_text in enumerate(prompt_texts):
+            if not prompt_text:
+                logger.warning("Empty prompt text provided for analysis")
+                results[i] = self._clean_result()
+            else:
+                pending.append(i)
+        
+        if pending:
+            batch_results = self._analyze_with_ml([prompt_texts[i] for i in pending])
+            for i, result in zip(pending, batch_results):
+                results[i] = result
+        
+        return results
+    
+    @property
+    def model_version(self) -> str:
+        """Identifier of the loaded weights, e.g. 'owner/model@checkpoint-2320' or '...@checkpoint-2320+int8'"""
+        version = f"{self.model_id}@{self.checkpoint}"
+        if self.precision != "fp32":
+            version += f"+{self.precision}"
+        return version
+
+    @property
+    def version(self) -> str:
+        """
+        Identifier of the loaded model and the backend running it, e.g.
+        'owner/model@checkpoint-2320' (eager) or '...@checkpoint-2320+int8:onnx'.
+        Verdicts are cached per version, so results of different backends never mix.
+        """
+        version = self.model_version
+        if self.backend.name != "eager":
+            version += f":{self.backend.name}"
+        return version
     
-    def _analyze_with_ml(self, prompt_text: str) -> Dict[str, Any]:
+    def _analyze_with_ml(self, prompt_texts: List[str]) -> List[Dict[str, Any]]:
         """
-        Analyze prompt text using the ML model
+        Analyze a batch of prompt texts using the ML model
+        
+        Prompts longer than the model's 512-token limit are split into
+        overlapping windows (see _build_segments). The windows of every prompt
+        in the batch go through the same bucketed forward passes, then the
+        per-window scores are combined back into one result per prompt.
         
         Args:
-            prompt_text: The text prompt to analyze
+            prompt_texts: The non-empty text prompts to analyze
             
         Returns:
-            Dict containing analysis results
+            List of analysis result dicts, one per prompt
         """
         try:
-            # Tokenize input
-            inputs = self.tokenizer(
-                prompt_text,
-                return_tensors="pt",
-                truncation=True,
-                padding="max_length",
-                max_length=512
-            )
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            segments = self._build_segments(prompt_texts)
             
-            # Get model prediction
-            self.model.eval()
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            
-            # Process outputs
-            probs = torch.nn.functional.softmax(outputs.logits, dim=-1)
-            idx = int(torch.argmax(probs, dim=1).item())
-            confidence = float(probs[0, idx].item())
-            label = self.id2label.get(idx)
+            segment_probs: List[Optional[List[float]]] = [None] * len(segments)
+            for indices, inputs in self._tokenize_batches([ids for _, ids in segments]):
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                
+                # Get model prediction
+                logits = self.backend(inputs)
+                
+                # Process outputs
+                probs = torch.nn.functional.softmax(logits.float(), dim=-1)
+                for i, row in zip(indices, probs.tolist()):
+                    segment_probs[i] = row
             
-            logger.info(f"Predicted label: {label}, confidence: {confidence:.4f}")
+            # Regroup window scores by prompt
+            windows: List[List[Tuple[List[int], List[float]]]] = [[] for _ in prompt_texts]
+            for (owner, ids), probs in zip(segments, segment_probs):
+                windows[owner].append((ids, probs))
             
-            # Format the result
-            if label and label.lower() == "benign":
-                logger.info("Prompt classified as benign")
-                return {"isAttack": False, "attackType": None, "confidence": confidence, "matches": []}
-            else:
-                # Map model's attack type to standardized categories
-                attack_type = self._normalize_attack_type(label)
-                logger.info(f"Prompt classified as attack: {attack_type}")
-                return {
-                    "isAttack": True, 
-                    "attackType": attack_type, 
-                    "confidence": confidence, 
-                    "matches": []
-                }
+            return [self._aggregate_windows(prompt_windows) for prompt_windows in windows]
         except Exception as e:
             logger.error(f"Error analyzing prompt: {str(e)}")
             logger.error(traceback.format_exc())
             # Return conservative result on error (not an attack)
-            return {"isAttack": False, "attackType": None, "confidence": 0.0, "matches": []}
+            return [self._clean_result() for _ in prompt_texts]
+    
+    def _build_segments(self, prompt_texts: List[str]) -> List[Tuple[int, List[int]]]:
+        """
+        Tokenize prompts into model-sized segments
+        
+        A prompt that fits in 512 tokens becomes one segment. A longer prompt
+        is either truncated (DETECTOR_LONG_INPUT=truncate) or split into
+        overlapping windows of up to 512 tokens, DETECTOR_WINDOW_OVERLAP tokens
+        apart, capped at DETECTOR_MAX_WINDOWS windows.
+        
+        Args:
+            prompt_texts: The text prompts to tokenize
+            
+        Returns:
+            List of (prompt index, input ids with special tokens) pairs
+        """
+        window_size = MAX_SEQUENCE_LENGTH - self.tokenizer.num_special_tokens_to_add()
+        step = max(1, window_size - self.window_overlap)
+        
+        encodings = self.tokenizer(
+            prompt_texts,
+            add_special_tokens=False,
+            truncation=False,
+            verbose=False
+        )
+        
+        segments = []
+        for owner, ids in enumerate(encodings["input_ids"]):
+            if len(ids) <= window_size or self.long_input == "truncate":
+                chunks = [ids[:window_size]]
+            else:
+                starts = list(range(0, len(ids) - window_size + step, step))[:self.max_windows]
+                chunks = [ids[start:start + window_size] for start in starts]
+                if len(ids) > starts[-1] + window_size:
+                    logger.warning(
+                        f"Prompt of {len(ids)} tokens exceeds {self.max_windows} windows, "
+                        f"scoring the first {starts[-1] + window_size} tokens"
+                    )
+            for chunk in chunks:
+                segments.append((owner, self.tokenizer.build_inputs_with_special_tokens(chunk)))
+        return segments
+    
+    def _tokenize_batches(self, segments: List[List[int]]) -> List[Tuple[List[int], Dict[str, Any]]]:
+        """
+        Group tokenized segments into padded model inputs
+        
+        With dynamic padding, segments are sorted by token length and split at the
+        configured bucket boundaries, and each group is padded only to its own
+        longest segment. A 10-token prompt then never pays for a 500-token one.
+        
+        Args:
+            segments: Input ids (with special tokens) of each segment
+            
+        Returns:
+            List of (segment indices, padded inputs) pairs
+        """
+        if self.padding == "max_length":
+            groups = [list(range(len(segments)))]
+        else:
+            lengths = [len(ids) for ids in segments]
+            order = sorted(range(len(segments)), key=lambda i: lengths[i])
+            
+            # Split the length-sorted segments at bucket boundaries
+            groups: List[List[int]] = []
+            current: List[int] = []
+            current_bucket = None
+            for i in order:
+                bucket = next((b for b in self.length_buckets if lengths[i] <= b), MAX_SEQUENCE_LENGTH)
+                if current and bucket != current_bucket:
+                    groups.append(current)
+                    current = []
+                current.append(i)
+                current_bucket = bucket
+            if current:
+                groups.append(current)
+        
+        batches = []
+        for group in groups:
+            features = [
+                {"input_ids": segments[i], "attention_mask": [1] * len(segments[i])}
+                for i in group
+            ]
+            if self.padding == "max_length":
+                inputs = self.tokenizer.pad(
+                    features, padding="max_length", max_length=MAX_SEQUENCE_LENGTH, return_tensors="pt"
+                )
+            else:
+                inputs = self.tokenizer.pad(features, padding="longest", return_tensors="pt")
+            batches.append((group, inputs))
+        return batches
+    
+    def _aggregate_windows(self, windows: List[Tuple[List[int], List[float]]]) -> Dict[str, Any]:
+        """
+        Combine the scores of a prompt's windows into a single result
+        
+        DETECTOR_WINDOW_AGGREGATION selects the rule:
+        - "max_attack": use the window with the highest attack probability
+          (1 - P(benign)), so one malicious window flags the whole prompt
+        - "mean": average the class probabilities over all windows
+        
+        Args:
+            windows: (input ids, class probabilities) of each window, in text order
+            
+        Returns:
+            Dict containing analysis results. For multi-window attacks, matches
+            lists the windows that were classified as attacks, strongest first.
+        """
+        if len(windows) == 1:
+            probs = windows[0][1]
+            idx = max(range(len(probs)), key=probs.__getitem__)
+            return self._format_result(self.id2label.get(idx), probs[idx])
+        
+        attack_scores = [1.0 - probs[self.benign_id] if self.benign_id is not None else max(probs)
+                         for _, probs in windows]
+        
+        if self.window_aggregation == "mean":
+            probs = [sum(column) / len(windows) for column in zip(*(p for _, p in windows))]
+        else:
+            probs = windows[max(range(len(windows)), key=attack_scores.__getitem__)][1]
+        idx = max(range(len(probs)), key=probs.__getitem__)
+        
+        matches = []
+        if idx != self.benign_id:
+            triggered = [
+                w for w, (_, window_probs) in enumerate(windows)
+                if max(range(len(window_probs)), key=window_probs.__getitem__) != self.benign_id
+            ]
+            for w in sorted(triggered, key=lambda w: attack_scores[w], reverse=True):
+                ids = windows[w][0]
+                snippet = self.tokenizer.decode(ids, skip_special_tokens=True)
+                if len(snippet) > WINDOW_SNIPPET_CHARS:
+                    snippet = snippet[:WINDOW_SNIPPET_CHARS] + "..."
+                matches.append(f"window {w + 1}/{len(windows)} (attack p={attack_scores[w]:.2f}): {snippet}")
+        
+        logger.info(f"Aggregated {len(windows)} windows with {self.window_aggregation}")
+        return self._format_result(self.id2label.get(idx), probs[idx], matches)
+    
+    def _apply_precision(self, precision: str) -> str:
+        """
+        Convert the loaded fp32 model to the requested inference precision
+        
+        - "int8": dynamic int8 quantization of every nn.Linear layer (CPU only).
+          Weights are stored as int8, activations are quantized on the fly.
+        - "bf16": cast the weights to bfloat16, only when the CPU has native
+          bf16 support (AVX512-BF16/AMX); emulated bf16 is slower than fp32.
+        
+        Falls back to fp32 when the mode is unknown or unsupported.
+        
+        Args:
+            precision: Requested precision (fp32, int8, bf16)
+            
+        Returns:
+            The precision actually in use
+        """
+        if precision == "fp32":
+            return precision
+        
+        if self.device.type != "cpu":
+            logger.warning(f"DETECTOR_PRECISION={precision} is only supported on CPU, using fp32")
+            return "fp32"
+        
+        if precision == "int8":
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("Applied dynamic int8 quantization to linear layers")
+            return precision
+        
+        if precision == "bf16":
+            try:
+                bf16_supported = torch.ops.mkldnn._is_mkldnn_bf16_supported()
+            except Exception:
+                bf16_supported = False
+            if not bf16_supported:
+                logger.warning("CPU has no native bf16 support, using fp32")
+                return "fp32"
+            self.model.to(torch.bfloat16)
+            logger.info("Cast model weights to bfloat16")
+            return precision
+        
+        logger.warning(f"Unknown DETECTOR_PRECISION '{precision}', using fp32")
+        return "fp32"
+    
+    @staticmethod
+    def _parse_length_buckets(value: str) -> List[int]:
+        """
+        Parse a comma separated list of token-length bucket boundaries
+        
+        Args:
+            value: e.g. "32,64,128,256,512"
+            
+        Returns:
+            Sorted list of boundaries, always ending at the model's maximum length
+        """
+        try:
+            buckets = sorted({int(b) for b in value.split(",") if b.strip()})
+        except ValueError:
+            logger.warning(f"Invalid DETECTOR_LENGTH_BUCKETS '{value}', using {DEFAULT_LENGTH_BUCKETS}")
+            buckets = [int(b) for b in DEFAULT_LENGTH_BUCKETS.split(",")]
+        buckets = [b for b in buckets if 0 < b < MAX_SEQUENCE_LENGTH]
+        return buckets + [MAX_SEQUENCE_LENGTH]
+    
+    def _format_result(
+        self,
+        label: Optional[str],
+        confidence: float,
+        matches: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the analysis result dict for a predicted label
+        
+        Args:
+            label: The raw label predicted by the model
+            confidence: Probability of the predicted label
+            matches: Optional descriptions of what triggered the detection
+            
+        Returns:
+            Dict containing analysis results
+        """
+        logger.info(f"Predicted label: {label}, confidence: {confidence:.4f}")
+        
+        if label and label.lower() == "benign":
+            logger.info("Prompt classified as benign")
+            return {"isAttack": False, "attackType": None, "confidence": confidence, "matches": []}
+        
+        # Map model's attack type to standardized categories
+        attack_type = self._normalize_attack_type(label)
+        logger.info(f"Prompt classified as attack: {attack_type}")
+        return {
+            "isAttack": True, 
+            "attackType": attack_type, 
+            "confidence": confidence, 
+            "matches": matches or []
+        }
+    
+    def _clean_result(self) -> Dict[str, Any]:
+        """Result used for empty prompts and as the conservative fallback on errors"""
+        return {"isAttack": False, "attackType": None, "confidence": 0.0, "matches": []}
     
     def _normalize_attack_type(self, attack_type: Optional[str]) -> str:
         """
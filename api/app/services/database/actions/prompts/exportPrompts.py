@@ -0,0 +1,77 @@
+from typing import Dict, Any, List, Optional, AsyncIterator
+from datetime import datetime
+import logging
+import os
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCursor
+
+from app.services.database.connection import get_database
+from app.services.database.pagination import page_filter, parse_fields
+from app.services.database.prompt_bodies import get_prompt_body_store
+
+logger = logging.getLogger(__name__)
+
+# Documents fetched from the server per round trip while exporting
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Oldest first. The list indexes ((isAttack, attackType,) created_at, _id) serve both the
+# filter and this order when walked backwards, so the server neither sorts in memory nor
+# reads documents the filter rejects
+EXPORT_SORT = [("created_at", 1), ("_id", 1)]
+
+
+async def open_prompt_export(
+    base_filter: Dict[str, Any],
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Open a cursor over every prompt matching a filter, for streaming exports.
+    The query is validated and the database reached before anything is
+    returned, so errors can still become a proper HTTP status.
+    Args:
+        base_filter: Query for the documents to export (e.g. {"isAttack": True})
+        fields: Comma separated fields to return, None for all
+        since / until: Only prompts created in [since, until)
+        batch_size: Documents per server round trip; bounds memory use
+    Returns:
+        AsyncIterator yielding documents with string _ids and whole prompt texts, oldest first
+    Raises:
+        InvalidQueryError: If a field name is invalid
+    """
+    projection = parse_fields(fields)
+    if projection is not None and "prompt" in projection:
+        # Deduplicated prompts hold a reference instead of the text (see prompt_bodies.py)
+        projection.update({"promptHash": 1, "promptPreview": 1, "promptLength": 1})
+    db: AsyncIOMotorDatabase = await get_database()
+    cursor = db.prompts.find(page_filter(base_filter, None, since, until), projection) \
+        .sort(EXPORT_SORT) \
+        .batch_size(batch_size)
+    return _iterate(cursor, batch_size)
+
+
+async def _batches(cursor: AsyncIOMotorCursor, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _iterate(cursor: AsyncIOMotorCursor, batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+    store = get_prompt_body_store()
+    exported = 0
+    try:
+        async for batch in _batches(cursor, batch_size):
+            # One prompt_bodies query per batch for the deduplicated prompts
+            for document in await store.restore(batch):
+                document["_id"] = str(document["_id"])
+                exported += 1
+                yield document
+    finally:
+        await cursor.close()
+        logger.info(f"Exported {exported} prompts")
@@ -1,36 +1,57 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
 import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.services.database.connection import get_database
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
+from app.services.database.pagination import fetch_page, DEFAULT_PAGE_SIZE
+from app.services.database.prompt_cache import get_prompt_cache
 
 logger = logging.getLogger(__name__)
 
-async def get_all_clean_prompts() -> List[Dict[str, Any]]:
+async def get_all_clean_prompts(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    full_prompts: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    Retrieve all prompts where isAttack is false from the database.
+    Retrieve one page of prompts where isAttack is false from the database.
+    Args:
+        limit: Page size (newest prompts first)
+        after: Cursor returned with the previous page
+        fields: Comma separated fields to return (e.g. "isAttack,attackType"), None for all
+        since / until: Only prompts created in [since, until)
+        full_prompts: Return whole prompt texts instead of previews
     Returns:
-        List[Dict[str, Any]]: A list of attack prompts
+        Tuple[List[Dict[str, Any]], Optional[str]]: A page of clean prompts and the
+        cursor for the next page (None on the last page)
     Raises:
+        InvalidQueryError: If the cursor or fields are invalid
         Exception: If there's an error retrieving the prompts
     """
     try:
+        # Recent pages are served from memory; the cache only holds previews
+        if not full_prompts:
+            cached = get_prompt_cache().page({"isAttack": False}, limit, after, fields, since, until)
+            if cached is not None:
+                return cached
+
         db: AsyncIOMotorDatabase = await get_database()
         prompts_collection = db["prompts"]
         
-        # Query for prompts where isAttack is True
-        cursor = prompts_collection.find({"isAttack": False})
-        
-        # Convert the cursor to a list
-        attacks = await cursor.to_list(length=None)
-        
-        # Convert ObjectId to string for JSON serialization
-        for attack in attacks:
-            if "_id" in attack:
-                attack["_id"] = str(attack["_id"])
+        # Query for prompts where isAttack is False, one page at a time
+        prompts, next_cursor = await fetch_page(
+            prompts_collection, {"isAttack": False}, limit, after, fields, since, until, full_prompts
+        )
         
-        logger.info(f"Retrieved {len(attacks)} clean prompts")
-        return attacks
+        logger.info(f"Retrieved {len(prompts)} clean prompts")
+        return prompts, next_cursor
+    except (InvalidQueryError, DatabaseUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Failed to retrieve clearn prompts: {str(e)}")
         raise Exception(f"Failed to retrieve clean prompts: {str(e)}")
\ No newline at end of file
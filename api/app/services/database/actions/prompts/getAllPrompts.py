@@ -1,31 +1,49 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
 import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.services.database.connection import get_database
-from app.services.database.exceptions import DatabaseOperationError
+from app.services.database.exceptions import DatabaseOperationError, InvalidQueryError, DatabaseUnavailableError
+from app.services.database.pagination import fetch_page, DEFAULT_PAGE_SIZE
+from app.services.database.prompt_cache import get_prompt_cache
 
 logger = logging.getLogger(__name__)
 
-async def get_all_prompts() -> List[Dict[str, Any]]:
+async def get_all_prompts(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    full_prompts: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
+    Args:
+        limit: Page size (newest prompts first)
+        after: Cursor returned with the previous page
+        fields: Comma separated fields to return (e.g. "isAttack,attackType"), None for all
+        since / until: Only prompts created in [since, until)
+        full_prompts: Return whole prompt texts instead of previews
     Returns:
-        List[Dict[str, Any]]: A list of prompt documents
+        Tuple[List[Dict[str, Any]], Optional[str]]: A page of prompt documents and the
+        cursor for the next page (None on the last page)
     Raises:
+        InvalidQueryError: If the cursor or fields are invalid
         DatabaseOperationError: If there's an error retrieving prompts from the database
     """
     try:
+        # Recent pages are served from memory; the cache only holds previews
+        if not full_prompts:
+            cached = get_prompt_cache().page({}, limit, after, fields, since, until)
+            if cached is not None:
+                return cached
+
         db: AsyncIOMotorDatabase = await get_database()
         prompts_collection = db["prompts"]
-        cursor = prompts_collection.find()
-        prompts = await cursor.to_list(length=None)
-            
-        # Convert ObjectId to string for JSON serialization
-        for prompt in prompts:
-            if "_id" in prompt:
-                prompt["_id"] = str(prompt["_id"])
-                    
-        return prompts
+        return await fetch_page(prompts_collection, {}, limit, after, fields, since, until, full_prompts)
+    except (InvalidQueryError, DatabaseUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Error retrieving prompts: {str(e)}")
         raise Exception(f"Failed to retrieve prompts: {str(e)}")
\ No newline at end of file
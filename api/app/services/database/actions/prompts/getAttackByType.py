@@ -1,39 +1,56 @@
 import logging
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 from app.services.database.connection import get_database
-from bson.objectid import ObjectId
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
+from app.services.database.pagination import fetch_page, DEFAULT_PAGE_SIZE
+from app.services.database.prompt_cache import get_prompt_cache
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 logger = logging.getLogger(__name__)
 
-async def get_attack_by_type(attack_type: str) -> List[Dict[str, Any]]:
+async def get_attack_by_type(
+    attack_type: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    full_prompts: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    Retrieves attack prompts of a specific type from the database.
+    Retrieves one page of attack prompts of a specific type from the database.
     Params:
         attack_type: The type of attack to filter by
+        limit: Page size (newest prompts first)
+        after: Cursor returned with the previous page
+        fields: Comma separated fields to return (e.g. "isAttack,attackType"), None for all
+        since / until: Only prompts created in [since, until)
+        full_prompts: Return whole prompt texts instead of previews
     Returns:
-        List of attack prompts matching the type
+        A page of attack prompts matching the type and the cursor for the next
+        page (None on the last page)
     Raises:
+        InvalidQueryError: If the cursor or fields are invalid
         Exception: If there's an error querying the database
     """
     try:
-        db: AsyncIOMotorDatabase = await get_database()
-        
         # Create filter query for both isAttack:true and the specified type
         filter_query = {
             "isAttack": True,
             "attackType": attack_type
         }
-        
-        cursor = db.prompts.find(filter_query)
-        attack_prompts = await cursor.to_list(length=None)
-        
-        # Convert ObjectId to string for JSON serialization
-        for prompt in attack_prompts:
-            if "_id" in prompt:
-                prompt["_id"] = str(prompt["_id"])
-                
-        return attack_prompts
+
+        # Recent pages are served from memory; the cache only holds previews
+        if not full_prompts:
+            cached = get_prompt_cache().page(filter_query, limit, after, fields, since, until)
+            if cached is not None:
+                return cached
+
+        db: AsyncIOMotorDatabase = await get_database()
+        return await fetch_page(db.prompts, filter_query, limit, after, fields, since, until, full_prompts)
+    except (InvalidQueryError, DatabaseUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Error retrieving attack prompts of type {attack_type}: {str(e)}")
         raise Exception(f"Failed to retrieve attack prompts of type {attack_type}: {str(e)}")
\ No newline at end of file
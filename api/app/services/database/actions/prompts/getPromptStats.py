@@ -0,0 +1,190 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+import logging
+import os
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.services.database.connection import get_database
+from app.services.database.exceptions import InvalidQueryError, DatabaseUnavailableError
+from app.services.database.pagination import time_range
+from app.services.database.rollups import CONFIDENCE_BINS, confidence_moments, get_prompt_rollups
+
+logger = logging.getLogger(__name__)
+
+# Units accepted for the time series ($dateTrunc units)
+BUCKET_UNITS = ("minute", "hour", "day", "week", "month")
+
+# Most recent buckets returned in the time series
+STATS_MAX_BUCKETS = int(os.getenv("STATS_MAX_BUCKETS", "500"))
+
+
+def _stats_pipeline(match: Dict[str, Any], bucket: str) -> List[Dict[str, Any]]:
+    """One pass over the window; each facet computes one part of the stats"""
+    return [
+        {"$match": match},
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "attacks": {"$sum": {"$cond": ["$isAttack", 1, 0]}},
+                    "first": {"$min": "$created_at"},
+                    "last": {"$max": "$created_at"},
+                }},
+            ],
+            "moments": [
+                {"$match": {"confidence": {"$type": "number", "$gte": 0, "$lt": CONFIDENCE_BINS[-1]}}},
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "sum": {"$sum": "$confidence"},
+                    "sumSq": {"$sum": {"$multiply": ["$confidence", "$confidence"]}},
+                }},
+            ],
+            "byType": [
+                {"$match": {"isAttack": True}},
+                {"$group": {"_id": "$attackType", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+            ],
+            "confidence": [
+                {"$match": {"confidence": {"$type": "number"}}},
+                {"$bucket": {
+                    "groupBy": "$confidence",
+                    "boundaries": CONFIDENCE_BINS,
+                    "default": "other",
+                    "output": {
+                        "attacks": {"$sum": {"$cond": ["$isAttack", 1, 0]}},
+                        "clean": {"$sum": {"$cond": ["$isAttack", 0, 1]}},
+                    },
+                }},
+            ],
+            "series": [
+                {"$group": {
+                    "_id": {"$dateTrunc": {"date": "$created_at", "unit": bucket}},
+                    "total": {"$sum": 1},
+                    "attacks": {"$sum": {"$cond": ["$isAttack", 1, 0]}},
+                }},
+                {"$sort": {"_id": -1}},
+                {"$limit": STATS_MAX_BUCKETS},
+            ],
+        }},
+    ]
+
+
+async def get_prompt_stats(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: str = "day"
+) -> Dict[str, Any]:
+    """
+    Compute dashboard statistics for a window.
+    All-time stats (no since or until) come from the prompt cache when it's
+    synced, otherwise from the minute/hour/day rollups when they cover the
+    window, otherwise from a single aggregation over the prompts.
+    Args:
+        since: Only prompts created at or after this time (None for all time)
+        until: Only prompts created before this time (None for now)
+        bucket: Time series bucket: minute, hour, day, week or month
+    Returns:
+        Dict with totals, attack rate, counts per attack type, confidence
+        histograms (plus mean and standard deviation) for attacks and clean
+        prompts, and the time series (oldest bucket first, at most
+        STATS_MAX_BUCKETS of the most recent)
+    Raises:
+        InvalidQueryError: If the bucket or window is invalid
+        Exception: If the aggregation fails
+    """
+    if bucket not in BUCKET_UNITS:
+        raise InvalidQueryError(f"bucket must be one of: {', '.join(BUCKET_UNITS)}", param="bucket")
+    # Stored created_at values are naive UTC; a parameter may carry an offset
+    since, until = time_range(since, until)
+
+    if since is None and until is None:
+        # All-time stats are kept up to date in memory (imported here, the cache imports this module)
+        from app.services.database.prompt_cache import get_prompt_cache
+        cached = await get_prompt_cache().stats(bucket)
+        if cached is not None:
+            return cached
+
+    stats = await load_prompt_stats(since, until, bucket)
+    stats["window"] = {"since": since, "until": until, "bucket": bucket}
+    return stats
+
+
+async def load_prompt_stats(since: Optional[datetime], until: Optional[datetime], bucket: str) -> Dict[str, Any]:
+    """
+    Stats from the rollups if they cover the window, else from the aggregation.
+    Returns:
+        The stats dict described in get_prompt_stats, without the window
+    """
+    try:
+        stats = await get_prompt_rollups().window_stats(since, until, bucket, STATS_MAX_BUCKETS)
+        if stats is not None:
+            return stats
+    except DatabaseUnavailableError:
+        raise
+    except Exception as e:
+        logger.warning(f"Failed to read prompt rollups, scanning prompts instead: {str(e)}")
+
+    match: Dict[str, Any] = {}
+    if since is not None or until is not None:
+        match["created_at"] = {}
+        if since is not None:
+            match["created_at"]["$gte"] = since
+        if until is not None:
+            match["created_at"]["$lt"] = until
+    return await compute_prompt_stats(match, bucket)
+
+
+async def compute_prompt_stats(match: Dict[str, Any], bucket: str) -> Dict[str, Any]:
+    """
+    Run the stats aggregation over the prompts matching a query.
+    Returns:
+        The stats dict described in get_prompt_stats, without the window
+    Raises:
+        DatabaseUnavailableError: If MongoDB is unreachable
+        Exception: If the aggregation fails
+    """
+    try:
+        db: AsyncIOMotorDatabase = await get_database()
+        cursor = db.prompts.aggregate(_stats_pipeline(match, bucket))
+        facets = (await cursor.to_list(length=1))[0]
+    except DatabaseUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to compute prompt stats: {str(e)}")
+        raise Exception(f"Failed to compute prompt stats: {str(e)}")
+
+    totals = facets["totals"][0] if facets["totals"] else {"total": 0, "attacks": 0, "first": None, "last": None}
+    moments = facets["moments"][0] if facets["moments"] else {"count": 0, "sum": 0.0, "sumSq": 0.0}
+    mean, std = confidence_moments(moments["count"], moments["sum"], moments["sumSq"])
+    histogram_bins = CONFIDENCE_BINS[:-1]
+    attack_histogram = [0] * len(histogram_bins)
+    clean_histogram = [0] * len(histogram_bins)
+    for row in facets["confidence"]:
+        if row["_id"] == "other":
+            continue
+        index = histogram_bins.index(row["_id"])
+        attack_histogram[index] = row["attacks"]
+        clean_histogram[index] = row["clean"]
+
+    return {
+        "total": totals["total"],
+        "attacks": totals["attacks"],
+        "clean": totals["total"] - totals["attacks"],
+        "attackRate": totals["attacks"] / totals["total"] if totals["total"] else 0.0,
+        "firstPromptAt": totals["first"],
+        "lastPromptAt": totals["last"],
+        "byType": {(row["_id"] or "unknown"): row["count"] for row in facets["byType"]},
+        "confidence": {
+            "bins": histogram_bins,
+            "attacks": attack_histogram,
+            "clean": clean_histogram,
+            "mean": mean,
+            "std": std,
+        },
+        "series": [
+            {"start": row["_id"], "total": row["total"], "attacks": row["attacks"]}
+            for row in reversed(facets["series"])
+        ],
+    }
@@ -1,10 +1,19 @@
 from typing import List, Dict, Any
 from datetime import datetime
 import logging
+import os
+from bson.objectid import ObjectId
 from app.services.database.connection import get_database
+from app.services.database.write_buffer import get_write_buffer
+from app.services.database.rollups import get_prompt_rollups
+from app.services.database.prompt_bodies import get_prompt_body_store
+from app.services.verdict_feed import get_verdict_feed
 
 logger = logging.getLogger(__name__)
 
+# Queue the write and return at once instead of waiting for MongoDB (see write_buffer.py)
+DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "true").lower() == "true"
+
 async def store_prompt_analysis(
     prompt: str,
     is_attack: bool,
@@ -14,6 +23,10 @@ async def store_prompt_analysis(
 ) -> Dict[str, Any]:
     """
     Store a prompt and its analysis results in the database.
+    With DB_WRITE_BEHIND (the default) the document is handed to the write-behind
+    buffer and written with the next bulk insert; the returned ID is assigned up front.
+    Once stored, the verdict is pushed to the /ws/verdicts clients: by the buffer's
+    write listener in write-behind mode (see main.py), directly otherwise.
     Args:
         prompt: The original prompt text
         is_attack: Whether the prompt was identified as an attack
@@ -24,10 +37,8 @@ async def store_prompt_analysis(
         Dict containing the inserted document's ID
     """
     try:
-        db = await get_database()
-        collection = db.prompts
-
         document = {
+            "_id": ObjectId(),
             "prompt": prompt,
             "isAttack": is_attack,
             "attackType": attack_type,
@@ -36,9 +47,18 @@ async def store_prompt_analysis(
             "created_at": datetime.utcnow()
         }
 
-        result = await collection.insert_one(document)
+        if DB_WRITE_BEHIND:
+            await get_write_buffer().put(document)
+            logger.debug(f"Queued prompt analysis with ID: {document['_id']}")
+            return {"id": str(document["_id"])}
+
+        db = await get_database()
+        stored = await get_prompt_body_store().compact([document])
+        result = await db.prompts.insert_one(stored[0])
+        await get_prompt_rollups().apply([document])
         
         logger.info(f"Stored prompt analysis with ID: {result.inserted_id}")
+        get_verdict_feed().publish(document)
         
         return {"id": str(result.inserted_id)}
         
@@ -0,0 +1,65 @@
+from typing import List, Dict, Any
+from datetime import datetime
+import logging
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+from app.services.database.connection import get_database
+from app.services.database.rollups import get_prompt_rollups, inserted_documents
+from app.services.database.prompt_bodies import get_prompt_body_store
+from app.services.verdict_feed import get_verdict_feed
+
+logger = logging.getLogger(__name__)
+
+async def store_prompt_analyses(analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Store many prompts and their analysis results with a single bulk write,
+    then push them to the /ws/verdicts clients.
+    Args:
+        analyses: List of dicts with "prompt" and the analysis fields
+                  (isAttack, attackType, confidence, matches)
+    Returns:
+        Dict containing the number of inserted documents
+    """
+    if not analyses:
+        return {"inserted": 0}
+
+    try:
+        db = await get_database()
+        collection = db.prompts
+
+        created_at = datetime.utcnow()
+        documents = [
+            {
+                "_id": ObjectId(),
+                "prompt": analysis["prompt"],
+                "isAttack": analysis["isAttack"],
+                "attackType": analysis["attackType"],
+                "confidence": analysis["confidence"],
+                "matches": analysis["matches"],
+                "created_at": created_at
+            }
+            for analysis in analyses
+        ]
+
+        # Unordered so one bad document doesn't stop the rest of the chunk
+        # Long prompt texts go to prompt_bodies; the full documents are kept for the feed
+        stored = await get_prompt_body_store().compact(documents)
+        try:
+            result = await collection.insert_many(stored, ordered=False)
+        except BulkWriteError as e:
+            # Count and publish the documents that were written before reporting the failure
+            inserted = inserted_documents(documents, e)
+            await get_prompt_rollups().apply(inserted)
+            get_verdict_feed().publish_many(inserted)
+            raise
+        await get_prompt_rollups().apply(documents)
+
+        logger.info(f"Stored {len(result.inserted_ids)} prompt analyses")
+
+        get_verdict_feed().publish_many(documents)
+
+        return {"inserted": len(result.inserted_ids)}
+
+    except Exception as e:
+        logger.error(f"Error storing prompt analyses: {str(e)}")
+        raise Exception(f"Failed to store prompt analyses: {str(e)}")
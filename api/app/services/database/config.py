@@ -32,6 +32,15 @@ class DatabaseConfig:
         self.min_pool_size = int(os.getenv("MONGODB_MIN_POOL_SIZE", "1"))
         self.max_idle_time_ms = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "50000"))
         self.connection_timeout_ms = int(os.getenv("MONGODB_CONNECTION_TIMEOUT_MS", "20000"))
+        # How long an operation waits for a reachable server before failing
+        self.server_selection_timeout_ms = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+
+        # Startup and health monitoring: "background" connects without holding up the API,
+        # "blocking" waits for the first connection and fails startup without it
+        self.startup_mode = os.getenv("MONGODB_STARTUP_MODE", "background").lower()
+        self.health_interval_seconds = float(os.getenv("MONGODB_HEALTH_INTERVAL_SECONDS", "10"))
+        self.reconnect_initial_seconds = float(os.getenv("MONGODB_RECONNECT_INITIAL_SECONDS", "1"))
+        self.reconnect_max_seconds = float(os.getenv("MONGODB_RECONNECT_MAX_SECONDS", "30"))
         
         # SSL/TLS configuration
         self.tls_enabled = os.getenv("MONGODB_TLS_ENABLED", "true").lower() == "true"
@@ -73,6 +82,7 @@ class DatabaseConfig:
             "minPoolSize": self.min_pool_size,
             "maxIdleTimeMS": self.max_idle_time_ms,
             "connectTimeoutMS": self.connection_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
         }
 
         # Add TLS options if TLS is enabled (for MongoDB Atlas this is always enabled)
@@ -88,6 +98,20 @@ class DatabaseConfig:
 
         return options
     
+    def pool_settings(self) -> dict:
+        """
+        Connection pool and timeout settings, safe to report (no URI or credentials).
+        Returns: Dictionary of the settings passed to the MongoDB client
+        """
+        return {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "connectTimeoutMS": self.connection_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "tls": self.tls_enabled,
+        }
+
     def __str__(self) -> str:
         """Return a string representation of the configuration (without sensitive data)."""
         # Create a safe URI for logging (hide credentials)
@@ -1,11 +1,16 @@
 import motor.motor_asyncio
 import logging
 import asyncio
-from typing import Optional, Dict, Any, AsyncGenerator
+import math
+import os
+import random
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, AsyncGenerator, Awaitable, Callable
 from contextlib import asynccontextmanager
 
 from app.services.database.config import DatabaseConfig
-from app.services.database.exceptions import DatabaseConnectionError, ConfigurationError
+from app.services.database.exceptions import DatabaseConnectionError, ConfigurationError, DatabaseUnavailableError
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,7 +23,8 @@ class DatabaseConnection:
     - Connection pooling with configurable pool size
     - Async context manager support for clean connection management
     - Lazy connection initialization
-    - Connection health monitoring
+    - Background connection with exponential backoff, then a periodic health
+      probe (check_connection_health) that tracks whether the server is up
     - Proper error handling with custom exceptions
     - Thread-safe client access
     
@@ -58,6 +64,17 @@ class DatabaseConnection:
         self._client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
         self._db: Optional[motor.motor_asyncio.AsyncIOMotorDatabase] = None
         self._connected = False
+
+        # Health as seen by connect() and the probe: "connecting" until the first
+        # connection, then "up" or "down"
+        self._state = "connecting"
+        self._state_since = datetime.utcnow()
+        self._last_error: Optional[Exception] = None
+        self._last_check: Optional[datetime] = None
+        self._last_ping_ms: Optional[float] = None
+        self._next_check_at = 0.0
+        self._attempts = 0
+        self._monitor_task: Optional[asyncio.Task] = None
     
     @classmethod
     async def get_instance(
@@ -92,27 +109,31 @@ class DatabaseConnection:
         if self._connected:
             return
             
+        self._attempts += 1
         try:
-            # Configure MongoDB client with connection pooling settings from config
+            # Configure MongoDB client with connection pooling and timeout settings from config
             connection_options = self._config.get_connection_options()
-            self._client = motor.motor_asyncio.AsyncIOMotorClient(
-                self._config.uri,
-                **connection_options,
-                serverSelectionTimeoutMS=self._config.connection_timeout_ms
-            )
+            self._client = motor.motor_asyncio.AsyncIOMotorClient(self._config.uri, **connection_options)
             
             # Verify connection by pinging the server
             await self._client.admin.command('ping')
             
             self._db = self._client[self._config.db_name]
             self._connected = True
+            self._set_state("up")
             
             logger.info(f"Successfully connected to MongoDB database: {self._config.db_name}")
         except ConfigurationError as ce:
             # Re-raise configuration errors directly
             logger.error(f"Configuration error: {str(ce)}")
+            self._last_error = ce
             raise
         except Exception as e:
+            # Don't keep a client (and its monitor threads) per failed attempt
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            self._last_error = e
             # Wrap other errors in our custom exception
             logger.error(f"Failed to connect to MongoDB: {str(e)}")
             raise DatabaseConnectionError(f"Failed to connect to MongoDB: {str(e)}", original_error=e)
@@ -173,12 +194,102 @@ class DatabaseConnection:
         if self._client is None:
             return False
             
+        started = time.perf_counter()
+        self._last_check = datetime.utcnow()
         try:
             await self._client.admin.command('ping')
+            self._last_ping_ms = (time.perf_counter() - started) * 1000
             return True
         except Exception as e:
             logger.warning(f"Connection health check failed: {str(e)}")
+            self._last_ping_ms = None
+            self._last_error = e
             return False
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            self._state = state
+            self._state_since = datetime.utcnow()
+
+    def start_monitor(self, on_connect: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        """
+        Connect in the background and keep probing the server's health.
+        Connection attempts back off exponentially (with jitter) from
+        MONGODB_RECONNECT_INITIAL_SECONDS to MONGODB_RECONNECT_MAX_SECONDS.
+        Once connected, check_connection_health runs every
+        MONGODB_HEALTH_INTERVAL_SECONDS; a failed probe marks the server down
+        and probes back off the same way until it answers again.
+        Args:
+            on_connect: Awaited once after the first successful connection
+        """
+        if self._monitor_task is not None and not self._monitor_task.done():
+            return
+        self._monitor_task = asyncio.create_task(self._monitor(on_connect), name="mongodb-monitor")
+
+    async def stop_monitor(self) -> None:
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._monitor_task = None
+
+    async def _monitor(self, on_connect: Optional[Callable[[], Awaitable[None]]]) -> None:
+        delay = self._config.reconnect_initial_seconds
+        while True:
+            if not self._connected:
+                try:
+                    await self.connect()
+                except Exception:
+                    pass
+            elif await self.check_connection_health():
+                if self._state != "up":
+                    logger.info("MongoDB reachable again")
+                self._set_state("up")
+            elif self._state == "up":
+                logger.error(f"MongoDB unreachable, failing database calls fast: {str(self._last_error)}")
+                self._set_state("down")
+
+            if self._state == "up":
+                if on_connect is not None:
+                    try:
+                        await on_connect()
+                    except Exception as e:
+                        logger.error(f"Database setup after connecting failed: {str(e)}")
+                    on_connect = None
+                delay = self._config.reconnect_initial_seconds
+                wait = self._config.health_interval_seconds
+            else:
+                wait = delay * random.uniform(0.5, 1.0)
+                delay = min(delay * 2, self._config.reconnect_max_seconds)
+            self._next_check_at = time.monotonic() + wait
+            await asyncio.sleep(wait)
+
+    def unavailable_error(self) -> DatabaseUnavailableError:
+        """The error get_database() raises while the server isn't up"""
+        retry_after = max(1, math.ceil(self._next_check_at - time.monotonic()))
+        reason = "Not connected to MongoDB yet" if self._state == "connecting" else "MongoDB is unreachable"
+        if self._last_error is not None:
+            reason = f"{reason}: {str(self._last_error)}"
+        return DatabaseUnavailableError(reason, original_error=self._last_error, retry_after=retry_after)
+
+    def status(self) -> Dict[str, Any]:
+        """Connection state, last probe and pool settings, for /healthz and /readyz"""
+        return {
+            "state": self._state,
+            "since": self._state_since,
+            "database": self._config.db_name,
+            "lastCheck": self._last_check,
+            "pingMs": round(self._last_ping_ms, 2) if self._last_ping_ms is not None else None,
+            "lastError": str(self._last_error) if self._last_error is not None and self._state != "up" else None,
+            "connectAttempts": self._attempts,
+            "pool": self._config.pool_settings(),
+        }
     
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[motor.motor_asyncio.AsyncIOMotorClientSession, None]:
@@ -216,15 +327,32 @@ class DatabaseConnection:
 # Global instance for backward compatibility
 _default_connection: Optional[DatabaseConnection] = None
 
+# Set by start_mongo_connection: get_database() then fails fast instead of connecting itself
+_monitored = False
+_config_error: Optional[Exception] = None
+
 async def get_database():
     """
     Returns database instance. Connects first if not connected.
     This is the main entry point for getting a database connection.
+    Once the API has started the connection monitor (start_mongo_connection),
+    it never waits for MongoDB: while the server isn't up it raises at once.
     Returns: AsyncIOMotorDatabase: The MongoDB database instance
-    Raises: DatabaseConnectionError: If connection fails
+    Raises:
+        DatabaseUnavailableError: If the monitored connection is not up
+        DatabaseConnectionError: If connection fails
     """
     global _default_connection
     
+    if _monitored:
+        if _default_connection is None:
+            raise DatabaseUnavailableError(
+                f"MongoDB is not configured: {str(_config_error)}", original_error=_config_error, retry_after=60
+            )
+        if _default_connection.state != "up":
+            raise _default_connection.unavailable_error()
+        return _default_connection.get_database()
+
     # Initialize connection if needed
     if _default_connection is None:
         _default_connection = DatabaseConnection()
@@ -236,12 +364,67 @@ async def get_database():
     # Return the database
     return _default_connection.get_database()
 
+async def start_mongo_connection(on_connect: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+    """
+    Start the API's MongoDB connection according to MONGODB_STARTUP_MODE.
+    - background (default): returns at once and connects in the background
+      with backoff; until the server is up get_database() raises
+      DatabaseUnavailableError, so the detector serves traffic meanwhile
+    - blocking: connects first and raises if that fails
+    Either way the server's health is probed periodically afterwards.
+    Args:
+        on_connect: Awaited once after the first successful connection (e.g. to create indexes)
+    Raises:
+        DatabaseConnectionError: In blocking mode, if the first connection fails
+        ValueError: In blocking mode, if the database configuration is missing
+    """
+    global _default_connection, _monitored, _config_error
+
+    if _default_connection is None:
+        try:
+            _default_connection = DatabaseConnection()
+        except Exception as e:
+            if os.getenv("MONGODB_STARTUP_MODE", "background").lower() == "blocking":
+                raise
+            # Detection doesn't need the database; report it as unavailable
+            logger.error(f"Database configuration error, running without MongoDB: {str(e)}")
+            _config_error = e
+            _monitored = True
+            return
+
+    if _default_connection._config.startup_mode == "blocking":
+        await _default_connection.connect()
+        if on_connect is not None:
+            await on_connect()
+            on_connect = None
+    _monitored = True
+    _default_connection.start_monitor(on_connect)
+
+def get_connection_status() -> Dict[str, Any]:
+    """State of the API's MongoDB connection (see DatabaseConnection.status)"""
+    if _default_connection is None:
+        return {
+            "state": "unconfigured" if _config_error is not None else "connecting",
+            "lastError": str(_config_error) if _config_error is not None else None,
+        }
+    return _default_connection.status()
+
 async def close_mongo_connection():
     """
-    Close the MongoDB connection and shutdown application
+    Close the MongoDB connection and shutdown application.
+    Queued writes are flushed (or journaled) first.
     """
     global _default_connection
+
+    # Imported here: the write buffer itself depends on this module
+    from app.services.database.write_buffer import drain_write_buffer
+    try:
+        await drain_write_buffer()
+    except Exception as e:
+        logger.error(f"Failed to drain write buffer: {str(e)}")
     
+    if _default_connection is not None:
+        await _default_connection.stop_monitor()
     if _default_connection is not None and _default_connection._connected:
         await _default_connection.disconnect()
         logger.info("MongoDB connection closed")
@@ -66,4 +66,45 @@ class DatabaseOperationError(Exception):
         if operation:
             self.message = f"{message} (operation: {operation})"
             
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+
+class InvalidQueryError(Exception):
+    """
+    Exception raised for invalid query parameters from a caller.
+    
+    This exception is raised when a list request carries a malformed
+    pagination cursor or asks for fields that don't exist, so routes
+    can answer 400 instead of 500.
+    
+    Attributes:
+        message (str): Explanation of the error
+        param (str, optional): Name of the query parameter causing the issue
+    """
+    
+    def __init__(self, message, param=None):
+        self.message = message
+        self.param = param
+        if param:
+            self.message = f"{message} (parameter: {param})"
+        super().__init__(self.message)
+
+
+class DatabaseUnavailableError(DatabaseConnectionError):
+    """
+    Exception raised when the database is known to be unreachable.
+    
+    This exception is raised at once by get_database() while the background
+    connection hasn't connected yet or the health probe finds the server
+    down, instead of waiting for the driver's server selection timeout, so
+    routes can answer 503 and writers can fall back to the write journal.
+    
+    Attributes:
+        message (str): Explanation of the error
+        original_error (Exception, optional): The last connection or probe failure
+        retry_after (int): Seconds until the next connection attempt or probe
+    """
+    
+    def __init__(self, message, original_error=None, retry_after=5):
+        self.retry_after = retry_after
+        super().__init__(message, original_error=original_error)
@@ -0,0 +1,222 @@
+"""
+Indexes for the prompts collection, and a query planner check.
+
+ensure_indexes() runs at API startup and creates every index the database
+actions rely on (creating an index that already exists is a no-op). With
+PROMPTS_RETENTION_DAYS set, a TTL index also deletes prompts older than
+that many days.
+
+The check runs explain() on the query of each database action and fails if
+any of them would scan the whole collection (COLLSCAN), sort in memory (SORT)
+or use another index than the one meant for it, e.g. after a query changes
+shape without a matching index. A full walk of the _id index passes a
+COLLSCAN-only check, so the expected index is checked too:
+
+Command line (from the api directory, with the api .env in place):
+    python -m app.services.database.indexes ensure
+    python -m app.services.database.indexes check      # exits 1 if any plan fails
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from app.services.database.connection import get_database, close_mongo_connection
+from app.services.database.pagination import PAGE_SORT, DEFAULT_PAGE_SIZE, page_filter, encode_cursor
+from app.services.database.actions.prompts.exportPrompts import EXPORT_SORT
+
+logger = logging.getLogger(__name__)
+
+TTL_INDEX_NAME = "created_at_ttl"
+
+PROMPT_INDEXES = [
+    # /prompts pages and time ranges, newest first
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+    # /prompts/attacks and /prompts/clean pages
+    IndexModel(
+        [("isAttack", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="isAttack_created_at_id"
+    ),
+    # /prompts/attacks/{type} pages
+    IndexModel(
+        [("isAttack", ASCENDING), ("attackType", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="isAttack_attackType_created_at_id"
+    ),
+]
+
+
+def retention_days() -> Optional[int]:
+    """PROMPTS_RETENTION_DAYS, or None to keep prompts forever"""
+    value = os.getenv("PROMPTS_RETENTION_DAYS", "")
+    return int(value) if value else None
+
+
+async def ensure_indexes(db: Optional[AsyncIOMotorDatabase] = None) -> List[str]:
+    """
+    Create the prompts collection's indexes and apply the retention setting.
+    Args:
+        db: Optional database. Defaults to get_database().
+    Returns:
+        Names of the indexes on the collection afterwards
+    """
+    db = db if db is not None else await get_database()
+    collection = db.prompts
+    await collection.create_indexes(PROMPT_INDEXES)
+
+    existing = await collection.index_information()
+    days = retention_days()
+    if days is not None:
+        seconds = days * 24 * 3600
+        current = existing.get(TTL_INDEX_NAME, {}).get("expireAfterSeconds")
+        if current is None:
+            await collection.create_index([("created_at", ASCENDING)], name=TTL_INDEX_NAME, expireAfterSeconds=seconds)
+            logger.info(f"Prompts older than {days} days will be deleted")
+        elif current != seconds:
+            # Change the TTL in place instead of rebuilding the index
+            await db.command("collMod", collection.name, index={"name": TTL_INDEX_NAME, "expireAfterSeconds": seconds})
+            logger.info(f"Prompt retention changed to {days} days")
+    elif TTL_INDEX_NAME in existing:
+        await collection.drop_index(TTL_INDEX_NAME)
+        logger.info("Prompt retention disabled, TTL index dropped")
+
+    names = sorted((await collection.index_information()).keys())
+    logger.info(f"Prompts indexes: {', '.join(names)}")
+    return names
+
+
+def _query_shapes() -> List[Dict[str, Any]]:
+    """
+    The find() queries the database actions send, with realistic parameters,
+    and the indexes allowed to serve them (None: any index).
+    Keep in sync with the actions: a new query shape belongs here too.
+    """
+    now = datetime.utcnow()
+    cursor = encode_cursor({"created_at": now, "_id": ObjectId()})
+    window = {"since": now - timedelta(days=7), "until": now}
+    shapes = []
+    for name, base_filter, index in [
+        ("getAllPrompts", {}, "created_at_id"),
+        ("getAllAttacks", {"isAttack": True}, "isAttack_created_at_id"),
+        ("getAllCleanPrompts", {"isAttack": False}, "isAttack_created_at_id"),
+        ("getAttackByType", {"isAttack": True, "attackType": "jailbreak"}, "isAttack_attackType_created_at_id"),
+    ]:
+        indexes = [index]
+        shapes.append({"name": name, "filter": page_filter(base_filter), "sort": PAGE_SORT, "indexes": indexes})
+        shapes.append({"name": f"{name} (next page)", "filter": page_filter(base_filter, after=cursor),
+                       "sort": PAGE_SORT, "indexes": indexes})
+        shapes.append({"name": f"{name} (time range)", "filter": page_filter(base_filter, **window),
+                       "sort": PAGE_SORT, "indexes": indexes})
+    for name, base_filter, index in [
+        ("exportPrompts (attacks)", {"isAttack": True}, "isAttack_created_at_id"),
+        ("exportPrompts (attack type)", {"isAttack": True, "attackType": "jailbreak"}, "isAttack_attackType_created_at_id"),
+    ]:
+        shapes.append({"name": name, "filter": page_filter(base_filter), "sort": EXPORT_SORT, "indexes": [index]})
+        shapes.append({"name": f"{name} (time range)", "filter": page_filter(base_filter, **window),
+                       "sort": EXPORT_SORT, "indexes": [index]})
+    shapes.append({"name": "getPromptStats (window)", "filter": page_filter({}, **window), "sort": None,
+                   "indexes": ["created_at_id", TTL_INDEX_NAME]})
+    return shapes
+
+
+def _stages(plan: Dict[str, Any]) -> List[str]:
+    """Every stage name in a query plan tree"""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _stages(child)
+    return stages
+
+
+def _index_names(plan: Dict[str, Any]) -> List[str]:
+    """Names of the indexes scanned anywhere in a query plan tree"""
+    names = [plan["indexName"]] if "indexName" in plan else []
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            names += _index_names(plan[key])
+    for child in plan.get("inputStages", []):
+        names += _index_names(child)
+    return names
+
+
+async def check_query_plans(db: Optional[AsyncIOMotorDatabase] = None) -> List[Dict[str, Any]]:
+    """
+    Explain each action's query and report the stages of its winning plan.
+    Returns:
+        One dict per query: name, stages, indexes, collscan (True if the whole
+        collection is scanned), sort (True if the server sorts in memory),
+        wrongIndex (True if none of the expected indexes is used) and ok
+    """
+    db = db if db is not None else await get_database()
+    results = []
+    for shape in _query_shapes():
+        command = {"find": "prompts", "filter": shape["filter"], "limit": DEFAULT_PAGE_SIZE + 1}
+        if shape["sort"]:
+            command["sort"] = dict(shape["sort"])
+        explain = await db.command("explain", command, verbosity="queryPlanner")
+        plan = explain["queryPlanner"]["winningPlan"]
+        stages = _stages(plan)
+        indexes = _index_names(plan)
+        collscan = "COLLSCAN" in stages
+        sort = "SORT" in stages
+        wrong_index = shape["indexes"] is not None and not any(name in shape["indexes"] for name in indexes)
+        results.append({
+            "name": shape["name"],
+            "stages": stages,
+            "indexes": indexes,
+            "collscan": collscan,
+            "sort": sort,
+            "wrongIndex": wrong_index,
+            "ok": not (collscan or sort or wrong_index),
+        })
+    return results
+
+
+async def _main(command: str) -> int:
+    try:
+        if command == "ensure":
+            for name in await ensure_indexes():
+                print(name)
+            return 0
+        results = await check_query_plans()
+    finally:
+        await close_mongo_connection()
+
+    failed = False
+    for result in results:
+        if result["collscan"]:
+            status = "COLLSCAN"
+        elif result["sort"]:
+            status = "SORT"
+        elif result["wrongIndex"]:
+            status = "INDEX"
+        else:
+            status = "ok"
+        failed = failed or not result["ok"]
+        indexes = f"  [{', '.join(result['indexes'])}]" if result["indexes"] else ""
+        print(f"{status:<9}{result['name']:<48}{' <- '.join(result['stages'])}{indexes}")
+    if failed:
+        print("Some queries scan the whole collection, sort in memory or miss their index, run "
+              "'python -m app.services.database.indexes ensure' or add an index for them", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point for creating indexes and checking query plans"""
+    parser = argparse.ArgumentParser(description="Manage the prompts collection's indexes")
+    parser.add_argument("command", choices=["ensure", "check"])
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return asyncio.run(_main(args.command))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import base64
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.services.database.exceptions import InvalidQueryError
+from app.services.database.prompt_bodies import PREVIEW_PROJECTION, get_prompt_body_store
+from app.services.database.rollups import naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Fields a caller may ask for; _id and created_at are always returned since the cursor is built from them
+PROMPT_FIELDS = ("prompt", "isAttack", "attackType", "confidence", "matches", "created_at")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Newest first; _id breaks ties between prompts stored in the same instant
+PAGE_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past a document: base64 of "<created_at ISO>|<_id hex>" """
+    raw = f"{document['created_at'].isoformat()}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decode a cursor made by encode_cursor.
+    Raises: InvalidQueryError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, object_id = raw.split("|")
+        return datetime.fromisoformat(created_at), ObjectId(object_id)
+    except Exception:
+        raise InvalidQueryError("Invalid pagination cursor", param="after")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    """
+    Turn a comma separated field list (e.g. "isAttack,attackType") into a projection.
+    Returns: The projection, or None for all fields
+    Raises: InvalidQueryError: If an unknown field is requested
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROMPT_FIELDS]
+    if unknown:
+        raise InvalidQueryError(
+            f"Unknown fields {', '.join(unknown)}, allowed: {', '.join(PROMPT_FIELDS)}",
+            param="fields"
+        )
+    projection = {name: 1 for name in names}
+    projection["created_at"] = 1
+    return projection
+
+
+def list_projection(fields: Optional[str] = None, full_prompts: bool = False) -> Dict[str, Any]:
+    """
+    Projection for a list page. "prompt" is cut to a preview on the server and
+    comes with "promptLength" and "promptTruncated", unless full_prompts is set.
+    Raises: InvalidQueryError: If an unknown field is requested
+    """
+    projection: Dict[str, Any] = parse_fields(fields) or {name: 1 for name in PROMPT_FIELDS}
+    if "prompt" in projection:
+        if full_prompts:
+            # Deduplicated prompts hold a reference instead of the text (see prompt_bodies.py)
+            projection.update({"promptHash": 1, "promptPreview": 1, "promptLength": 1})
+        else:
+            projection.update(PREVIEW_PROJECTION)
+    return projection
+
+
+def time_range(
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Normalize a [since, until) range to naive UTC like the stored created_at
+    values, so parameters with and without a timezone offset compare.
+    Raises: InvalidQueryError: If since is not before until
+    """
+    since, until = naive_utc(since), naive_utc(until)
+    if since is not None and until is not None and since >= until:
+        raise InvalidQueryError("since must be before until", param="since")
+    return since, until
+
+
+def page_filter(
+    base_filter: Dict[str, Any],
+    after: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Add the time range and the keyset condition for `after` to a query.
+    since is inclusive, until exclusive.
+    Raises: InvalidQueryError: If the cursor or the time range is invalid
+    """
+    since, until = time_range(since, until)
+    query = dict(base_filter)
+    created_at: Dict[str, Any] = {}
+    if since is not None:
+        created_at["$gte"] = since
+    if until is not None:
+        created_at["$lt"] = until
+    if created_at:
+        query["created_at"] = created_at
+
+    if after is not None:
+        after_created_at, after_id = decode_cursor(after)
+        # Everything strictly "older" than the cursor in (created_at, _id) order
+        keyset = {"$or": [
+            {"created_at": {"$lt": after_created_at}},
+            {"created_at": after_created_at, "_id": {"$lt": after_id}},
+        ]}
+        query = {"$and": [query, keyset]} if query else keyset
+    return query
+
+
+async def fetch_page(
+    collection: AsyncIOMotorCollection,
+    base_filter: Dict[str, Any],
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    full_prompts: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Read one page of prompts, newest first.
+    Only limit + 1 documents are read from the server, so memory per request
+    stays the same however many prompts are stored.
+    Args:
+        collection: The prompts collection
+        base_filter: Query for the documents to list (e.g. {"isAttack": True})
+        limit: Page size, capped at MAX_PAGE_SIZE
+        after: Cursor from the previous page, or None for the first page
+        fields: Comma separated fields to return, or None for all
+        since: Only prompts created at or after this time
+        until: Only prompts created before this time
+        full_prompts: Return the whole prompt texts instead of previews
+    Returns:
+        The page's documents with string _ids, and the cursor for the next page
+        (None on the last page)
+    Raises:
+        InvalidQueryError: If the cursor or a field name is invalid
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = page_filter(base_filter, after, since, until)
+    cursor = collection.find(query, list_projection(fields, full_prompts)).sort(PAGE_SORT).limit(limit + 1).batch_size(limit + 1)
+
+    documents = []
+    next_cursor = None
+    async for document in cursor:
+        if len(documents) == limit:
+            # One extra document means there is another page
+            next_cursor = encode_cursor(documents[-1])
+            break
+        documents.append(document)
+
+    if full_prompts:
+        await get_prompt_body_store().restore(documents)
+    for document in documents:
+        document["_id"] = str(document["_id"])
+    return documents, next_cursor
+
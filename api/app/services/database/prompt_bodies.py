@@ -0,0 +1,415 @@
+"""
+Content-addressed storage for prompt texts, and the previews the lists return.
+
+Attack traffic repeats the same templates over and over. With
+PROMPT_STORAGE=dedup, each distinct prompt text is stored once in the
+prompt_bodies collection, keyed by its SHA-256, optionally zlib compressed,
+with a counter of the prompts that used it. The prompt document keeps the
+hash, its length and a short preview instead of the text:
+
+    prompts:       {"_id", "promptHash", "promptPreview", "promptLength", "isAttack", ...}
+    prompt_bodies: {"_id": <sha256 hex>, "body", "encoding", "length", "bytes",
+                    "storedBytes", "hits", "firstSeen", "lastSeen"}
+
+Prompts shorter than PROMPT_DEDUP_MIN_CHARS, and everything stored before
+dedup was turned on, keep the text inline in "prompt". Readers handle both.
+
+The list endpoints return a preview of every prompt (PROMPT_PREVIEW_CHARS),
+cut on the server by the query projection, so long prompts are never read
+from disk or sent for a list page.
+
+Command line (from the api directory, with the api .env in place):
+    python -m app.services.database.prompt_bodies report
+    python -m app.services.database.prompt_bodies prune    # bodies only expired prompts used
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import zlib
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.services.database.connection import get_database, close_mongo_connection
+from app.services.database.exceptions import DatabaseOperationError
+
+logger = logging.getLogger(__name__)
+
+BODIES_COLLECTION = "prompt_bodies"
+
+STORAGE_MODES = ("inline", "dedup")
+COMPRESSIONS = ("none", "zlib")
+
+# Characters of each prompt the list endpoints return
+PROMPT_PREVIEW_CHARS = int(os.getenv("PROMPT_PREVIEW_CHARS", "200"))
+
+# Fields of a deduplicated prompt that replace "prompt"
+BODY_REFERENCE_FIELDS = ("promptHash", "promptPreview", "promptLength")
+
+# MongoDB error code for a duplicate _id: two upserts of a new body raced
+DUPLICATE_KEY_ERROR = 11000
+
+ZLIB_LEVEL = 6
+
+# The prompt text, whether inline or deduplicated ($ifNull takes the first one present)
+_TEXT = {"$ifNull": ["$promptPreview", "$prompt", ""]}
+_LENGTH = {"$ifNull": ["$promptLength", {"$strLenCP": {"$ifNull": ["$prompt", ""]}}]}
+_PREVIEW = {"$substrCP": [_TEXT, 0, PROMPT_PREVIEW_CHARS]}
+
+_TRUNCATED = {"$gt": [_LENGTH, {"$strLenCP": _PREVIEW}]}
+
+# Projection computing the list fields on the server, for both storage layouts.
+# promptLength and promptTruncated are only sent for prompts that were cut
+PREVIEW_PROJECTION = {
+    "prompt": _PREVIEW,
+    "promptLength": {"$cond": [_TRUNCATED, _LENGTH, "$$REMOVE"]},
+    "promptTruncated": {"$cond": [_TRUNCATED, True, "$$REMOVE"]},
+}
+
+
+def prompt_hash(text: str) -> str:
+    """SHA-256 of the prompt's UTF-8 bytes, as hex"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def preview_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The list form of a stored prompt, computed like PREVIEW_PROJECTION: "prompt"
+    cut to PROMPT_PREVIEW_CHARS, plus "promptLength" and "promptTruncated" if it was cut
+    """
+    preview = {key: value for key, value in document.items() if key not in BODY_REFERENCE_FIELDS}
+    text = document.get("promptPreview")
+    if text is None:
+        text = document.get("prompt") or ""
+    length = document.get("promptLength")
+    if length is None:
+        length = len(document.get("prompt") or "")
+    preview["prompt"] = text[:PROMPT_PREVIEW_CHARS]
+    if length > len(preview["prompt"]):
+        preview["promptLength"] = length
+        preview["promptTruncated"] = True
+    return preview
+
+
+def encode_body(text: str, compression: str = "zlib") -> Dict[str, Any]:
+    """
+    The stored form of a prompt text. zlib is only kept when it makes the body smaller.
+    Returns: Dict with body (str, or bytes when compressed), encoding, length, bytes and storedBytes
+    """
+    raw = text.encode("utf-8")
+    if compression == "zlib":
+        compressed = zlib.compress(raw, ZLIB_LEVEL)
+        if len(compressed) < len(raw):
+            return {"body": compressed, "encoding": "zlib", "length": len(text),
+                    "bytes": len(raw), "storedBytes": len(compressed)}
+    return {"body": text, "encoding": "utf-8", "length": len(text), "bytes": len(raw), "storedBytes": len(raw)}
+
+
+def decode_body(document: Dict[str, Any]) -> str:
+    """The prompt text of a prompt_bodies document"""
+    if document.get("encoding") == "zlib":
+        return zlib.decompress(document["body"]).decode("utf-8")
+    return document["body"]
+
+
+def compact_document(document: Dict[str, Any], digest: str, preview_chars: int = PROMPT_PREVIEW_CHARS) -> Dict[str, Any]:
+    """A copy of a prompt document with "prompt" replaced by a reference to its body"""
+    compact = {}
+    for key, value in document.items():
+        if key == "prompt":
+            compact["promptHash"] = digest
+            compact["promptPreview"] = value[:preview_chars]
+            compact["promptLength"] = len(value)
+        else:
+            compact[key] = value
+    return compact
+
+
+class PromptBodyStore:
+    """
+    PromptBodyStore writes and reads the prompt_bodies collection.
+
+    Features:
+    - compact() turns a batch of prompt documents into the form to insert,
+      writing each distinct long prompt text once with a single unordered
+      bulk upsert; repeated texts only increment the body's hit counter
+    - restore() puts the full text back into documents read from the
+      prompts collection, with one query per batch
+    - A body is written before the prompts that reference it, so a reference
+      never points at a missing body. If the prompt insert then fails and is
+      retried (e.g. from the write journal), the hits are counted again, so
+      hits is an upper bound
+
+    Configuration (environment variables):
+    - PROMPT_STORAGE: "inline" (default) or "dedup"
+    - PROMPT_DEDUP_MIN_CHARS: Shorter prompts stay inline (default 512)
+    - PROMPT_BODY_COMPRESSION: "zlib" (default) or "none"
+    - PROMPT_PREVIEW_CHARS: Characters kept on the prompt and returned by lists (default 200)
+    """
+
+    def __init__(self):
+        self.mode = os.getenv("PROMPT_STORAGE", "inline").lower()
+        if self.mode not in STORAGE_MODES:
+            logger.warning(f"Unknown PROMPT_STORAGE '{self.mode}', storing prompts inline")
+            self.mode = "inline"
+        self.min_chars = max(PROMPT_PREVIEW_CHARS + 1, int(os.getenv("PROMPT_DEDUP_MIN_CHARS", "512")))
+        self.compression = os.getenv("PROMPT_BODY_COMPRESSION", "zlib").lower()
+        if self.compression not in COMPRESSIONS:
+            logger.warning(f"Unknown PROMPT_BODY_COMPRESSION '{self.compression}', storing bodies uncompressed")
+            self.compression = "none"
+
+        self._deduplicated = 0
+        self._inline = 0
+        self._new_bodies = 0
+        self._raw_bytes = 0
+        self._stored_bytes = 0
+        self._restored = 0
+        self._missing = 0
+        self._errors = 0
+
+    @property
+    def dedup(self) -> bool:
+        return self.mode == "dedup"
+
+    async def compact(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Store the long prompt texts of a batch in prompt_bodies.
+        Args:
+            documents: Prompt documents with the full "prompt"; they are not modified
+        Returns:
+            The documents to insert into prompts, in the same order (the same
+            list when dedup is off)
+        Raises:
+            DatabaseOperationError: If the bodies could not be written
+        """
+        if not self.dedup:
+            return documents
+
+        compacted = []
+        bodies: Dict[str, List[Any]] = {}
+        for document in documents:
+            text = document.get("prompt")
+            if not isinstance(text, str) or len(text) < self.min_chars:
+                self._inline += 1
+                compacted.append(document)
+                continue
+            digest = prompt_hash(text)
+            seen = document.get("created_at") or datetime.utcnow()
+            if digest in bodies:
+                body = bodies[digest]
+                body[1] += 1
+                body[2] = min(body[2], seen)
+                body[3] = max(body[3], seen)
+            else:
+                bodies[digest] = [text, 1, seen, seen]
+            compacted.append(compact_document(document, digest))
+
+        if bodies:
+            await self._upsert(bodies)
+        return compacted
+
+    async def _upsert(self, bodies: Dict[str, List[Any]]) -> None:
+        operations = []
+        encoded = {}
+        for digest, (text, hits, first_seen, last_seen) in bodies.items():
+            encoded[digest] = encode_body(text, self.compression)
+            operations.append(UpdateOne(
+                {"_id": digest},
+                {
+                    "$setOnInsert": {**encoded[digest], "firstSeen": first_seen},
+                    "$inc": {"hits": hits},
+                    "$max": {"lastSeen": last_seen},
+                },
+                upsert=True
+            ))
+
+        db = await get_database()
+        upserted = []
+        for attempt in range(2):
+            try:
+                result = await db[BODIES_COLLECTION].bulk_write(operations, ordered=False)
+                upserted.extend(result.upserted_ids.values())
+                break
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if attempt == 0 and all(error.get("code") == DUPLICATE_KEY_ERROR for error in errors):
+                    # Another writer inserted the same new body first; the retry updates it
+                    upserted.extend(row["_id"] for row in e.details.get("upserted", []))
+                    failed = {error.get("index") for error in errors}
+                    operations = [operation for index, operation in enumerate(operations) if index in failed]
+                    continue
+                self._errors += 1
+                raise DatabaseOperationError(
+                    f"Failed to store prompt bodies: {errors[0].get('errmsg') if errors else str(e)}",
+                    operation="compact", original_error=e
+                )
+            except Exception as e:
+                self._errors += 1
+                raise DatabaseOperationError(f"Failed to store prompt bodies: {str(e)}", operation="compact", original_error=e)
+
+        for digest, body in encoded.items():
+            self._deduplicated += bodies[digest][1]
+            self._raw_bytes += body["bytes"] * bodies[digest][1]
+        for digest in upserted:
+            self._new_bodies += 1
+            self._stored_bytes += encoded[digest]["storedBytes"]
+
+    async def restore(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Replace body references with the full prompt text, in place.
+        Documents stored inline are left as they are. If a body is missing
+        the preview is returned instead and a warning logged.
+        Args:
+            documents: Prompt documents as read from the prompts collection
+        Returns:
+            The same documents
+        """
+        digests = {document["promptHash"] for document in documents if document.get("promptHash")}
+        texts: Dict[str, str] = {}
+        if digests:
+            db = await get_database()
+            async for body in db[BODIES_COLLECTION].find({"_id": {"$in": list(digests)}}):
+                texts[body["_id"]] = decode_body(body)
+            missing = digests - texts.keys()
+            if missing:
+                self._missing += len(missing)
+                logger.warning(f"{len(missing)} prompt bodies not found, returning previews")
+            self._restored += len(texts)
+
+        for document in documents:
+            digest = document.pop("promptHash", None)
+            preview = document.pop("promptPreview", None)
+            document.pop("promptLength", None)
+            if digest is not None:
+                document["prompt"] = texts.get(digest, preview)
+        return documents
+
+    async def report(self) -> Dict[str, Any]:
+        """
+        Storage saved by deduplication, from the prompt_bodies collection:
+        the bytes the texts would take inline against the bytes stored once
+        """
+        db = await get_database()
+        rows = await db[BODIES_COLLECTION].aggregate([
+            {"$group": {
+                "_id": None,
+                "bodies": {"$sum": 1},
+                "prompts": {"$sum": "$hits"},
+                "inlineBytes": {"$sum": {"$multiply": ["$bytes", "$hits"]}},
+                "rawBytes": {"$sum": "$bytes"},
+                "storedBytes": {"$sum": "$storedBytes"},
+            }}
+        ]).to_list(length=1)
+        totals = rows[0] if rows else {"bodies": 0, "prompts": 0, "inlineBytes": 0, "rawBytes": 0, "storedBytes": 0}
+        totals.pop("_id", None)
+        totals["savedBytes"] = totals["inlineBytes"] - totals["storedBytes"]
+        totals["savedFraction"] = totals["savedBytes"] / totals["inlineBytes"] if totals["inlineBytes"] else 0.0
+        return totals
+
+    async def prune(self, days: Optional[int] = None, force: bool = False) -> int:
+        """
+        Delete bodies last used more than `days` days ago. Every prompt
+        referencing such a body was created before it too, so once the
+        retention TTL (PROMPTS_RETENTION_DAYS) has deleted prompts of that
+        age none is left. That only holds for days >= the retention period.
+        Args:
+            days: Days since last use. Defaults to PROMPTS_RETENTION_DAYS.
+            force: Prune although PROMPTS_RETENTION_DAYS is unset (prompts are
+                kept forever, so old prompts lose their text)
+        Returns: The number of bodies deleted
+        Raises:
+            ValueError: If days is shorter than the retention period, or no
+                retention is set and force isn't
+        """
+        # Imported here, indexes imports this module through pagination
+        from app.services.database.indexes import retention_days
+
+        retention = retention_days()
+        if retention is None and not force:
+            raise ValueError("PROMPTS_RETENTION_DAYS is not set, so prompts are kept forever and still use their bodies")
+        days = days if days is not None else retention
+        if days is None:
+            raise ValueError("Set PROMPTS_RETENTION_DAYS or pass days")
+        if retention is not None and days < retention:
+            raise ValueError(f"days ({days}) is shorter than PROMPTS_RETENTION_DAYS ({retention}), live prompts still use those bodies")
+
+        older_than = datetime.utcnow() - timedelta(days=days)
+        db = await get_database()
+        result = await db[BODIES_COLLECTION].delete_many({"lastSeen": {"$lt": older_than}})
+        logger.info(f"Pruned {result.deleted_count} prompt bodies last used before {older_than.isoformat()}")
+        return result.deleted_count
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "storage": self.mode,
+            "compression": self.compression,
+            "minChars": self.min_chars,
+            "previewChars": PROMPT_PREVIEW_CHARS,
+            "deduplicatedPrompts": self._deduplicated,
+            "inlinePrompts": self._inline,
+            "newBodies": self._new_bodies,
+            "referencedBytes": self._raw_bytes,
+            "storedBytes": self._stored_bytes,
+            "restoredBodies": self._restored,
+            "missingBodies": self._missing,
+            "errors": self._errors,
+        }
+
+
+# Create a singleton instance
+_body_store_instance: Optional[PromptBodyStore] = None
+
+
+def get_prompt_body_store() -> PromptBodyStore:
+    """
+    Get the singleton instance of PromptBodyStore.
+    Returns: PromptBodyStore instance
+    """
+    global _body_store_instance
+    if _body_store_instance is None:
+        _body_store_instance = PromptBodyStore()
+    return _body_store_instance
+
+
+async def _main(command: str, days: Optional[int], force: bool) -> int:
+    store = get_prompt_body_store()
+    try:
+        if command == "prune":
+            try:
+                deleted = await store.prune(days, force=force)
+            except ValueError as e:
+                print(f"Not pruning: {str(e)}", file=sys.stderr)
+                return 1
+            print(f"Deleted {deleted} prompt bodies")
+            return 0
+        for key, value in (await store.report()).items():
+            print(f"{key:<14}{value:.1%}" if key == "savedFraction" else f"{key:<14}{value}")
+        return 0
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point for the prompt_bodies report and cleanup"""
+    parser = argparse.ArgumentParser(description="Manage the prompt_bodies collection")
+    parser.add_argument("command", choices=["report", "prune"])
+    parser.add_argument(
+        "--days", type=int, default=None,
+        help="prune: delete bodies unused for this many days, at least PROMPTS_RETENTION_DAYS (the default)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="prune: run although PROMPTS_RETENTION_DAYS is unset; prompts older than --days lose their text"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return asyncio.run(_main(args.command, args.days, args.force))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
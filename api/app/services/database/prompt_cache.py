@@ -0,0 +1,464 @@
+import asyncio
+import bisect
+import logging
+import os
+import secrets
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from pymongo.errors import OperationFailure
+
+from app.services.database.connection import get_database
+from app.services.database.pagination import (
+    PAGE_SORT, MAX_PAGE_SIZE, decode_cursor, encode_cursor, list_projection, time_range
+)
+from app.services.database.prompt_bodies import preview_document
+from app.services.database.write_buffer import get_write_buffer
+from app.services.database.rollups import CONFIDENCE_BINS, truncate, naive_utc, confidence_bin, confidence_moments
+from app.services.database.actions.prompts.getPromptStats import load_prompt_stats, STATS_MAX_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# OperationFailure codes meaning change streams aren't available (standalone server, no majority read concern)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324, 136}
+
+
+def _sort_key(document: Dict[str, Any]) -> Tuple[datetime, str]:
+    # ObjectId hex strings sort like the ObjectIds themselves
+    return document["created_at"], str(document["_id"])
+
+
+class PromptCache:
+    """
+    PromptCache keeps a materialized, in-memory view of the prompts collection
+    for the dashboard endpoints.
+
+    Features:
+    - The newest PROMPT_CACHE_SIZE prompts, kept in (created_at, _id) order,
+      serve list pages (first page and following cursors) without a query;
+      requests reaching past the cached window fall through to MongoDB.
+      Only the list form of each prompt is kept, with a preview of its text
+    - Totals, attack counts per type, confidence histograms and time series
+      for /prompts/stats without a window, updated per new prompt
+    - Kept current from a change stream on the prompts collection; on a
+      server without change streams (standalone mongod) it polls for new
+      prompts by created_at instead, with an overlap for late writes from
+      the write-behind buffer. Writes later than the overlap (journal
+      replays, flushes after an outage) are reported by the buffer and
+      trigger a resync at the next poll
+    - A version bumped on every change, exposed as an ETag so unchanged
+      dashboard polls get 304 Not Modified
+    - Deletes are applied one by one: a deleted prompt leaves the window and,
+      if it was in the window, the counters. A delete event carries only the
+      _id, so deletes of older prompts (the retention TTL removes the oldest)
+      are left to the periodic resync
+    - Updates and replaces (manual edits) are coalesced into one resync
+      PROMPT_CACHE_RESYNC_DELAY_SECONDS after the first of them; the periodic
+      resync also corrects the counters for prompts stored while a resync ran,
+      and catches deletes in polling mode
+
+    Configuration (environment variables):
+    - PROMPT_CACHE_ENABLED: "true" or "false" (default true)
+    - PROMPT_CACHE_SIZE: Prompts kept in memory (default 5000)
+    - PROMPT_CACHE_POLL_SECONDS: Polling interval without change streams (default 2)
+    - PROMPT_CACHE_POLL_OVERLAP_SECONDS: How far back each poll looks again (default 10)
+    - PROMPT_CACHE_RESYNC_SECONDS: Full resync interval (default 900)
+    - PROMPT_CACHE_RESYNC_DELAY_SECONDS: Delay of the resync after an update (default 5)
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+        self.size = max(MAX_PAGE_SIZE, int(os.getenv("PROMPT_CACHE_SIZE", "5000")))
+        self.poll_seconds = float(os.getenv("PROMPT_CACHE_POLL_SECONDS", "2"))
+        self.poll_overlap = timedelta(seconds=float(os.getenv("PROMPT_CACHE_POLL_OVERLAP_SECONDS", "10")))
+        self.resync_seconds = float(os.getenv("PROMPT_CACHE_RESYNC_SECONDS", "900"))
+        self.resync_delay = float(os.getenv("PROMPT_CACHE_RESYNC_DELAY_SECONDS", "5"))
+
+        self._task: Optional[asyncio.Task] = None
+        self._synced = False
+        self._mode = "starting"
+        # Generation and version restart from 0 in every process, so the ETag also
+        # names this process; a restarted or different replica never matches old tags
+        self._instance = secrets.token_hex(4)
+        self._generation = 0
+        self._version = 0
+        self._resync_requested = False
+
+        # Materialized state, oldest first
+        self._documents: List[Dict[str, Any]] = []
+        self._keys: List[Tuple[datetime, str]] = []
+        self._ids: set = set()
+        self._complete = False
+        self._reset_counters()
+
+        # Counters
+        self._hits = 0
+        self._misses = 0
+        self._applied = 0
+        self._deleted = 0
+        self._resyncs = 0
+
+    def _reset_counters(self) -> None:
+        self._total = 0
+        self._attacks = 0
+        self._by_type: Counter = Counter()
+        self._confidence_attacks = [0] * (len(CONFIDENCE_BINS) - 1)
+        self._confidence_clean = [0] * (len(CONFIDENCE_BINS) - 1)
+        # Count, sum and sum of squares of the confidence scores
+        self._moments = [0, 0.0, 0.0]
+        self._first: Optional[datetime] = None
+        self._last: Optional[datetime] = None
+        # Time series per bucket unit, seeded on first use: {unit: {bucket start: [total, attacks]}}
+        self._series: Dict[str, Dict[datetime, List[int]]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self._synced
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Validator for every cached response; changes whenever the collection does"""
+        if not self.ready:
+            return None
+        return f'W/"prompts-{self._instance}-{self._generation}-{self._version}"'
+
+    async def start(self) -> None:
+        """Start keeping the cache current in the background"""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        get_write_buffer().add_write_listener(self._on_buffered_write)
+        self._task = asyncio.create_task(self._run(), name="prompt-cache")
+
+    def _on_buffered_write(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Polling only looks poll_overlap behind the newest cached prompt. A batch
+        written later than that keeps its original created_at and would be missed
+        until the periodic resync (with a stale ETag meanwhile), so resync sooner.
+        A change stream reports such inserts like any other.
+        """
+        if self._mode != "polling" or self._last is None:
+            return
+        watermark = self._last - self.poll_overlap
+        if any(naive_utc(document["created_at"]) < watermark for document in documents):
+            self._resync_requested = True
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._synced = False
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                await self._follow_change_stream()
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    logger.info(f"Change streams unavailable ({str(e)}), prompt cache will poll created_at")
+                    await self._poll()
+                    return
+                logger.error(f"Prompt cache change stream failed: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Prompt cache change stream failed: {str(e)}")
+            # Serve from MongoDB until the next successful resync
+            self._synced = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def _follow_change_stream(self) -> None:
+        db = await get_database()
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "delete", "update", "replace", "drop", "invalidate"]}}}]
+        # Open the stream before reading the snapshot so no change falls in between
+        async with db.prompts.watch(pipeline, max_await_time_ms=1000) as stream:
+            await self._resync()
+            self._mode = "changeStream"
+            resync_at = time.monotonic() + self.resync_seconds
+            # Set by the first update or replace; a burst of them costs one resync
+            resync_soon_at: Optional[float] = None
+            while stream.alive:
+                # None when nothing changed within max_await_time_ms
+                change = await stream.try_next()
+                if change is not None and change["operationType"] == "insert":
+                    self._apply_insert(change["fullDocument"])
+                elif change is not None and change["operationType"] == "delete":
+                    # As frequent as inserts once the retention TTL runs, so never a resync
+                    self._apply_delete(change["documentKey"]["_id"])
+                elif change is not None and resync_soon_at is None:
+                    # Rare (manual edits): rebuild instead of reversing counters
+                    resync_soon_at = time.monotonic() + self.resync_delay
+                now = time.monotonic()
+                if now >= resync_at or (resync_soon_at is not None and now >= resync_soon_at):
+                    await self._resync()
+                    resync_at = time.monotonic() + self.resync_seconds
+                    resync_soon_at = None
+
+    async def _poll(self) -> None:
+        self._mode = "polling"
+        while True:
+            try:
+                await self._resync()
+                resync_at = time.monotonic() + self.resync_seconds
+                while time.monotonic() < resync_at and not self._resync_requested:
+                    await asyncio.sleep(self.poll_seconds)
+                    await self._poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Prompt cache poll failed: {str(e)}")
+                self._synced = False
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _poll_once(self) -> None:
+        """Read prompts created since the newest cached one, minus an overlap for late writes"""
+        db = await get_database()
+        watermark = self._last - self.poll_overlap if self._last else datetime.min
+        cursor = db.prompts.find({"created_at": {"$gte": watermark}}, list_projection()).sort([("created_at", 1), ("_id", 1)])
+        async for document in cursor:
+            self._apply_insert(document)
+
+    async def _resync(self) -> None:
+        """Reload the newest prompts and the counters from MongoDB"""
+        # Cleared before reading, so a late write reported meanwhile asks for another resync
+        self._resync_requested = False
+        db = await get_database()
+        documents = await db.prompts.find({}, list_projection()).sort(PAGE_SORT).limit(self.size + 1).to_list(length=self.size + 1)
+        stats = await load_prompt_stats(None, None, "day")
+
+        self._complete = len(documents) <= self.size
+        documents = list(reversed(documents[:self.size]))
+        for document in documents:
+            document["_id"] = str(document["_id"])
+        self._documents = documents
+        self._keys = [_sort_key(document) for document in documents]
+        self._ids = {document["_id"] for document in documents}
+
+        self._reset_counters()
+        self._total = stats["total"]
+        self._attacks = stats["attacks"]
+        self._by_type = Counter(stats["byType"])
+        self._confidence_attacks = list(stats["confidence"]["attacks"])
+        self._confidence_clean = list(stats["confidence"]["clean"])
+        # Back from mean and standard deviation to count, sum and sum of squares
+        count = sum(self._confidence_attacks) + sum(self._confidence_clean)
+        mean, std = stats["confidence"]["mean"] or 0.0, stats["confidence"]["std"] or 0.0
+        self._moments = [count, mean * count, (std * std + mean * mean) * count]
+        self._first = stats["firstPromptAt"]
+        self._last = stats["lastPromptAt"]
+        self._series["day"] = {row["start"]: [row["total"], row["attacks"]] for row in stats["series"]}
+
+        self._generation += 1
+        self._version = 0
+        self._synced = True
+        self._resyncs += 1
+        logger.info(f"Prompt cache synced: {len(documents)} prompts in memory, {self._total} in total")
+
+    def _apply_insert(self, document: Dict[str, Any]) -> None:
+        """Add a newly stored prompt to the cached window and counters"""
+        document = preview_document(document)
+        document["_id"] = str(document["_id"])
+        if document["_id"] in self._ids:
+            return
+        key = _sort_key(document)
+        if not self._complete and self._keys and key < self._keys[0]:
+            # Older than the cached window. A change stream only reports new prompts, but a poll's
+            # overlap can reach past the window too and re-read counted ones; the resync counts those
+            if self._mode == "polling":
+                return
+        else:
+            index = bisect.bisect(self._keys, key)
+            self._keys.insert(index, key)
+            self._documents.insert(index, document)
+            self._ids.add(document["_id"])
+            if len(self._documents) > self.size:
+                evicted = self._documents.pop(0)
+                self._keys.pop(0)
+                self._ids.discard(evicted["_id"])
+                self._complete = False
+
+        self._count(document, 1)
+        created_at = document["created_at"]
+        self._first = created_at if self._first is None else min(self._first, created_at)
+        self._last = created_at if self._last is None else max(self._last, created_at)
+
+        self._version += 1
+        self._applied += 1
+
+    def _apply_delete(self, document_id: Any) -> None:
+        """
+        Drop a deleted prompt from the cached window and take it off the counters.
+        A delete event only carries the _id, so a prompt older than the window
+        stays counted until the next periodic resync.
+        """
+        document_id = str(document_id)
+        if document_id not in self._ids:
+            return
+        index = next(i for i, document in enumerate(self._documents) if document["_id"] == document_id)
+        document = self._documents.pop(index)
+        self._keys.pop(index)
+        self._ids.discard(document_id)
+        self._count(document, -1)
+
+        self._version += 1
+        self._deleted += 1
+
+    def _count(self, document: Dict[str, Any], sign: int) -> None:
+        """Add a prompt to (sign 1) or take it off (sign -1) the totals, histograms and time series"""
+        is_attack = bool(document.get("isAttack"))
+        self._total += sign
+        if is_attack:
+            self._attacks += sign
+            attack_type = document.get("attackType") or "unknown"
+            self._by_type[attack_type] += sign
+            if self._by_type[attack_type] <= 0:
+                del self._by_type[attack_type]
+        index = confidence_bin(document.get("confidence"))
+        if index is not None:
+            confidence = document["confidence"]
+            (self._confidence_attacks if is_attack else self._confidence_clean)[index] += sign
+            self._moments[0] += sign
+            self._moments[1] += sign * confidence
+            self._moments[2] += sign * confidence * confidence
+        for unit, series in self._series.items():
+            bucket = series.setdefault(truncate(document["created_at"], unit), [0, 0])
+            bucket[0] += sign
+            bucket[1] += sign * int(is_attack)
+            if bucket[0] <= 0:
+                del series[truncate(document["created_at"], unit)]
+
+    def page(
+        self,
+        base_filter: Dict[str, Any],
+        limit: int,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Serve a list page from memory, with the same results as fetch_page.
+        Args:
+            base_filter: Equality filter on isAttack and/or attackType
+        Returns:
+            The page and next cursor, or None if the page reaches past the cached window
+        Raises:
+            InvalidQueryError: If the cursor, fields or time range are invalid
+        """
+        since, until = time_range(since, until)
+        if not self.ready:
+            return None
+        projection = list_projection(fields)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        # Walk newest first, starting just past the cursor
+        start = len(self._keys)
+        if after is not None:
+            after_created_at, after_id = decode_cursor(after)
+            start = bisect.bisect_left(self._keys, (naive_utc(after_created_at), str(after_id)))
+
+        matches = []
+        for index in range(start - 1, -1, -1):
+            document = self._documents[index]
+            created_at = document["created_at"]
+            if until is not None and created_at >= until:
+                continue
+            if since is not None and created_at < since:
+                # Everything further is older still
+                break
+            if any(document.get(field) != value for field, value in base_filter.items()):
+                continue
+            matches.append(document)
+            if len(matches) > limit:
+                break
+
+        window_start = self._keys[0][0] if self._keys else None
+        exhausted = len(matches) <= limit and not (since is not None and window_start is not None and window_start < since)
+        if exhausted and not self._complete:
+            # More matching prompts may exist beyond the cached window
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        next_cursor = encode_cursor(matches[limit - 1]) if len(matches) > limit else None
+        page = []
+        for document in matches[:limit]:
+            page.append({key: document[key] for key in ("_id", *projection) if key in document})
+        return page, next_cursor
+
+    async def stats(self, bucket: str) -> Optional[Dict[str, Any]]:
+        """
+        All-time /prompts/stats from the counters, or None if the cache isn't synced.
+        The series for a bucket unit is read from MongoDB once, then updated per prompt.
+        """
+        if not self.ready:
+            return None
+        if bucket not in self._series:
+            generation = self._generation
+            seeded = await load_prompt_stats(None, None, bucket)
+            if generation != self._generation:
+                return None
+            # Prompts applied while the aggregation ran may be counted twice; the next resync corrects it
+            self._series[bucket] = {row["start"]: [row["total"], row["attacks"]] for row in seeded["series"]}
+        self._hits += 1
+
+        starts = sorted(self._series[bucket])[-STATS_MAX_BUCKETS:]
+        mean, std = confidence_moments(*self._moments)
+        return {
+            "window": {"since": None, "until": None, "bucket": bucket},
+            "total": self._total,
+            "attacks": self._attacks,
+            "clean": self._total - self._attacks,
+            "attackRate": self._attacks / self._total if self._total else 0.0,
+            "firstPromptAt": self._first,
+            "lastPromptAt": self._last,
+            "byType": dict(self._by_type.most_common()),
+            "confidence": {
+                "bins": CONFIDENCE_BINS[:-1],
+                "attacks": list(self._confidence_attacks),
+                "clean": list(self._confidence_clean),
+                "mean": mean,
+                "std": std,
+            },
+            "series": [
+                {"start": start, "total": self._series[bucket][start][0], "attacks": self._series[bucket][start][1]}
+                for start in starts
+            ],
+        }
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "synced": self._synced,
+            "mode": self._mode,
+            "cachedPrompts": len(self._documents),
+            "complete": self._complete,
+            "etag": self.etag,
+            "hits": self._hits,
+            "misses": self._misses,
+            "appliedChanges": self._applied,
+            "appliedDeletes": self._deleted,
+            "resyncs": self._resyncs,
+        }
+
+
+# Create a singleton instance
+_cache_instance: Optional[PromptCache] = None
+
+
+def get_prompt_cache() -> PromptCache:
+    """
+    Get the singleton instance of PromptCache.
+    Returns: PromptCache instance
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = PromptCache()
+    return _cache_instance
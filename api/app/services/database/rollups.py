@@ -0,0 +1,530 @@
+"""
+Pre-aggregated prompt statistics per minute, hour and day.
+
+Every stored prompt increments one document per unit in the prompt_rollups
+collection (atomic $inc upserts, batched per write). /prompts/stats then reads
+the few rollup documents covering the window instead of every prompt in it.
+
+Rollups start counting when the API first runs with them. Prompts stored
+before that are added by a rebuild, which recomputes every bucket before the
+current day from the prompts collection:
+
+Command line (from the api directory, with the api .env in place):
+    python -m app.services.database.rollups rebuild
+    python -m app.services.database.rollups rebuild --include-today
+    python -m app.services.database.rollups status
+"""
+import argparse
+import asyncio
+import bisect
+import logging
+import math
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+from pymongo import ASCENDING, IndexModel, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.services.database.connection import get_database, close_mongo_connection
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "prompt_rollups"
+META_ID = "meta"
+
+# Rollup granularities, finest first
+ROLLUP_UNITS = ("minute", "hour", "day")
+UNIT_LENGTHS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# Confidence histogram bin edges: [0, 0.1), [0.1, 0.2), ... [0.9, 1.0]
+CONFIDENCE_BINS = [round(i / 10, 1) for i in range(10)] + [1.0000001]
+
+# Rollup documents written per bulk_write during a rebuild
+REBUILD_BATCH = 1000
+
+
+def truncate(value: datetime, unit: str) -> datetime:
+    """Python equivalent of $dateTrunc (UTC, weeks starting on Sunday)"""
+    if unit == "minute":
+        return value.replace(second=0, microsecond=0)
+    if unit == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "week":
+        return day - timedelta(days=(day.weekday() + 1) % 7)
+    if unit == "month":
+        return day.replace(day=1)
+    return day
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Stored created_at values are naive UTC; query parameters may carry a timezone"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def confidence_bin(confidence: Any) -> Optional[int]:
+    """Histogram bin of a confidence score, None if it isn't a number in [0, 1]"""
+    if not isinstance(confidence, (int, float)) or isinstance(confidence, bool):
+        return None
+    if not CONFIDENCE_BINS[0] <= confidence < CONFIDENCE_BINS[-1]:
+        return None
+    return bisect.bisect_right(CONFIDENCE_BINS, confidence) - 1
+
+
+def confidence_moments(count: int, total: float, total_squares: float) -> Tuple[Optional[float], Optional[float]]:
+    """Mean and standard deviation from a count, sum and sum of squares"""
+    if not count:
+        return None, None
+    mean = total / count
+    return mean, math.sqrt(max(0.0, total_squares / count - mean * mean))
+
+
+def _type_key(attack_type: Optional[str]) -> str:
+    # Dots and a leading $ can't appear in a field name used in an update path
+    return (attack_type or "unknown").replace(".", "_").lstrip("$") or "unknown"
+
+
+def _ceil(value: datetime, unit: str) -> datetime:
+    start = truncate(value, unit)
+    return start if start == value else start + UNIT_LENGTHS[unit]
+
+
+def _cover(since: Optional[datetime], until: datetime, max_unit: str) -> List[Tuple[str, Optional[datetime], datetime]]:
+    """
+    Split the minute-aligned range [since, until) into as few rollup buckets as
+    possible: whole days in the middle, hours and minutes at the edges.
+    Returns: (unit, first bucket start or None for unbounded, end) ranges
+    """
+    if since is not None and since >= until:
+        return []
+    if max_unit == "minute":
+        return [("minute", since, until)]
+    finer = ROLLUP_UNITS[ROLLUP_UNITS.index(max_unit) - 1]
+    middle_start = _ceil(since, max_unit) if since is not None else None
+    middle_end = truncate(until, max_unit)
+    if middle_start is not None and middle_start >= middle_end:
+        return _cover(since, until, finer)
+    ranges = [(max_unit, middle_start, middle_end)]
+    if since is not None:
+        ranges = _cover(since, middle_start, finer) + ranges
+    return ranges + _cover(middle_end, until, finer)
+
+
+def _new_delta(created_at: datetime) -> Dict[str, Any]:
+    return {"inc": Counter(), "first": created_at, "last": created_at}
+
+
+def _add_to_delta(delta: Dict[str, Any], document: Dict[str, Any]) -> None:
+    """Count one prompt into a bucket's $inc fields"""
+    inc = delta["inc"]
+    is_attack = bool(document.get("isAttack"))
+    inc["count"] += 1
+    if is_attack:
+        inc["attacks"] += 1
+        inc[f"byType.{_type_key(document.get('attackType'))}"] += 1
+    bin_index = confidence_bin(document.get("confidence"))
+    if bin_index is not None:
+        confidence = document["confidence"]
+        inc["confCount"] += 1
+        inc["confSum"] += confidence
+        inc["confSumSq"] += confidence * confidence
+        inc[f"hist.{'attacks' if is_attack else 'clean'}.{bin_index}"] += 1
+    delta["first"] = min(delta["first"], document["created_at"])
+    delta["last"] = max(delta["last"], document["created_at"])
+
+
+class PromptRollups:
+    """
+    PromptRollups maintains and reads the prompt_rollups collection.
+
+    One document per unit (minute, hour, day) and bucket start holds:
+    count, attacks, byType (attacks per attack type), confCount, confSum and
+    confSumSq (for mean and standard deviation), hist (confidence histogram for
+    attacks and clean prompts), and first / last (created_at range).
+
+    Features:
+    - apply() turns a batch of stored prompts into one $inc upsert per bucket
+      and unit, sent as one unordered bulk write; failures are logged and
+      counted, never raised, since the prompts themselves are already stored
+    - window_stats() answers /prompts/stats from the buckets covering the
+      window, resolved to whole minutes
+    - A meta document records when live counting started and how far a
+      rebuild has covered, so windows the rollups can't answer exactly fall
+      back to scanning the prompts
+
+    Configuration (environment variables):
+    - PROMPT_ROLLUPS_ENABLED: "true" or "false" (default true). Prompts stored
+      while disabled are missed, so enabling them again restarts live counting
+      and needs a rebuild for the time before.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("PROMPT_ROLLUPS_ENABLED", "true").lower() == "true"
+        self._meta: Optional[Dict[str, Any]] = None
+        self._meta_expires = 0.0
+
+        # Counters
+        self._applied = 0
+        self._updates = 0
+        self._errors = 0
+        self._reads = 0
+        self._fallbacks = 0
+
+    async def ensure(self) -> None:
+        """Create the rollup index and record when live counting started (API startup)"""
+        db = await get_database()
+        collection = db[ROLLUPS_COLLECTION]
+        if not self.enabled:
+            # Prompts stored from now on aren't counted; the next enabled start begins afresh
+            await collection.update_one({"_id": META_ID}, {"$set": {"disabledAt": datetime.utcnow()}})
+            return
+        await collection.delete_one({"_id": META_ID, "disabledAt": {"$exists": True}})
+        await collection.create_indexes([
+            IndexModel([("unit", ASCENDING), ("start", ASCENDING)], name="unit_start", unique=True),
+        ])
+        now = datetime.utcnow()
+        # With no prompts yet there is nothing to rebuild
+        empty = await db.prompts.find_one({}, {"_id": 1}) is None
+        await collection.update_one(
+            {"_id": META_ID},
+            {"$setOnInsert": {"liveFrom": now, "rebuiltTo": now if empty else None, "rebuilding": False}},
+            upsert=True
+        )
+        meta = await self._load_meta(force=True)
+        if self._complete_from(meta) is not None:
+            logger.warning(
+                "Prompt rollups only cover prompts stored since "
+                f"{meta['liveFrom'].isoformat()}; run 'python -m app.services.database.rollups rebuild'"
+            )
+
+    async def apply(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Count newly stored prompts into their minute, hour and day buckets.
+        Call once per successful write, with only the documents that were inserted.
+        """
+        if not self.enabled or not documents:
+            return
+        deltas = self.deltas(documents)
+        updates = [
+            UpdateOne(
+                {"unit": unit, "start": start},
+                {
+                    "$inc": dict(delta["inc"]),
+                    "$min": {"first": delta["first"]},
+                    "$max": {"last": delta["last"]},
+                },
+                upsert=True
+            )
+            for (unit, start), delta in deltas.items()
+        ]
+        try:
+            db = await get_database()
+            await db[ROLLUPS_COLLECTION].bulk_write(updates, ordered=False)
+            self._applied += len(documents)
+            self._updates += len(updates)
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Failed to update prompt rollups for {len(documents)} prompts: {str(e)}")
+
+    @staticmethod
+    def deltas(documents: List[Dict[str, Any]]) -> Dict[Tuple[str, datetime], Dict[str, Any]]:
+        """Sum documents per (unit, bucket start) into $inc fields and the created_at range"""
+        deltas: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+        for document in documents:
+            for unit in ROLLUP_UNITS:
+                key = (unit, truncate(document["created_at"], unit))
+                if key not in deltas:
+                    deltas[key] = _new_delta(document["created_at"])
+                _add_to_delta(deltas[key], document)
+        return deltas
+
+    async def _load_meta(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """The meta document, re-read at most every 30 seconds"""
+        if force or time.monotonic() >= self._meta_expires:
+            db = await get_database()
+            self._meta = await db[ROLLUPS_COLLECTION].find_one({"_id": META_ID})
+            self._meta_expires = time.monotonic() + 30
+        return self._meta
+
+    @staticmethod
+    def _complete_from(meta: Optional[Dict[str, Any]]) -> Optional[datetime]:
+        """
+        The earliest time the rollups count every prompt from: None if they
+        cover all time, datetime.max if they can't be used (never started, or a
+        rebuild is running)
+        """
+        if meta is None or meta.get("rebuilding"):
+            return datetime.max
+        rebuilt_to = meta.get("rebuiltTo")
+        if rebuilt_to is not None and rebuilt_to >= meta["liveFrom"]:
+            return None
+        return meta["liveFrom"]
+
+    async def window_stats(
+        self,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        bucket: str,
+        max_buckets: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Stats for [since, until) from the rollups, with since and until rounded
+        down to whole minutes.
+        Args:
+            bucket: Time series unit: minute, hour, day, week or month
+            max_buckets: Most recent time series buckets to return
+        Returns:
+            The stats dict of get_prompt_stats (without the window), or None if
+            the rollups don't cover the window
+        """
+        if not self.enabled:
+            return None
+        since, until = naive_utc(since), naive_utc(until)
+        start = truncate(since, "minute") if since is not None else None
+        end = truncate(until, "minute") if until is not None else truncate(datetime.utcnow(), "minute") + UNIT_LENGTHS["minute"]
+        try:
+            complete_from = self._complete_from(await self._load_meta())
+        except Exception as e:
+            logger.warning(f"Failed to read prompt rollup metadata: {str(e)}")
+            complete_from = datetime.max
+        if complete_from is not None and (start is None or start < complete_from):
+            self._fallbacks += 1
+            return None
+
+        # The series needs buckets no coarser than its unit, but only for its most recent periods
+        series_unit = bucket if bucket in ROLLUP_UNITS else "day"
+        series_from = start
+        if bucket in ROLLUP_UNITS:
+            oldest = truncate(end - timedelta(microseconds=1), bucket) - (max_buckets - 1) * UNIT_LENGTHS[bucket]
+            if start is None or oldest > start:
+                series_from = oldest
+        ranges = _cover(start, series_from, "day") if series_from != start else []
+        ranges += _cover(series_from, end, series_unit)
+        if not ranges:
+            return self._summarize([], bucket, max_buckets, series_from)
+
+        conditions = []
+        for unit, range_start, range_end in ranges:
+            bounds: Dict[str, Any] = {"$lt": range_end}
+            if range_start is not None:
+                bounds["$gte"] = range_start
+            conditions.append({"unit": unit, "start": bounds})
+        db = await get_database()
+        cursor = db[ROLLUPS_COLLECTION].find({"$or": conditions}, {"_id": 0})
+        documents = await cursor.to_list(length=None)
+        self._reads += 1
+        return self._summarize(documents, bucket, max_buckets, series_from)
+
+    @staticmethod
+    def _summarize(
+        documents: List[Dict[str, Any]],
+        bucket: str,
+        max_buckets: int,
+        series_from: Optional[datetime]
+    ) -> Dict[str, Any]:
+        """Add up rollup documents into the /prompts/stats shape"""
+        totals: Counter = Counter()
+        by_type: Counter = Counter()
+        histogram_bins = CONFIDENCE_BINS[:-1]
+        attack_histogram = [0] * len(histogram_bins)
+        clean_histogram = [0] * len(histogram_bins)
+        series: Dict[datetime, List[int]] = {}
+        first = last = None
+        for document in documents:
+            for field in ("count", "attacks", "confCount", "confSum", "confSumSq"):
+                totals[field] += document.get(field, 0)
+            by_type.update(document.get("byType", {}))
+            hist = document.get("hist", {})
+            for index, count in hist.get("attacks", {}).items():
+                attack_histogram[int(index)] += count
+            for index, count in hist.get("clean", {}).items():
+                clean_histogram[int(index)] += count
+            if document.get("first") is not None:
+                first = document["first"] if first is None else min(first, document["first"])
+                last = document["last"] if last is None else max(last, document["last"])
+            if series_from is None or document["start"] >= series_from:
+                row = series.setdefault(truncate(document["start"], bucket), [0, 0])
+                row[0] += document.get("count", 0)
+                row[1] += document.get("attacks", 0)
+
+        total, attacks = totals["count"], totals["attacks"]
+        mean, std = confidence_moments(totals["confCount"], totals["confSum"], totals["confSumSq"])
+        starts = sorted(series)[-max_buckets:]
+        return {
+            "total": total,
+            "attacks": attacks,
+            "clean": total - attacks,
+            "attackRate": attacks / total if total else 0.0,
+            "firstPromptAt": first,
+            "lastPromptAt": last,
+            "byType": dict(by_type.most_common()),
+            "confidence": {
+                "bins": histogram_bins,
+                "attacks": attack_histogram,
+                "clean": clean_histogram,
+                "mean": mean,
+                "std": std,
+            },
+            "series": [{"start": start, "total": series[start][0], "attacks": series[start][1]} for start in starts],
+        }
+
+    async def rebuild(self, include_today: bool = False) -> Dict[str, Any]:
+        """
+        Recompute every bucket from the prompts collection in one pass over it.
+        Buckets of the current UTC day are left to live counting unless
+        include_today is set; prompts stored while today's buckets are being
+        replaced may then be missed, so only use it while the API is idle.
+        Returns: Dict with the prompts read, buckets written and the cutoff
+        """
+        db = await get_database()
+        collection = db[ROLLUPS_COLLECTION]
+        started = datetime.utcnow()
+        cutoff = None if include_today else truncate(started, "day")
+        await collection.update_one(
+            {"_id": META_ID},
+            {"$set": {"rebuilding": True}, "$setOnInsert": {"liveFrom": started}},
+            upsert=True
+        )
+
+        # Drop old buckets first so buckets without prompts anymore don't linger
+        stale: Dict[str, Any] = {"unit": {"$in": list(ROLLUP_UNITS)}}
+        if cutoff is not None:
+            stale["start"] = {"$lt": cutoff}
+        await collection.delete_many(stale)
+
+        query = {"created_at": {"$lt": cutoff}} if cutoff is not None else {}
+        cursor = db.prompts.find(
+            query, {"isAttack": 1, "attackType": 1, "confidence": 1, "created_at": 1}
+        ).sort([("created_at", ASCENDING)]).batch_size(REBUILD_BATCH)
+
+        # Prompts come oldest first, so a bucket is complete once a later one starts
+        open_buckets: Dict[str, Tuple[datetime, Dict[str, Any]]] = {}
+        pending: List[ReplaceOne] = []
+        read = written = 0
+
+        async def flush_bucket(unit: str) -> None:
+            nonlocal written
+            bucket_start, delta = open_buckets.pop(unit)
+            document = {"unit": unit, "start": bucket_start, "first": delta["first"], "last": delta["last"]}
+            for path, value in delta["inc"].items():
+                # "byType.jailbreak" -> document["byType"]["jailbreak"]
+                target = document
+                *parents, leaf = path.split(".")
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[leaf] = value
+            pending.append(ReplaceOne({"unit": unit, "start": bucket_start}, document, upsert=True))
+            written += 1
+            if len(pending) >= REBUILD_BATCH:
+                await collection.bulk_write(pending, ordered=False)
+                pending.clear()
+
+        async for prompt in cursor:
+            read += 1
+            for unit in ROLLUP_UNITS:
+                bucket_start = truncate(prompt["created_at"], unit)
+                if unit in open_buckets and open_buckets[unit][0] != bucket_start:
+                    await flush_bucket(unit)
+                if unit not in open_buckets:
+                    open_buckets[unit] = (bucket_start, _new_delta(prompt["created_at"]))
+                _add_to_delta(open_buckets[unit][1], prompt)
+        for unit in list(open_buckets):
+            await flush_bucket(unit)
+        if pending:
+            await collection.bulk_write(pending, ordered=False)
+
+        rebuilt_to = cutoff if cutoff is not None else started
+        await collection.update_one({"_id": META_ID}, {"$set": {"rebuilding": False, "rebuiltTo": rebuilt_to}})
+        await self._load_meta(force=True)
+        logger.info(f"Rebuilt {written} prompt rollup buckets from {read} prompts before {rebuilt_to.isoformat()}")
+        return {"prompts": read, "buckets": written, "rebuiltTo": rebuilt_to}
+
+    async def status(self) -> Dict[str, Any]:
+        """Coverage of the rollups and the number of buckets per unit"""
+        meta = await self._load_meta(force=True)
+        complete_from = self._complete_from(meta)
+        db = await get_database()
+        buckets = {
+            unit: await db[ROLLUPS_COLLECTION].count_documents({"unit": unit})
+            for unit in ROLLUP_UNITS
+        }
+        return {
+            "liveFrom": meta.get("liveFrom") if meta else None,
+            "rebuiltTo": meta.get("rebuiltTo") if meta else None,
+            "rebuilding": bool(meta and meta.get("rebuilding")),
+            "completeFrom": None if complete_from in (None, datetime.max) else complete_from,
+            "usable": complete_from != datetime.max,
+            "allTime": complete_from is None,
+            "buckets": buckets,
+        }
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "appliedPrompts": self._applied,
+            "upserts": self._updates,
+            "errors": self._errors,
+            "statsReads": self._reads,
+            "scanFallbacks": self._fallbacks,
+        }
+
+
+def inserted_documents(documents: List[Dict[str, Any]], error: Optional[BulkWriteError] = None) -> List[Dict[str, Any]]:
+    """The documents an unordered insert_many actually wrote, given its BulkWriteError if any"""
+    if error is None:
+        return documents
+    failed = {write_error.get("index") for write_error in error.details.get("writeErrors", [])}
+    return [document for index, document in enumerate(documents) if index not in failed]
+
+
+# Create a singleton instance
+_rollups_instance: Optional[PromptRollups] = None
+
+
+def get_prompt_rollups() -> PromptRollups:
+    """
+    Get the singleton instance of PromptRollups.
+    Returns: PromptRollups instance
+    """
+    global _rollups_instance
+    if _rollups_instance is None:
+        _rollups_instance = PromptRollups()
+    return _rollups_instance
+
+
+async def _main(command: str, include_today: bool) -> int:
+    rollups = get_prompt_rollups()
+    try:
+        if command == "rebuild":
+            result = await rollups.rebuild(include_today)
+            print(f"Rebuilt {result['buckets']} buckets from {result['prompts']} prompts "
+                  f"created before {result['rebuiltTo'].isoformat()}")
+            return 0
+        for key, value in (await rollups.status()).items():
+            print(f"{key:<14}{value.isoformat() if isinstance(value, datetime) else value}")
+        return 0
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point for rebuilding the prompt rollups"""
+    parser = argparse.ArgumentParser(description="Manage the prompt_rollups collection")
+    parser.add_argument("command", choices=["rebuild", "status"])
+    parser.add_argument(
+        "--include-today", action="store_true",
+        help="Also rebuild today's buckets (only while no prompts are being stored)"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return asyncio.run(_main(args.command, args.include_today))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
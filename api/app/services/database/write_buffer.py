@@ -0,0 +1,358 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from app.services.database.connection import get_database
+from app.services.database.rollups import get_prompt_rollups, inserted_documents
+from app.services.database.prompt_bodies import get_prompt_body_store
+
+logger = logging.getLogger(__name__)
+
+# MongoDB error code for a duplicate _id, expected when a journal segment is replayed twice
+DUPLICATE_KEY_ERROR = 11000
+
+# Journal segments are rotated at this size so replay reads them in bounded pieces
+JOURNAL_SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+def default_journal_dir() -> Path:
+    """Journal directory: DB_WRITE_JOURNAL_DIR or ~/.cache/nobleguard/journal"""
+    return Path(os.getenv("DB_WRITE_JOURNAL_DIR", Path.home() / ".cache" / "nobleguard" / "journal"))
+
+
+class WriteBehindBuffer:
+    """
+    WriteBehindBuffer takes documents off the request path and writes them in bulk.
+
+    Features:
+    - put() only appends to an in-memory list; a background task flushes it
+      with insert_many(ordered=False) when flush_size documents are waiting
+      or every flush_interval seconds
+    - Bounded memory: at most max_pending documents are held. put() waits
+      up to max_wait seconds for room (backpressure) and then spills the
+      document to the journal instead of growing the buffer
+    - While MongoDB is unreachable, failed batches are appended to a local
+      JSON-lines journal; once a write succeeds again the journal is
+      replayed one segment at a time and deleted. Documents carry their _id
+      from the start, so a segment replayed twice doesn't create duplicates
+    - drain() flushes what is left on shutdown, journaling anything that
+      can't be written before the timeout
+    - Write listeners are called with every batch MongoDB accepted, so readers
+      that track new prompts by created_at (the prompt cache's polling mode)
+      can notice late writes such as journal replays, and the verdict feed
+      only broadcasts prompts once they are stored
+
+    Configuration (environment variables):
+    - DB_WRITE_FLUSH_SIZE: Documents per bulk write (default 100)
+    - DB_WRITE_FLUSH_INTERVAL: Longest time a document waits in memory, in seconds (default 1)
+    - DB_WRITE_MAX_PENDING: Documents held in memory before backpressure (default 5000)
+    - DB_WRITE_MAX_WAIT: Seconds put() waits for room before spilling to the journal (default 2)
+    - DB_WRITE_JOURNAL_DIR: Journal directory (default ~/.cache/nobleguard/journal)
+    - DB_WRITE_JOURNAL_MAX_BYTES: Journal size above which new documents are dropped (default 512 MB)
+    - DB_WRITE_DRAIN_TIMEOUT: Seconds drain() spends writing on shutdown (default 10)
+
+    Usage:
+    ```python
+    buffer = get_write_buffer()
+    await buffer.start()
+    await buffer.put({"_id": ObjectId(), "prompt": "...", ...})
+    # ... on shutdown ...
+    await buffer.drain()
+    ```
+    """
+
+    def __init__(self, collection_name: str = "prompts", journal_dir: Optional[Path] = None):
+        """
+        Initialize the buffer.
+        Args:
+            collection_name: Collection the documents are written to
+            journal_dir: Optional journal directory. Defaults to DB_WRITE_JOURNAL_DIR.
+        """
+        self.collection_name = collection_name
+        self.flush_size = max(1, int(os.getenv("DB_WRITE_FLUSH_SIZE", "100")))
+        self.flush_interval = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "1"))
+        self.max_pending = max(self.flush_size, int(os.getenv("DB_WRITE_MAX_PENDING", "5000")))
+        self.max_wait = float(os.getenv("DB_WRITE_MAX_WAIT", "2"))
+        self.journal_max_bytes = int(os.getenv("DB_WRITE_JOURNAL_MAX_BYTES", str(512 * 1024 * 1024)))
+        self.drain_timeout = float(os.getenv("DB_WRITE_DRAIN_TIMEOUT", "10"))
+        self.journal_dir = Path(journal_dir) if journal_dir else default_journal_dir()
+
+        self._pending: List[Dict[str, Any]] = []
+        self._room = asyncio.Condition()
+        self._flush_now = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._online = True
+        self._write_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+        # Journal state; appends and segment rotation happen under the lock
+        self._journal_lock = asyncio.Lock()
+        self._segment: Optional[Path] = None
+        self._journal_bytes = 0
+
+        # Counters
+        self._written = 0
+        self._flushes = 0
+        self._rejected = 0
+        self._backpressure_waits = 0
+        self._journaled = 0
+        self._replayed = 0
+        self._dropped = 0
+        self._last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start the background flush task; journal segments left by a previous run are replayed by it"""
+        if self.running:
+            return
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self._journal_bytes = sum(path.stat().st_size for path in self._segments())
+        if self._journal_bytes:
+            logger.info(f"Write journal holds {self._journal_bytes} bytes from a previous run, replaying")
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Write-behind buffer started (flush size {self.flush_size}, "
+            f"interval {self.flush_interval}s, max pending {self.max_pending})"
+        )
+
+    def add_write_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Call listener with the documents of every batch written (including journal replays)"""
+        if listener not in self._write_listeners:
+            self._write_listeners.append(listener)
+
+    async def put(self, document: Dict[str, Any]) -> None:
+        """
+        Queue a document for writing.
+        Waits up to max_wait seconds if the buffer is full, then journals the document.
+        If the buffer isn't running (e.g. during shutdown) the document is written directly.
+        Args:
+            document: Document to insert; it should already have an _id
+        """
+        if not self.running:
+            if not await self._insert([document]):
+                await self._spill([document])
+            return
+
+        if len(self._pending) >= self.max_pending:
+            self._backpressure_waits += 1
+            try:
+                async with self._room:
+                    await asyncio.wait_for(
+                        self._room.wait_for(lambda: len(self._pending) < self.max_pending),
+                        timeout=self.max_wait
+                    )
+            except asyncio.TimeoutError:
+                logger.warning("Write buffer full, journaling document")
+                await self._spill([document])
+                return
+
+        self._pending.append(document)
+        if len(self._pending) >= self.flush_size:
+            self._flush_now.set()
+
+    async def drain(self) -> None:
+        """Stop the flush task and write everything still pending, journaling what can't be written in time"""
+        if not self.running:
+            return
+        self._stopping = True
+        self._flush_now.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Write buffer drain timed out after {self.drain_timeout}s, journaling the rest")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._pending:
+            batch, self._pending = self._pending, []
+            await self._spill(batch)
+        self._task = None
+        logger.info(f"Write buffer drained ({self._written} written, {self._journal_bytes} bytes journaled)")
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                if self._journal_bytes and not self._stopping:
+                    # Also probes MongoDB while it is unreachable
+                    await self._replay_segment()
+                await self._flush()
+            except Exception as e:
+                # Keep flushing; the next tick retries
+                logger.error(f"Write buffer flush failed: {str(e)}")
+        await self._flush()
+
+    async def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = self._pending[:self.flush_size]
+        del self._pending[:self.flush_size]
+        async with self._room:
+            self._room.notify_all()
+        return batch
+
+    async def _flush(self) -> None:
+        """Write pending documents in flush_size batches, journaling them while MongoDB is down"""
+        while self._pending:
+            batch = await self._take_batch()
+            try:
+                # While offline, go straight to the journal instead of waiting on a timeout per batch
+                if not self._online or not await self._insert(batch):
+                    await self._spill(batch)
+            except asyncio.CancelledError:
+                await self._spill(batch)
+                raise
+
+    async def _insert(self, documents: List[Dict[str, Any]]) -> bool:
+        """
+        Bulk insert documents.
+        Returns: True if MongoDB accepted the write (rejected documents are counted
+                 and dropped), False if it could not be reached and the batch should be journaled
+        """
+        started = time.perf_counter()
+        try:
+            db = await get_database()
+            if self.collection_name == "prompts":
+                # Long prompt texts go to prompt_bodies first; the journal keeps the full documents
+                to_insert = await get_prompt_body_store().compact(documents)
+            else:
+                to_insert = documents
+            result = await db[self.collection_name].insert_many(to_insert, ordered=False)
+            written = len(result.inserted_ids)
+            inserted = documents
+        except BulkWriteError as e:
+            inserted = inserted_documents(documents, e)
+            errors = e.details.get("writeErrors", [])
+            rejected = [error for error in errors if error.get("code") != DUPLICATE_KEY_ERROR]
+            written = e.details.get("nInserted", 0)
+            if rejected:
+                self._rejected += len(rejected)
+                logger.error(f"MongoDB rejected {len(rejected)} documents: {rejected[0].get('errmsg')}")
+        except Exception as e:
+            if self._online:
+                logger.error(f"MongoDB unreachable, journaling writes: {str(e)}")
+            self._online = False
+            return False
+
+        if not self._online:
+            logger.info("MongoDB reachable again, replaying write journal")
+        self._online = True
+        self._written += written
+        self._flushes += 1
+        self._last_flush_ms = (time.perf_counter() - started) * 1000
+        if self.collection_name == "prompts":
+            # Journal replays skip duplicates, so each prompt is counted once
+            await get_prompt_rollups().apply(inserted)
+        if inserted:
+            for listener in self._write_listeners:
+                try:
+                    listener(inserted)
+                except Exception as e:
+                    logger.error(f"Write listener failed: {str(e)}")
+        return True
+
+    def _segments(self) -> List[Path]:
+        """Journal segments, oldest first"""
+        if not self.journal_dir.exists():
+            return []
+        return sorted(self.journal_dir.glob("segment-*.jsonl"))
+
+    async def _spill(self, documents: List[Dict[str, Any]]) -> None:
+        """Append documents to the current journal segment"""
+        data = "".join(json_util.dumps(document) + "\n" for document in documents).encode("utf-8")
+        async with self._journal_lock:
+            if self._journal_bytes + len(data) > self.journal_max_bytes:
+                self._dropped += len(documents)
+                logger.error(f"Write journal is full ({self._journal_bytes} bytes), dropping {len(documents)} documents")
+                return
+            if self._segment is None or self._segment.stat().st_size >= JOURNAL_SEGMENT_BYTES:
+                self._segment = self.journal_dir / f"segment-{time.time_ns()}.jsonl"
+            await asyncio.to_thread(self._append, self._segment, data)
+            self._journal_bytes += len(data)
+            self._journaled += len(documents)
+
+    @staticmethod
+    def _append(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _replay_segment(self) -> None:
+        """Write the oldest journal segment back to MongoDB and delete it"""
+        async with self._journal_lock:
+            segments = self._segments()
+            if not segments:
+                self._journal_bytes = 0
+                return
+            segment = segments[0]
+            if segment == self._segment:
+                # Seal it; new spills go to a fresh segment
+                self._segment = None
+
+        size = segment.stat().st_size
+        lines = (await asyncio.to_thread(segment.read_text, "utf-8")).splitlines()
+        documents = [json_util.loads(line) for line in lines if line.strip()]
+        for i in range(0, len(documents), self.flush_size):
+            if not await self._insert(documents[i:i + self.flush_size]):
+                # Try again later; batches already written are skipped then as duplicates
+                return
+        segment.unlink()
+        async with self._journal_lock:
+            self._journal_bytes = max(0, self._journal_bytes - size)
+        self._replayed += len(documents)
+        logger.info(f"Replayed {len(documents)} journaled documents from {segment.name}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "online": self._online,
+            "pending": len(self._pending),
+            "maxPending": self.max_pending,
+            "flushSize": self.flush_size,
+            "written": self._written,
+            "flushes": self._flushes,
+            "lastFlushMs": round(self._last_flush_ms, 1),
+            "rejected": self._rejected,
+            "backpressureWaits": self._backpressure_waits,
+            "journaled": self._journaled,
+            "replayed": self._replayed,
+            "dropped": self._dropped,
+            "journalBytes": self._journal_bytes,
+        }
+
+
+# Create a singleton instance
+_buffer_instance: Optional[WriteBehindBuffer] = None
+
+
+def get_write_buffer() -> WriteBehindBuffer:
+    """
+    Get the singleton instance of WriteBehindBuffer.
+    Returns: WriteBehindBuffer instance
+    """
+    global _buffer_instance
+    if _buffer_instance is None:
+        _buffer_instance = WriteBehindBuffer()
+    return _buffer_instance
+
+
+async def drain_write_buffer() -> None:
+    """Flush the shared write buffer, if one was created"""
+    if _buffer_instance is not None:
+        await _buffer_instance.drain()
@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.services.detector_registry import DetectorRegistry, get_detector_registry
+from app.services.inference_pool import InferencePool, get_inference_pool
+from app.services.verdict_cache import VerdictCache, get_verdict_cache
+from app.services.exceptions import DetectorOverloadedError
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class MicroBatcher:
+    """
+    MicroBatcher collects concurrent prompt analyses into padded batches.
+
+    Requests are queued and a single scheduler task drains the queue: it takes
+    the first waiting prompt, then keeps collecting until it has max_batch_size
+    prompts or max_wait_ms has passed, runs one forward pass for the whole batch
+    and resolves each caller's future with its own result dict.
+
+    The detector is resolved from the registry for every batch, so a hot-swap
+    takes effect on the next batch without dropping queued requests.
+
+    Prompts already in the VerdictCache are answered without touching the queue.
+
+    Batches run on the InferencePool, one per pool worker at a time. While all
+    workers are busy the next batch keeps filling up. Once DETECTOR_MAX_PENDING
+    prompts are waiting, new prompts are rejected with DetectorOverloadedError.
+
+    Bulk callers use analyze_many(), which skips the queue and runs larger
+    batches directly, taking the same worker slots as queued batches so
+    interactive prompts still get a turn between them.
+
+    Configuration (environment variables):
+    - DETECTOR_MAX_BATCH_SIZE: Maximum prompts per forward pass (default 16)
+    - DETECTOR_MAX_WAIT_MS: Maximum time to wait for a batch to fill (default 5)
+    - DETECTOR_MAX_PENDING: Maximum prompts queued or running (default 256)
+    - DETECTOR_BULK_BATCH_SIZE: Prompts per forward pass for analyze_many (default 64)
+    """
+
+    def __init__(
+        self,
+        registry: Optional[DetectorRegistry] = None,
+        pool: Optional[InferencePool] = None,
+        cache: Optional[VerdictCache] = None,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        bulk_batch_size: Optional[int] = None
+    ):
+        """
+        Initialize the batcher.
+        Args:
+            registry: Optional DetectorRegistry. Defaults to the process-wide registry.
+            pool: Optional InferencePool. Defaults to the process-wide pool.
+            cache: Optional VerdictCache. Defaults to the process-wide cache.
+            max_batch_size: Maximum prompts per batch. Defaults to DETECTOR_MAX_BATCH_SIZE.
+            max_wait_ms: Maximum wait for a batch to fill. Defaults to DETECTOR_MAX_WAIT_MS.
+            max_pending: Maximum prompts admitted at once. Defaults to DETECTOR_MAX_PENDING.
+            bulk_batch_size: Prompts per batch in analyze_many. Defaults to DETECTOR_BULK_BATCH_SIZE.
+        """
+        self._registry = registry or get_detector_registry()
+        self._pool = pool or get_inference_pool()
+        self._cache = cache or get_verdict_cache()
+        self.max_batch_size = max(1, max_batch_size or int(os.getenv("DETECTOR_MAX_BATCH_SIZE", "16")))
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("DETECTOR_MAX_WAIT_MS", "5"))
+        self.max_pending = max(1, max_pending or int(os.getenv("DETECTOR_MAX_PENDING", "256")))
+        self.bulk_batch_size = max(1, bulk_batch_size or int(os.getenv("DETECTOR_BULK_BATCH_SIZE", "64")))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._running_batches: set = set()
+        self._pending = 0
+        self._rejected = 0
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._max_queue_depth = 0
+        self._batch_size_histogram: Dict[str, int] = {str(b): 0 for b in BATCH_SIZE_BUCKETS}
+        self._batch_size_histogram["+Inf"] = 0
+        self._total_batch_seconds = 0.0
+
+    async def start(self) -> None:
+        """Start the scheduler task. Safe to call more than once."""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._batch_slots = asyncio.Semaphore(self._pool.workers)
+        self._worker = asyncio.create_task(self._run(), name="detector-micro-batcher")
+        logger.info(f"Micro-batcher started (max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms})")
+
+    async def stop(self) -> None:
+        """Stop the scheduler task and fail any prompts still waiting in the queue."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        for task in list(self._running_batches):
+            task.cancel()
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Micro-batcher stopped"))
+        logger.info("Micro-batcher stopped")
+
+    async def analyze(self, prompt_text: str) -> Dict[str, Any]:
+        """
+        Queue a prompt for analysis and wait for its result.
+        Args:
+            prompt_text: The text prompt to analyze
+        Returns:
+            Dict containing analysis results (isAttack, attackType, confidence, matches)
+        Raises:
+            DetectorNotReadyError: If the detector is not loaded
+            DetectorOverloadedError: If max_pending prompts are already waiting
+        """
+        # Fail fast instead of queueing when there is no model to run
+        detector = self._registry.get_detector()
+
+        cached = await self._cache.get(prompt_text, detector.version)
+        if cached is not None:
+            return cached
+
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise DetectorOverloadedError(
+                f"Detector is saturated ({self._pending} prompts pending)",
+                retry_after=self._estimate_retry_after()
+            )
+
+        if self._worker is None or self._worker.done():
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        try:
+            await self._queue.put((prompt_text, future))
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+            return await future
+        finally:
+            self._pending -= 1
+
+    async def analyze_many(self, prompt_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze a list of prompts for bulk callers.
+        Cached verdicts are reused; the rest are split into batches of
+        bulk_batch_size that run on the pool as worker slots free up.
+        Args:
+            prompt_texts: The prompts to analyze
+        Returns:
+            List of result dicts, in the same order as prompt_texts
+        Raises:
+            DetectorNotReadyError: If the detector is not loaded
+        """
+        detector = self._registry.get_detector()
+        if self._worker is None or self._worker.done():
+            await self.start()
+
+        # One lookup for the whole list: a single $in query with the shared cache
+        results: List[Optional[Dict[str, Any]]] = await self._cache.get_many(prompt_texts, detector.version)
+        misses = [i for i, result in enumerate(results) if result is None]
+
+        async def run(indices: List[int]) -> None:
+            texts = [prompt_texts[i] for i in indices]
+            async with self._batch_slots:
+                started = time.perf_counter()
+                batch_results = await self._pool.analyze(detector, texts)
+                self._record_batch(len(texts), time.perf_counter() - started)
+            for i, result in zip(indices, batch_results):
+                results[i] = result
+            await self._cache.put_many(
+                [(text, result) for text, result in zip(texts, batch_results) if result["confidence"] > 0.0],
+                detector.version
+            )
+
+        await asyncio.gather(*(
+            run(misses[start:start + self.bulk_batch_size])
+            for start in range(0, len(misses), self.bulk_batch_size)
+        ))
+        return results
+
+    def _estimate_retry_after(self) -> int:
+        """Seconds until the current backlog should have drained, based on recent batch times"""
+        if not self._batches:
+            return 1
+        avg_batch_seconds = self._total_batch_seconds / self._batches
+        batches_ahead = self._pending / (self.max_batch_size * self._pool.workers)
+        return max(1, math.ceil(batches_ahead * avg_batch_seconds))
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for the first prompt, then gather more until the batch is full or the wait expires."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """Scheduler loop: wait for a free worker, collect a batch, hand it to the pool."""
+        while True:
+            # Start collecting only once a worker can take the batch, so the
+            # batch keeps growing while every worker is busy
+            await self._batch_slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._batch_slots.release()
+                raise
+
+            # Callers that gave up (client disconnect, timeout) don't need a forward pass
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                self._batch_slots.release()
+                continue
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Run one batch on the inference pool and resolve each caller's future."""
+        texts = [text for text, _ in batch]
+        started = time.perf_counter()
+        try:
+            detector = self._registry.get_detector()
+            # The forward pass is blocking, it runs on the inference pool
+            results = await self._pool.analyze(detector, texts)
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} prompts failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._batch_slots.release()
+
+        self._record_batch(len(batch), time.perf_counter() - started)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+        for text, result in zip(texts, results):
+            # Empty prompts and the error fallback report exactly 0.0; only cache real verdicts
+            if result["confidence"] > 0.0:
+                await self._cache.put(text, detector.version, result)
+
+    def _record_batch(self, size: int, seconds: float) -> None:
+        """Update batch metrics"""
+        self._batches += 1
+        self._items += size
+        self._total_batch_seconds += seconds
+        for bound in BATCH_SIZE_BUCKETS:
+            if size <= bound:
+                self._batch_size_histogram[str(bound)] += 1
+                break
+        else:
+            self._batch_size_histogram["+Inf"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching metrics.
+        Returns: Dict with queue depth, batch counts, the batch-size histogram and pool usage
+        """
+        return {
+            "maxBatchSize": self.max_batch_size,
+            "maxWaitMs": self.max_wait_ms,
+            "queueDepth": self._queue.qsize() if self._queue is not None else 0,
+            "maxQueueDepth": self._max_queue_depth,
+            "pending": self._pending,
+            "maxPending": self.max_pending,
+            "bulkBatchSize": self.bulk_batch_size,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "prompts": self._items,
+            "avgBatchSize": self._items / self._batches if self._batches else 0.0,
+            "avgBatchMs": 1000 * self._total_batch_seconds / self._batches if self._batches else 0.0,
+            "batchSizeHistogram": dict(self._batch_size_histogram),
+            "pool": self._pool.stats(),
+            "cache": self._cache.stats(),
+        }
+
+
+# Create a singleton instance
+_batcher_instance: Optional[MicroBatcher] = None
+
+
+def get_micro_batcher() -> MicroBatcher:
+    """
+    Get the singleton instance of MicroBatcher.
+    Returns: MicroBatcher instance
+    """
+    global _batcher_instance
+    if _batcher_instance is None:
+        _batcher_instance = MicroBatcher()
+    return _batcher_instance
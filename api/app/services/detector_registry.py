@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Dict, Any
+
+from app.services.PromptDetectorService import PromptDetectorService
+from app.services.exceptions import DetectorNotReadyError
+from app.services.inference_pool import get_inference_pool
+
+logger = logging.getLogger(__name__)
+
+# Fallback process start time when /proc is not available
+_IMPORTED_AT = time.time()
+
+
+def process_uptime() -> float:
+    """
+    Seconds since this process was launched.
+    Uses the process start time from /proc on Linux so interpreter start-up and
+    imports are included; elsewhere falls back to when this module was imported.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the start time in clock ticks since boot; skip past "(comm)"
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+        return system_uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time() - _IMPORTED_AT
+
+
+def _load_detector(model_id: Optional[str], checkpoint: Optional[str], warm_up: bool = True) -> PromptDetectorService:
+    """
+    Build a detector and run one verdict so the first request doesn't pay for warm-up.
+    The warm-up and the backend parity check are skipped when the detector will be
+    served by forked workers: running torch in the parent first risks deadlocking its
+    OpenMP pool in the children. Each worker runs both after the fork instead.
+    """
+    detector = PromptDetectorService(model_id=model_id, checkpoint=checkpoint, check_parity=warm_up)
+    if warm_up:
+        detector.analyze_prompt("Hello, how are you?")
+    return detector
+
+
+class DetectorRegistry:
+    """
+    DetectorRegistry owns the process-wide PromptDetectorService instance.
+
+    The model is loaded once when the application starts and shared by every
+    request, instead of reloading the tokenizer and weights per call.
+
+    Features:
+    - Explicit lifecycle state (not_loaded, loading, ready, failed)
+    - Model loading runs off the event loop
+    - Atomic hot-swap to a new checkpoint: the replacement is fully loaded
+      before the reference is switched, and in-flight requests keep using
+      the detector they already acquired
+    - The inference pool is prepared for a new detector (shared-memory workers
+      forked) before the detector is published
+
+    Usage:
+    ```python
+    registry = get_detector_registry()
+    await registry.load()
+    detector = registry.get_detector()
+    result = detector.analyze_prompt("hello")
+    ```
+    """
+
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        """Initialize an empty registry. Call load() to load the model."""
+        self._detector: Optional[PromptDetectorService] = None
+        self._state = self.NOT_LOADED
+        self._last_error: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._cold_start_seconds: Optional[float] = None
+        # Serializes load/swap so two reloads can't race each other
+        self._lock = asyncio.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current lifecycle state of the registry"""
+        return self._state
+
+    @property
+    def is_ready(self) -> bool:
+        """True if a detector is loaded and can serve requests"""
+        return self._detector is not None
+
+    def get_detector(self) -> PromptDetectorService:
+        """
+        Get the current detector.
+        Callers should hold on to the returned instance for the duration of a
+        request so that a concurrent hot-swap does not change it mid-request.
+        Returns: PromptDetectorService: The active detector
+        Raises: DetectorNotReadyError: If no detector is loaded
+        """
+        detector = self._detector
+        if detector is None:
+            raise DetectorNotReadyError("Prompt detector is not ready", state=self._state)
+        return detector
+
+    async def load(
+        self,
+        model_id: Optional[str] = None,
+        checkpoint: Optional[str] = None
+    ) -> PromptDetectorService:
+        """
+        Load a detector and make it the active one.
+        If a detector is already active it keeps serving until the new one has
+        finished loading. If loading fails the previous detector stays active.
+        Args:
+            model_id: Optional Hugging Face model ID. Defaults to HF_MODEL_ID.
+            checkpoint: Optional checkpoint subfolder. Defaults to HF_MODEL_CHECKPOINT.
+        Returns:
+            PromptDetectorService: The newly active detector
+        Raises:
+            RuntimeError: If the model fails to load
+        """
+        async with self._lock:
+            previous = self._detector
+            if previous is None:
+                self._state = self.LOADING
+
+            logger.info("Loading prompt detector...")
+            started = time.perf_counter()
+            pool = get_inference_pool()
+            try:
+                # Loading the model is slow and blocking, keep it off the event loop
+                detector = await asyncio.to_thread(_load_detector, model_id, checkpoint, not pool.forks_workers)
+                # Start the detector's inference workers (shared mode) before any request can use it
+                await pool.prepare(detector)
+            except Exception as e:
+                self._last_error = str(e)
+                if previous is None:
+                    self._state = self.FAILED
+                logger.error(f"Failed to load prompt detector: {str(e)}")
+                raise
+
+            # Single reference assignment, requests see either the old or the new detector
+            self._detector = detector
+            self._state = self.READY
+            self._last_error = None
+            self._loaded_at = time.time()
+
+            elapsed = time.perf_counter() - started
+            if previous is None:
+                logger.info(f"Prompt detector {detector.version} ready in {elapsed:.1f}s")
+                if self._cold_start_seconds is None:
+                    self._cold_start_seconds = process_uptime()
+                    logger.info(
+                        f"Cold start: first verdict {self._cold_start_seconds:.1f}s after process launch "
+                        f"(model source: {detector.source})"
+                    )
+            else:
+                logger.info(f"Swapped prompt detector {previous.version} -> {detector.version} in {elapsed:.1f}s")
+            return detector
+
+    async def swap(
+        self,
+        model_id: Optional[str] = None,
+        checkpoint: Optional[str] = None
+    ) -> PromptDetectorService:
+        """
+        Hot-swap the active detector to a new model or checkpoint.
+        Alias of load() kept for readability at call sites that replace a running model.
+        """
+        return await self.load(model_id=model_id, checkpoint=checkpoint)
+
+    def unload(self) -> None:
+        """Drop the active detector so its memory can be released on shutdown"""
+        self._detector = None
+        self._state = self.NOT_LOADED
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get a summary of the registry state.
+        Returns: Dict with state, readiness, model version and last error
+        """
+        detector = self._detector
+        return {
+            "state": self._state,
+            "ready": detector is not None,
+            "model": detector.version if detector is not None else None,
+            "loadedAt": self._loaded_at,
+            "coldStartSeconds": self._cold_start_seconds,
+            "lastError": self._last_error,
+        }
+
+
+# Create a singleton instance
+_registry_instance: Optional[DetectorRegistry] = None
+
+
+def get_detector_registry() -> DetectorRegistry:
+    """
+    Get the singleton instance of DetectorRegistry.
+    Returns: DetectorRegistry instance
+    """
+    global _registry_instance
+    if _registry_instance is None:
+        _registry_instance = DetectorRegistry()
+    return _registry_instance
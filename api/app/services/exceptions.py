@@ -0,0 +1,97 @@
+"""
+Custom exceptions for the service layer.
+This module contains custom exception classes used by the detector and LLM services
+to provide more specific error handling than a bare RuntimeError.
+"""
+
+class DetectorNotReadyError(Exception):
+    """
+    Exception raised when the prompt detector cannot serve requests.
+
+    This exception is raised while the model is still loading at startup,
+    or after a failed load left the registry without a usable detector.
+
+    Attributes:
+        message (str): Explanation of the error
+        state (str, optional): The registry state at the time of the error
+    """
+
+    def __init__(self, message, state=None):
+        self.message = message
+        self.state = state
+        if state:
+            self.message = f"{message} (state: {state})"
+        super().__init__(self.message)
+
+
+class DetectorOverloadedError(Exception):
+    """
+    Exception raised when the inference pool cannot accept more work.
+
+    This exception is raised when the number of prompts waiting for the
+    detector reaches the configured limit, so callers can shed load
+    instead of queueing without bound.
+
+    Attributes:
+        message (str): Explanation of the error
+        retry_after (int): Suggested number of seconds before retrying
+    """
+
+    def __init__(self, message, retry_after=1):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class ModelStoreError(Exception):
+    """
+    Exception raised when a model is missing from the local model store or fails verification.
+
+    Attributes:
+        message (str): Explanation of the error
+        path (str, optional): The store directory involved
+    """
+
+    def __init__(self, message, path=None):
+        self.message = message
+        self.path = path
+        if path:
+            self.message = f"{message} ({path})"
+        super().__init__(self.message)
+
+
+class LLMCircuitOpenError(Exception):
+    """
+    Exception raised when calls to the LLM provider are short-circuited.
+
+    This exception is raised while the circuit breaker is open after repeated
+    upstream failures, so requests fail fast instead of waiting on a provider
+    that is down.
+
+    Attributes:
+        message (str): Explanation of the error
+        retry_after (int): Seconds until the circuit lets a trial request through
+    """
+
+    def __init__(self, message, retry_after=1):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class LLMRateLimitedError(Exception):
+    """
+    Exception raised when an outbound LLM request exceeds the local rate limits.
+
+    This exception is raised when the requests or tokens per minute budget
+    would not allow the request within the configured maximum wait.
+
+    Attributes:
+        message (str): Explanation of the error
+        retry_after (int): Suggested number of seconds before retrying
+    """
+
+    def __init__(self, message, retry_after=1):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
@@ -0,0 +1,91 @@
+import importlib.util
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+# Serialized documents are gathered into chunks of about this size before being sent
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+EXPORT_ZSTD_LEVEL = int(os.getenv("EXPORT_ZSTD_LEVEL", "3"))
+
+FORMATS = ("ndjson", "json")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def available_compressions() -> tuple:
+    """Compression modes this install supports; zstd needs the optional zstandard package"""
+    if importlib.util.find_spec("zstandard") is not None:
+        return ("none", "gzip", "zstd")
+    return ("none", "gzip")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def encode_documents(documents: AsyncIterator[Dict[str, Any]], fmt: str = "ndjson") -> AsyncIterator[bytes]:
+    """
+    Serialize documents as NDJSON, or as one JSON array written piece by piece.
+    Yields chunks of about EXPORT_CHUNK_BYTES, so only one chunk is held in memory.
+    Args:
+        documents: Documents to serialize, e.g. from a database cursor
+        fmt: "ndjson" or "json"
+    """
+    separator = "\n" if fmt == "ndjson" else ","
+    parts = ["["] if fmt == "json" else []
+    size = 0
+    first = True
+    async for document in documents:
+        line = json.dumps(document, default=_json_default)
+        if fmt == "ndjson":
+            parts.append(line + separator)
+        else:
+            parts.append(line if first else separator + line)
+        first = False
+        size += len(line) + 1
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+            size = 0
+    if fmt == "json":
+        parts.append("]")
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+async def compress_stream(chunks: AsyncIterator[bytes], method: str = "none") -> AsyncIterator[bytes]:
+    """
+    Compress a byte stream incrementally with gzip or zstd.
+    Each chunk is flushed through the compressor, so the client can start
+    decoding before the export is finished.
+    Args:
+        chunks: Byte chunks to compress
+        method: "none", "gzip" or "zstd"
+    """
+    if method == "none":
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    if method == "zstd":
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=EXPORT_ZSTD_LEVEL).compressobj()
+        sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    else:
+        # wbits=31 writes the gzip header and trailer
+        compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+        sync_flush = zlib.Z_SYNC_FLUSH
+
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(sync_flush)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Dict, Any, List
+
+import torch
+
+from app.services.PromptDetectorService import PromptDetectorService
+from app.services.shared_inference import SharedModelWorkerPool
+
+logger = logging.getLogger(__name__)
+
+# Detector owned by a process-pool worker, set by _init_process_worker
+_worker_detector: Optional[PromptDetectorService] = None
+
+
+def _set_torch_threads(num_threads: int) -> None:
+    """
+    Limit torch intra-op parallelism and keep inter-op parallelism to a single thread.
+    Both are process-wide settings: call it once per process, not once per worker thread.
+    """
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before the first parallel op runs in this process
+        pass
+
+
+def _init_process_worker(model_id: str, checkpoint: str, num_threads: int) -> None:
+    """Process-pool initializer: set torch threads and load this worker's detector"""
+    global _worker_detector
+    _set_torch_threads(num_threads)
+    _worker_detector = PromptDetectorService(model_id=model_id, checkpoint=checkpoint)
+
+
+def _process_analyze(prompt_texts: List[str]) -> List[Dict[str, Any]]:
+    """Run a batch on the detector owned by the current process-pool worker"""
+    return _worker_detector.analyze_prompts(prompt_texts)
+
+
+class InferencePool:
+    """
+    InferencePool runs detector forward passes on a dedicated, size-limited executor.
+
+    Keeping PyTorch off the event loop means a long inference never stalls other
+    requests (dashboard reads, health checks) served by the same uvicorn worker.
+
+    Modes:
+    - thread: a ThreadPoolExecutor sharing the registry's detector. PyTorch releases
+      the GIL inside its kernels so worker threads run in parallel.
+    - process: a ProcessPoolExecutor where each worker loads its own detector.
+      Workers are restarted automatically when the registry swaps models.
+    - shared: pre-forked worker processes that share the registry's model weights
+      through shared memory (see SharedModelWorkerPool). Linux/macOS only.
+
+    Configuration (environment variables):
+    - DETECTOR_EXECUTOR: "thread", "process" or "shared" (default thread)
+    - DETECTOR_WORKERS: Number of concurrent forward passes (default 1)
+    - DETECTOR_TORCH_THREADS: torch intra-op threads per worker
+      (default: CPU count divided by the number of workers). torch has a single
+      process-wide thread setting, so in thread mode it is applied once at start()
+      and every worker thread uses the same value; process and shared modes set
+      it in each worker process.
+    - DETECTOR_CPU_AFFINITY: CPU pinning for shared workers, "auto" or e.g. "0-3;4-7"
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        workers: Optional[int] = None,
+        torch_threads: Optional[int] = None
+    ):
+        """
+        Initialize the pool configuration. Call start() to create the executor.
+        Args:
+            mode: Optional executor mode. Defaults to DETECTOR_EXECUTOR.
+            workers: Optional worker count. Defaults to DETECTOR_WORKERS.
+            torch_threads: Optional torch threads per worker. Defaults to DETECTOR_TORCH_THREADS.
+        """
+        self.mode = (mode or os.getenv("DETECTOR_EXECUTOR", "thread")).lower()
+        if self.mode not in ("thread", "process", "shared"):
+            logger.warning(f"Unknown DETECTOR_EXECUTOR '{self.mode}', using thread")
+            self.mode = "thread"
+        self.workers = max(1, workers or int(os.getenv("DETECTOR_WORKERS", "1")))
+        default_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.torch_threads = max(1, torch_threads or int(os.getenv("DETECTOR_TORCH_THREADS", str(default_threads))))
+        self.cpu_affinity = os.getenv("DETECTOR_CPU_AFFINITY")
+
+        self._executor: Optional[Executor] = None
+        self._shared_pool: Optional[SharedModelWorkerPool] = None
+        self._worker_version: Optional[str] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._busy = 0
+
+    def start(self, detector: Optional[PromptDetectorService] = None) -> None:
+        """
+        Create the executor.
+        Args:
+            detector: Optional loaded detector. In shared mode the workers are
+                forked from it unless prepare() already did; otherwise they start
+                on first use.
+        """
+        self._slots = asyncio.Semaphore(self.workers)
+        if self.mode == "shared" and detector is not None and self._shared_pool is None:
+            self._start_shared_workers(detector)
+        if self.mode == "thread":
+            # One process-wide setting shared by every worker thread
+            _set_torch_threads(self.torch_threads)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="detector-inference"
+            )
+        logger.info(
+            f"Inference pool started (mode={self.mode}, workers={self.workers}, "
+            f"torch_threads={self.torch_threads})"
+        )
+
+    def shutdown(self) -> None:
+        """Shut the executor down, letting running batches finish."""
+        if self._shared_pool is not None:
+            self._shared_pool.shutdown()
+            self._shared_pool = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._worker_version = None
+        logger.info("Inference pool stopped")
+
+    @property
+    def idle_workers(self) -> int:
+        """Number of workers not currently running a batch"""
+        return self.workers - self._busy
+
+    async def analyze(self, detector: PromptDetectorService, prompt_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Run one batch on a pool worker, waiting for a free worker if all are busy.
+        Args:
+            detector: The registry's active detector
+            prompt_texts: The prompts to analyze
+        Returns:
+            List of analysis result dicts, in the same order as prompt_texts
+        """
+        if self._slots is None:
+            self.start()
+
+        async with self._slots:
+            self._busy += 1
+            try:
+                loop = asyncio.get_running_loop()
+                if self.mode == "shared":
+                    # Forked by prepare() when the registry loads a detector, never here
+                    shared_pool = self._shared_pool
+                    if shared_pool is None:
+                        raise RuntimeError("Shared inference workers are not running")
+                    return await shared_pool.analyze(prompt_texts)
+                if self.mode == "process":
+                    executor = self._process_executor(detector)
+                    return await loop.run_in_executor(executor, _process_analyze, prompt_texts)
+                return await loop.run_in_executor(self._executor, detector.analyze_prompts, prompt_texts)
+            finally:
+                self._busy -= 1
+
+    def _process_executor(self, detector: PromptDetectorService) -> Executor:
+        """Get the process pool, (re)starting it if the registry's model changed"""
+        if self._executor is None or self._worker_version != detector.version:
+            if self._executor is not None:
+                logger.info(f"Restarting inference workers for {detector.version}")
+                self._executor.shutdown(wait=False)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(detector.model_id, detector.checkpoint, self.torch_threads)
+            )
+            self._worker_version = detector.version
+        return self._executor
+
+    @property
+    def forks_workers(self) -> bool:
+        """True in shared mode, where the workers are forked from the loaded detector"""
+        return self.mode == "shared"
+
+    async def prepare(self, detector: PromptDetectorService) -> None:
+        """
+        Get the pool ready for a newly loaded detector, before it serves requests.
+        In shared mode this forks the detector's workers in a thread, so the event
+        loop keeps serving while they start, and retires the previous set.
+        Args:
+            detector: The detector the registry is about to make active
+        """
+        if self.mode == "shared":
+            await asyncio.to_thread(self._start_shared_workers, detector)
+
+    def _start_shared_workers(self, detector: PromptDetectorService) -> None:
+        """Fork shared-memory workers for a detector and retire the previous ones"""
+        if self._shared_pool is not None and self._shared_pool.version == detector.version:
+            return
+        previous = self._shared_pool
+        shared_pool = SharedModelWorkerPool(self.workers, self.torch_threads, self.cpu_affinity)
+        shared_pool.start(detector)
+        # Single reference assignment, batches go to either the old or the new workers
+        self._shared_pool = shared_pool
+        if previous is not None:
+            # Old workers finish their queued batches in the background
+            logger.info(f"Retiring inference workers for {previous.version}")
+            threading.Thread(target=previous.shutdown, name="detector-retire-workers", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get pool metrics.
+        Returns: Dict with mode, worker count and busy workers
+        """
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "torchThreads": self.torch_threads,
+            "busyWorkers": self._busy,
+            "aliveProcesses": self._shared_pool.alive_workers if self._shared_pool is not None else None,
+        }
+
+
+# Create a singleton instance
+_pool_instance: Optional[InferencePool] = None
+
+
+def get_inference_pool() -> InferencePool:
+    """
+    Get the singleton instance of InferencePool.
+    Returns: InferencePool instance
+    """
+    global _pool_instance
+    if _pool_instance is None:
+        _pool_instance = InferencePool()
+    return _pool_instance
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from typing import Optional, Dict, Any
+
+from app.services.exceptions import LLMCircuitOpenError, LLMRateLimitedError
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    The n-th retry waits a random time between 0 and initial_backoff * 2**n,
+    capped at max_backoff. A Retry-After from the provider is honoured as the
+    minimum wait. No retry is scheduled past the overall deadline, so one
+    call never takes much longer than deadline seconds.
+    """
+
+    def __init__(self, max_retries: int, initial_backoff: float, max_backoff: float, deadline: float):
+        """
+        Args:
+            max_retries: Retries after the first attempt
+            initial_backoff: Backoff cap for the first retry, in seconds
+            max_backoff: Largest wait between attempts, in seconds
+            deadline: Seconds after the first attempt when no more retries start
+        """
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+    def delay(self, attempt: int, started: float, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt.
+        Args:
+            attempt: Number of the attempt that just failed, starting at 0
+            started: time.monotonic() of the first attempt
+            retry_after: Seconds requested by the provider's Retry-After header, if any
+        Returns:
+            The wait in seconds, or None if the call should not be retried
+        """
+        if attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(self.max_backoff, self.initial_backoff * 2 ** attempt))
+        if retry_after is not None:
+            if retry_after > self.max_backoff:
+                return None
+            delay = max(delay, retry_after)
+        if time.monotonic() + delay - started > self.deadline:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for an upstream service.
+
+    Closed: requests pass and consecutive failures are counted. After
+    failure_threshold failures in a row the circuit opens and requests fail
+    fast with LLMCircuitOpenError for reset_timeout seconds. Then it is
+    half-open: one trial request is let through; success closes the circuit,
+    failure opens it again. A trial that never reports back (e.g. the caller
+    was cancelled) is replaced by a new one after reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+        # Counters
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Current circuit state, moving from open to half-open once reset_timeout has passed"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def before_request(self) -> None:
+        """
+        Check that a request may be sent.
+        Raises: LLMCircuitOpenError: While the circuit is open, or while a half-open trial is running
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and (
+            not self._trial_in_flight or time.monotonic() - self._trial_started >= self.reset_timeout
+        ):
+            self._trial_in_flight = True
+            self._trial_started = time.monotonic()
+            return
+        self._rejected += 1
+        if state == self.HALF_OPEN:
+            retry_after = 1
+        else:
+            retry_after = max(1, math.ceil(self.reset_timeout - (time.monotonic() - self._opened_at)))
+        raise LLMCircuitOpenError("LLM provider circuit is open", retry_after=retry_after)
+
+    def record_success(self) -> None:
+        """Record a healthy response and close the circuit"""
+        if self._state != self.CLOSED:
+            logger.info("LLM circuit closed")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record an upstream failure, opening the circuit past the threshold"""
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self._opened += 1
+                logger.warning(f"LLM circuit opened after {self._failures} failures")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutiveFailures": self._failures,
+            "opened": self._opened,
+            "rejected": self._rejected,
+        }
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for outbound requests.
+
+    Holds up to capacity units and refills at rate_per_minute. acquire()
+    waits for enough units, in arrival order, but never longer than
+    max_wait: if the wait would be longer it fails with LLMRateLimitedError
+    so callers get a quick answer instead of queueing during a burst.
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, max_wait: float, capacity: Optional[float] = None):
+        """
+        Args:
+            name: Name used in errors and stats (e.g. "requests", "tokens")
+            rate_per_minute: Units added per minute; 0 disables limiting
+            max_wait: Longest time acquire() waits, in seconds
+            capacity: Largest burst; defaults to one minute's worth
+        """
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity or rate_per_minute
+        self.max_wait = max_wait
+        self._available = self.capacity
+        self._updated = time.monotonic()
+
+        # Counters
+        self._acquired = 0
+        self._waits = 0
+        self._rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate_per_minute / 60)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Take amount units, waiting for the bucket to refill if needed.
+        Raises: LLMRateLimitedError: If the units won't be available within max_wait
+        """
+        if not self.enabled:
+            return
+        amount = min(amount, self.capacity)
+        # Reserve the units now, letting the balance go negative; each caller then
+        # sleeps until its own reservation is covered, so waits are served in order
+        self._refill()
+        wait = max(0.0, (amount - self._available) * 60 / self.rate_per_minute)
+        if wait > self.max_wait:
+            self._rejected += 1
+            raise LLMRateLimitedError(
+                f"LLM {self.name} per minute limit reached",
+                retry_after=max(1, math.ceil(wait))
+            )
+        self._available -= amount
+        self._acquired += amount
+        if wait > 0:
+            self._waits += 1
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        if self.enabled:
+            self._refill()
+        return {
+            "perMinute": self.rate_per_minute,
+            "available": round(self._available, 1) if self.enabled else None,
+            "acquired": self._acquired,
+            "waits": self._waits,
+            "rejected": self._rejected,
+        }
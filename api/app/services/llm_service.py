@@ -1,11 +1,16 @@
 import os
 from dotenv import load_dotenv
-import requests
+import httpx
+import asyncio
+import importlib.util
+import json
 import time
-from typing import Dict, Any
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, AsyncIterator
 import logging
-import asyncio
 from pathlib import Path
+from app.services.llm_resilience import RetryPolicy, CircuitBreaker, TokenBucket
+from app.services.exceptions import LLMCircuitOpenError, LLMRateLimitedError
 
 # Get the directory containing this file
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -13,15 +18,47 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 # Load environment variables from .env file in the api directory
 load_dotenv(BASE_DIR / '.env')
 
+# Provider responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
 class LLMService:
-    def __init__(self, model="gpt-3.5-turbo-instruct"):  # Changed to instruct model
+    """
+    Client for the OpenAI completions API.
+
+    One instance is shared by the whole app: it owns a single httpx.AsyncClient
+    whose connection pool keeps TLS connections alive between requests, so
+    concurrent chats reuse connections instead of opening one per call and
+    don't tie up a thread each while waiting.
+
+    Configuration (environment variables):
+    - OPENAI_API_KEY: API key (required)
+    - LLM_API_URL: Completions endpoint (default https://api.openai.com/v1/completions)
+    - LLM_MAX_CONNECTIONS: Maximum open connections (default 100)
+    - LLM_MAX_KEEPALIVE_CONNECTIONS: Idle connections kept open (default 20)
+    - LLM_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default 30)
+    - LLM_CONNECT_TIMEOUT / LLM_READ_TIMEOUT / LLM_WRITE_TIMEOUT / LLM_POOL_TIMEOUT:
+      Per-phase timeouts in seconds (default 5 / 30 / 10 / 5)
+    - LLM_HTTP2: "true" or "false" (default true; used only if the h2 package is installed)
+
+    Resilience (see llm_resilience.py):
+    - LLM_MAX_RETRIES: Retries after a 429, 5xx, timeout or connection error (default 3)
+    - LLM_INITIAL_BACKOFF / LLM_MAX_BACKOFF: Backoff bounds in seconds (default 2 / 10)
+    - LLM_RETRY_DEADLINE: No retry starts later than this many seconds after the first attempt (default 20)
+    - LLM_BREAKER_FAILURES: Consecutive failures that open the circuit (default 5)
+    - LLM_BREAKER_RESET_SECONDS: Seconds the circuit stays open (default 30)
+    - LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE: Outbound budgets, 0 disables (default 3500 / 90000)
+    - LLM_MAX_CONCURRENT: Maximum requests in flight (default LLM_MAX_CONNECTIONS)
+    - LLM_LIMIT_MAX_WAIT: Longest wait for a rate limit or concurrency slot in seconds (default 5)
+    """
+
+    def __init__(self, model="gpt-3.5-turbo-instruct", client: Optional[httpx.AsyncClient] = None):  # Changed to instruct model
         # Use OpenAI API key
         self.api_token = os.getenv("OPENAI_API_KEY")
         if not self.api_token:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
         # OpenAI API endpoint for completions (not chat completions)
-        self.api_url = "https://api.openai.com/v1/completions"  # Changed to completions endpoint
+        self.api_url = os.getenv("LLM_API_URL", "https://api.openai.com/v1/completions")  # Changed to completions endpoint
         
         # Default model
         self.model = model
@@ -34,8 +71,195 @@ class LLMService:
         self.logger = logging.getLogger(__name__)
 
         # Retry configuration
-        self.max_retries = 3  # Reduced from 5
-        self.initial_backoff = 2  # Increased initial backoff
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))  # Reduced from 5
+        self.initial_backoff = float(os.getenv("LLM_INITIAL_BACKOFF", "2"))  # Increased initial backoff
+        self.retry_policy = RetryPolicy(
+            max_retries=self.max_retries,
+            initial_backoff=self.initial_backoff,
+            max_backoff=float(os.getenv("LLM_MAX_BACKOFF", "10")),
+            deadline=float(os.getenv("LLM_RETRY_DEADLINE", "20"))
+        )
+        self.circuit = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+        )
+
+        # Outbound rate and concurrency limits
+        self.limit_max_wait = float(os.getenv("LLM_LIMIT_MAX_WAIT", "5"))
+        self.request_bucket = TokenBucket(
+            "requests", float(os.getenv("LLM_REQUESTS_PER_MINUTE", "3500")), self.limit_max_wait
+        )
+        self.token_bucket = TokenBucket(
+            "tokens", float(os.getenv("LLM_TOKENS_PER_MINUTE", "90000")), self.limit_max_wait
+        )
+        self.max_concurrent = int(os.getenv("LLM_MAX_CONCURRENT", os.getenv("LLM_MAX_CONNECTIONS", "100")))
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._in_flight = 0
+
+        # Counters
+        self._counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "successes": 0,
+            "failures": 0,
+            "concurrencyRejected": 0,
+        }
+
+        # Connection pool and timeouts
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        )
+        self.timeout = httpx.Timeout(
+            connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+            read=float(os.getenv("LLM_READ_TIMEOUT", "30")),
+            write=float(os.getenv("LLM_WRITE_TIMEOUT", "10")),
+            pool=float(os.getenv("LLM_POOL_TIMEOUT", "5"))
+        )
+        # HTTP/2 multiplexes concurrent requests over one connection; it needs the optional h2 package
+        self.http2 = os.getenv("LLM_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+        self._client = client
+
+    async def start(self) -> None:
+        """Create the shared HTTP client. Safe to call more than once."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2
+            )
+            self.logger.info(
+                f"LLM client started (http2={self.http2}, max_connections={self.limits.max_connections})"
+            )
+
+    async def aclose(self) -> None:
+        """Close the HTTP client and its pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared client, creating it if start() was not called"""
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        return self._client
+
+    @asynccontextmanager
+    async def _request(self, payload: Dict[str, Any]) -> AsyncIterator[httpx.Response]:
+        """
+        Send a completions request with limits, retries and circuit breaking.
+        Each attempt waits for a concurrency slot and the request budget (the token
+        budget is charged once, for the first attempt), and is retried with jittered
+        backoff on 429/5xx responses, timeouts and connection errors. The slot is
+        released while backing off. The response body is not read yet, so callers can
+        stream it; it is closed when the context exits.
+        Args: payload (Dict): The completions request body
+        Yields: httpx.Response: A successful response
+        Raises:
+            LLMRateLimitedError: If a limit can't be met within LLM_LIMIT_MAX_WAIT
+            LLMCircuitOpenError: If the circuit breaker is open
+            httpx.HTTPError: If the request failed and no retry is left
+        """
+        self._counters["calls"] += 1
+        # Rough token estimate: ~4 characters per prompt token plus the completion budget
+        estimated_tokens = len(payload["prompt"]) // 4 + payload["max_tokens"]
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            # The slot is only held while a request is in flight, not through the backoff
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.limit_max_wait)
+            except asyncio.TimeoutError:
+                self._counters["concurrencyRejected"] += 1
+                raise LLMRateLimitedError(f"{self.max_concurrent} LLM requests already in flight")
+
+            self._in_flight += 1
+            try:
+                await self.request_bucket.acquire(1)
+                if attempt == 0:
+                    # Retries resend the same request, so its tokens are only charged once
+                    await self.token_bucket.acquire(estimated_tokens)
+                self.circuit.before_request()
+                self._counters["attempts"] += 1
+
+                client = await self._get_client()
+                try:
+                    response = await client.send(client.build_request("POST", self.api_url, json=payload), stream=True)
+                except httpx.TransportError as e:
+                    delay = self._record_failure(attempt, started)
+                    if delay is None:
+                        self._counters["failures"] += 1
+                        raise
+                    self.logger.warning(f"LLM request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                else:
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        try:
+                            if response.is_error:
+                                # Read the body so the error handler can report the provider's message
+                                await response.aread()
+                                self._counters["failures"] += 1
+                            else:
+                                self._counters["successes"] += 1
+                            # Any non-retryable answer means the provider itself is up
+                            self.circuit.record_success()
+                            response.raise_for_status()
+                            yield response
+                            return
+                        finally:
+                            await response.aclose()
+
+                    await response.aread()
+                    await response.aclose()
+                    delay = self._record_failure(attempt, started, self._retry_after(response))
+                    if delay is None:
+                        self._counters["failures"] += 1
+                        response.raise_for_status()
+                    self.logger.warning(f"LLM request got HTTP {response.status_code}, retrying in {delay:.1f}s")
+            finally:
+                self._in_flight -= 1
+                self._slots.release()
+
+            self._counters["retries"] += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _record_failure(self, attempt: int, started: float, retry_after: Optional[float] = None) -> Optional[float]:
+        """Count an upstream failure and get the wait before retrying, or None to give up"""
+        self.circuit.record_failure()
+        if self.circuit.state != CircuitBreaker.CLOSED:
+            # This failure opened the circuit; a retry would only be short-circuited
+            return None
+        return self.retry_policy.delay(attempt, started, retry_after)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """Seconds requested by the provider's retry-after-ms or Retry-After header, if any"""
+        try:
+            if "retry-after-ms" in response.headers:
+                return float(response.headers["retry-after-ms"]) / 1000
+            if "retry-after" in response.headers:
+                return float(response.headers["retry-after"])
+        except ValueError:
+            # HTTP-date form is not used by the provider; fall back to backoff
+            pass
+        return None
+
+    def _payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        """Build the completions request body"""
+        # Prepare the payload with minimal tokens
+        payload = {
+            "model": self.model,
+            "prompt": prompt,  # Changed from messages format
+            "max_tokens": 50,  # Reduced significantly from 150 to 50
+            "temperature": 0.7,  # Controls randomness
+            "top_p": 0.9      # Nucleus sampling parameter
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
 
     async def generate_response(self, prompt: str) -> Dict[str, Any]:
         """
@@ -44,25 +268,11 @@ class LLMService:
         Returns: Dict: Response containing generated text or error message
         """
         try:
-            # Prepare the payload with minimal tokens
-            payload = {
-                "model": self.model,
-                "prompt": prompt,  # Changed from messages format
-                "max_tokens": 50,  # Reduced significantly from 150 to 50
-                "temperature": 0.7,  # Controls randomness
-                "top_p": 0.9      # Nucleus sampling parameter
-            }
+            payload = self._payload(prompt)
             
-            # Make the API call using asyncio to run in an async context
-            response = await asyncio.to_thread(
-                lambda: requests.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30  # Reduced timeout to 30 seconds
-                )
-            )
-            response.raise_for_status()  # Raise exception for bad status codes
+            # Make the API call on the shared connection pool
+            async with self._request(payload) as response:
+                await response.aread()
 
             # Process the response
             result = response.json()
@@ -76,7 +286,71 @@ class LLMService:
             self.logger.warning(f"Unexpected response format: {result}")
             return {"generated_text": "No response generated"}
 
-        except requests.exceptions.HTTPError as e:
+        except Exception as e:
+            return self._error_response(e)
+
+    async def stream_response(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate a response using OpenAI's completions API in streaming mode.
+        Tokens are yielded as the provider sends them. The time to the first
+        token is measured from sending the request and logged.
+        Args: prompt (str): The input prompt for the model
+        Yields: Dict events:
+            {"type": "token", "text": str} for each piece of generated text
+            {"type": "done", "generated_text": str, "ttftMs": float, "totalMs": float} at the end
+            {"type": "error", "error": str} if the request fails (no further events follow)
+        """
+        started = time.perf_counter()
+        ttft_ms = None
+        parts: List[str] = []
+        try:
+            # Retries only happen before the stream starts, never after tokens were sent
+            async with self._request(self._payload(prompt, stream=True)) as response:
+                # Server-sent events: "data: {json}" lines, ending with "data: [DONE]"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or [{}]
+                    text = choices[0].get("text", "")
+                    if not text:
+                        continue
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                        self.logger.info(f"LLM time to first token: {ttft_ms:.0f} ms")
+                    parts.append(text)
+                    yield {"type": "token", "text": text}
+
+        except Exception as e:
+            yield {"type": "error", **self._error_response(e)}
+            return
+
+        total_ms = (time.perf_counter() - started) * 1000
+        generated_text = "".join(parts).strip()
+        self.logger.info(f"Streamed response of length: {len(generated_text)} in {total_ms:.0f} ms")
+        yield {
+            "type": "done",
+            "generated_text": generated_text or "No response generated",
+            "ttftMs": ttft_ms,
+            "totalMs": total_ms
+        }
+
+    def _error_response(self, e: Exception) -> Dict[str, str]:
+        """
+        Log a failed API call and turn it into an error response.
+        Args: e (Exception): The exception raised by the request
+        Returns: Dict: Response containing the error message
+        """
+        if isinstance(e, LLMCircuitOpenError):
+            self.logger.warning(f"LLM call short-circuited: {e.message}")
+            return {"error": "The OpenAI API is currently unavailable. Please try again shortly."}
+        if isinstance(e, LLMRateLimitedError):
+            self.logger.warning(f"LLM call rate limited: {e.message}")
+            return {"error": "Too many requests to the OpenAI API right now. Please try again shortly."}
+        if isinstance(e, httpx.HTTPStatusError):
             status_code = e.response.status_code if hasattr(e, 'response') else 'unknown'
             self.logger.error(f"HTTP error {status_code}: {str(e)}")
             
@@ -95,19 +369,32 @@ class LLMService:
                     return {"error": f"OpenAI API error: {error_message}"}
             
             return {"error": f"API request failed with status {status_code}: {str(e)}"}
-        except requests.exceptions.ConnectionError as e:
+        if isinstance(e, httpx.ConnectError):
             self.logger.error(f"Connection error: {str(e)}")
             return {"error": "Failed to connect to the OpenAI API. Please check your internet connection."}
-        except requests.exceptions.Timeout as e:
+        if isinstance(e, httpx.TimeoutException):
             self.logger.error(f"Request timed out: {str(e)}")
             return {"error": "Request to OpenAI API timed out. The service might be experiencing high demand."}
-        except requests.exceptions.RequestException as e:
+        if isinstance(e, httpx.HTTPError):
             self.logger.error(f"API request failed: {str(e)}")
             return {"error": f"Failed to generate response: {str(e)}"}
-        except Exception as e:
-            self.logger.error(f"Error generating response: {str(e)}")
-            return {"error": f"An unexpected error occurred: {str(e)}"}
+        self.logger.error(f"Error generating response: {str(e)}")
+        return {"error": f"An unexpected error occurred: {str(e)}"}
     
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get LLM client metrics.
+        Returns: Dict with call/retry/failure counters, circuit breaker state and limiter usage
+        """
+        return {
+            **self._counters,
+            "inFlight": self._in_flight,
+            "maxConcurrent": self.max_concurrent,
+            "circuit": self.circuit.stats(),
+            "requestLimit": self.request_bucket.stats(),
+            "tokenLimit": self.token_bucket.stats(),
+        }
+
     async def health_check(self) -> Dict[str, str]:
         """
         Check if the OpenAI API is accessible.
@@ -121,14 +408,8 @@ class LLMService:
                 "max_tokens": 5
             }
             
-            response = await asyncio.to_thread(
-                lambda: requests.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=10
-                )
-            )
+            client = await self._get_client()
+            response = await client.post(self.api_url, json=payload, timeout=10)
             
             if response.status_code == 200:
                 return {"status": "ok", "message": "OpenAI API is connected and accessible"}
@@ -140,3 +421,27 @@ class LLMService:
                 
         except Exception as e:
             return {"status": "error", "message": f"Connection to OpenAI API failed: {str(e)}"}
+
+
+# Create a singleton instance
+_llm_instance: Optional[LLMService] = None
+
+
+def get_llm_service() -> LLMService:
+    """
+    Get the singleton instance of LLMService.
+    Returns: LLMService instance
+    Raises: ValueError: If OPENAI_API_KEY is not set
+    """
+    global _llm_instance
+    if _llm_instance is None:
+        _llm_instance = LLMService()
+    return _llm_instance
+
+
+async def close_llm_service() -> None:
+    """Close the shared LLM client, if one was created"""
+    global _llm_instance
+    if _llm_instance is not None:
+        await _llm_instance.aclose()
+        _llm_instance = None
@@ -0,0 +1,281 @@
+"""
+Local, versioned store of detector model artifacts.
+
+The store lets the API start without contacting the Hugging Face Hub. A
+checkpoint is fetched once (at image build time or by an operator), converted
+to safetensors if needed, and written to
+
+    <MODEL_STORE_DIR>/<model id>/<checkpoint>/
+
+together with a manifest.json holding the SHA-256 and size of every file.
+At startup the detector loads straight from that directory with
+local_files_only=True; safetensors weights are memory-mapped rather than
+read into a separate buffer first.
+
+Command line (from the api directory):
+    python -m app.services.model_store fetch [--model-id ID] [--checkpoint NAME] [--revision REV]
+    python -m app.services.model_store verify [--model-id ID] [--checkpoint NAME]
+    python -m app.services.model_store list
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from app.services.exceptions import ModelStoreError
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+DEFAULT_MODEL_ID = "jonastuttle/NobleGuardClassifier"
+DEFAULT_CHECKPOINT = "checkpoint-2320"
+
+# Files needed to load the tokenizer and model; optimizer/trainer state is skipped
+ARTIFACT_PATTERNS = [
+    "*.json",
+    "*.safetensors",
+    "*.bin",
+    "*.model",
+    "*.txt",
+]
+SKIPPED_FILES = {"optimizer.pt", "scheduler.pt", "rng_state.pth", "training_args.bin", "trainer_state.json"}
+
+
+def default_store_dir() -> Path:
+    """Store root: MODEL_STORE_DIR or ~/.cache/nobleguard/models"""
+    return Path(os.getenv("MODEL_STORE_DIR", Path.home() / ".cache" / "nobleguard" / "models"))
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """
+    ModelStore manages checkpoints stored on local disk.
+
+    Features:
+    - One directory per model id and checkpoint, so several versions can sit
+      side by side and a hot-swap just points at another directory
+    - A manifest with checksums written only after every file is in place
+    - Atomic install: a fetch is staged in a temporary directory and renamed
+      into place, so a half-finished download is never loaded
+
+    Usage:
+    ```python
+    store = ModelStore()
+    path = store.require("jonastuttle/NobleGuardClassifier", "checkpoint-2320")
+    ```
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        """
+        Initialize the store.
+        Args:
+            root: Optional store root directory. Defaults to MODEL_STORE_DIR.
+        """
+        self.root = Path(root) if root else default_store_dir()
+
+    def path_for(self, model_id: str, checkpoint: str) -> Path:
+        """Directory holding one checkpoint, e.g. <root>/jonastuttle/NobleGuardClassifier/checkpoint-2320"""
+        return self.root / model_id / checkpoint
+
+    def manifest(self, model_id: str, checkpoint: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a checkpoint's manifest.
+        Returns: The manifest dict, or None if the checkpoint is not in the store
+        """
+        manifest_path = self.path_for(model_id, checkpoint) / MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+
+    def require(self, model_id: str, checkpoint: str, verify_checksums: bool = False) -> Path:
+        """
+        Get the directory of a stored checkpoint, checking it is complete.
+        File sizes are always compared with the manifest; full checksums only
+        when verify_checksums is True since hashing the weights takes a few seconds.
+        Args:
+            model_id: Hugging Face model ID
+            checkpoint: Checkpoint subfolder
+            verify_checksums: Also compare SHA-256 of every file
+        Returns:
+            Path: Directory to pass to from_pretrained
+        Raises:
+            ModelStoreError: If the checkpoint is missing or does not match its manifest
+        """
+        path = self.path_for(model_id, checkpoint)
+        manifest = self.manifest(model_id, checkpoint)
+        if manifest is None:
+            raise ModelStoreError(
+                f"Model {model_id} ({checkpoint}) is not in the model store, "
+                f"run 'python -m app.services.model_store fetch'",
+                path=str(path)
+            )
+
+        problems = self._check_files(path, manifest, verify_checksums)
+        if problems:
+            raise ModelStoreError(f"Model store entry is corrupt: {'; '.join(problems)}", path=str(path))
+        return path
+
+    def verify(self, model_id: str, checkpoint: str) -> Path:
+        """Check every file of a stored checkpoint against its manifest checksums"""
+        return self.require(model_id, checkpoint, verify_checksums=True)
+
+    def fetch(self, model_id: str, checkpoint: str, revision: Optional[str] = None, force: bool = False) -> Path:
+        """
+        Download a checkpoint from the Hugging Face Hub into the store.
+        Weights are converted to safetensors if the checkpoint only has a
+        PyTorch pickle, so they can be memory-mapped on load.
+        Args:
+            model_id: Hugging Face model ID
+            checkpoint: Checkpoint subfolder
+            revision: Optional commit hash or tag to pin
+            force: Re-download even if the checkpoint is already stored
+        Returns:
+            Path: Directory of the stored checkpoint
+        Raises:
+            ModelStoreError: If the download produced no usable weights
+        """
+        from huggingface_hub import snapshot_download
+
+        target = self.path_for(model_id, checkpoint)
+        if not force and self.manifest(model_id, checkpoint) is not None:
+            logger.info(f"{model_id} ({checkpoint}) already in store at {target}")
+            return self.verify(model_id, checkpoint)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{checkpoint}-", dir=target.parent))
+        try:
+            logger.info(f"Downloading {model_id} ({checkpoint}) from Hugging Face...")
+            started = time.perf_counter()
+            snapshot_download(
+                repo_id=model_id,
+                revision=revision,
+                allow_patterns=[f"{checkpoint}/{pattern}" for pattern in ARTIFACT_PATTERNS],
+                local_dir=str(staging / "download"),
+            )
+            source = staging / "download" / checkpoint
+            files = staging / "files"
+            files.mkdir()
+            for item in source.iterdir():
+                if item.is_file() and item.name not in SKIPPED_FILES:
+                    shutil.move(str(item), files / item.name)
+            logger.info(f"Download finished in {time.perf_counter() - started:.1f}s")
+
+            self._ensure_safetensors(files)
+            self._write_manifest(files, model_id, checkpoint, revision)
+
+            # Swap the finished directory into place
+            if target.exists():
+                shutil.rmtree(target)
+            files.rename(target)
+            logger.info(f"Stored {model_id} ({checkpoint}) at {target}")
+            return target
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """List every stored checkpoint's manifest"""
+        if not self.root.exists():
+            return []
+        return [
+            json.loads(manifest_path.read_text())
+            for manifest_path in sorted(self.root.rglob(MANIFEST_FILE))
+        ]
+
+    @staticmethod
+    def _ensure_safetensors(files: Path) -> None:
+        """Convert pytorch_model.bin to model.safetensors so weights can be memory-mapped"""
+        if any(files.glob("*.safetensors")):
+            return
+        if not (files / "pytorch_model.bin").exists():
+            raise ModelStoreError("Checkpoint has no model weights", path=str(files))
+
+        from transformers import AutoModelForSequenceClassification
+
+        logger.info("Converting pytorch_model.bin to safetensors...")
+        model = AutoModelForSequenceClassification.from_pretrained(str(files), local_files_only=True)
+        model.save_pretrained(str(files), safe_serialization=True)
+        (files / "pytorch_model.bin").unlink()
+
+    @staticmethod
+    def _write_manifest(files: Path, model_id: str, checkpoint: str, revision: Optional[str]) -> None:
+        """Record the size and SHA-256 of every file in the checkpoint"""
+        manifest = {
+            "model_id": model_id,
+            "checkpoint": checkpoint,
+            "revision": revision,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "files": {
+                item.name: {"sha256": _sha256(item), "size": item.stat().st_size}
+                for item in sorted(files.iterdir()) if item.is_file()
+            },
+        }
+        with open(files / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    @staticmethod
+    def _check_files(path: Path, manifest: Dict[str, Any], verify_checksums: bool) -> List[str]:
+        """Compare files on disk with the manifest, returning a list of problems"""
+        problems = []
+        for name, expected in manifest.get("files", {}).items():
+            item = path / name
+            if not item.exists():
+                problems.append(f"{name} is missing")
+            elif item.stat().st_size != expected["size"]:
+                problems.append(f"{name} has size {item.stat().st_size}, expected {expected['size']}")
+            elif verify_checksums and _sha256(item) != expected["sha256"]:
+                problems.append(f"{name} checksum mismatch")
+        return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point for fetching and verifying stored models"""
+    parser = argparse.ArgumentParser(description="Manage the local detector model store")
+    parser.add_argument("--store-dir", type=Path, default=None, help="Defaults to MODEL_STORE_DIR")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name in ("fetch", "verify"):
+        sub = subparsers.add_parser(name)
+        sub.add_argument("--model-id", default=os.getenv("HF_MODEL_ID", DEFAULT_MODEL_ID))
+        sub.add_argument("--checkpoint", default=os.getenv("HF_MODEL_CHECKPOINT", DEFAULT_CHECKPOINT))
+        if name == "fetch":
+            sub.add_argument("--revision", default=None, help="Commit hash or tag to pin")
+            sub.add_argument("--force", action="store_true", help="Re-download even if already stored")
+    subparsers.add_parser("list")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    store = ModelStore(args.store_dir)
+    try:
+        if args.command == "fetch":
+            print(store.fetch(args.model_id, args.checkpoint, revision=args.revision, force=args.force))
+        elif args.command == "verify":
+            print(f"OK {store.verify(args.model_id, args.checkpoint)}")
+        else:
+            for manifest in store.entries():
+                size_mb = sum(f["size"] for f in manifest["files"].values()) / (1024 * 1024)
+                print(f"{manifest['model_id']} {manifest['checkpoint']} "
+                      f"rev={manifest.get('revision') or '-'} {size_mb:.0f} MB fetched {manifest['fetched_at']}")
+    except ModelStoreError as e:
+        print(f"ERROR {e.message}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+import torch
+
+from app.services.PromptDetectorService import PromptDetectorService
+from app.services.detector_backends import verify_backend
+
+logger = logging.getLogger(__name__)
+
+# Seconds between worker liveness checks in the result reader thread
+LIVENESS_CHECK_SECONDS = 1.0
+
+
+def parse_cpu_affinity(value: Optional[str], workers: int) -> List[Optional[List[int]]]:
+    """
+    Work out which CPUs each worker should be pinned to.
+    Args:
+        value: DETECTOR_CPU_AFFINITY. Either unset (no pinning), "auto" (split the
+            CPUs available to this process into equal contiguous slices), or one
+            CPU list per worker separated by ";" e.g. "0-3;4-7"
+        workers: Number of workers
+    Returns:
+        One CPU list (or None for no pinning) per worker
+    """
+    if not value or not hasattr(os, "sched_setaffinity"):
+        return [None] * workers
+
+    if value.strip().lower() == "auto":
+        cpus = sorted(os.sched_getaffinity(0))
+        per_worker = max(1, len(cpus) // workers)
+        return [cpus[i * per_worker:(i + 1) * per_worker] or None for i in range(workers)]
+
+    def parse_cpu_list(spec: str) -> List[int]:
+        cpus = []
+        for part in spec.split(","):
+            part = part.strip()
+            if "-" in part:
+                start, end = part.split("-")
+                cpus.extend(range(int(start), int(end) + 1))
+            elif part:
+                cpus.append(int(part))
+        return cpus
+
+    specs = [spec for spec in value.split(";") if spec.strip()]
+    return [parse_cpu_list(specs[i % len(specs)]) for i in range(workers)]
+
+
+def _worker_main(
+    detector: PromptDetectorService,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    index: int,
+    num_threads: int,
+    cpus: Optional[List[int]]
+) -> None:
+    """
+    Worker loop: pull (job id, prompts) from the task queue and push back (job id, ok, payload).
+    Before running a job the worker pushes (job id, None, index) so the parent knows
+    which worker holds it if the worker dies.
+    The detector is inherited from the parent through fork. Its weights live in
+    shared memory, so every worker reads the same physical pages.
+    """
+    # Don't inherit the server's signal handlers: the parent decides when workers stop
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Fast tokenizers can't reuse the parent's thread pool after a fork
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(num_threads)
+    # The parent skips the parity check and warm-up in shared mode (see
+    # DetectorRegistry.load), so each worker runs its own before taking batches
+    detector.backend = verify_backend(detector)
+    try:
+        detector.analyze_prompt("Hello, how are you?")
+    except Exception as e:
+        logger.warning(f"Inference worker warm-up failed: {str(e)}")
+
+    while True:
+        job = tasks.get()
+        if job is None:
+            break
+        job_id, prompt_texts = job
+        results.put((job_id, None, index))
+        try:
+            results.put((job_id, True, detector.analyze_prompts(prompt_texts)))
+        except Exception as e:
+            results.put((job_id, False, f"{e.__class__.__name__}: {str(e)}"))
+
+
+class SharedModelWorkerPool:
+    """
+    SharedModelWorkerPool pre-forks worker processes that share one copy of the model weights.
+
+    The parent process loads the detector, moves its parameters into shared memory
+    with share_memory(), and forks the workers. Each worker serves batches from a
+    local IPC queue, so N workers use N times the CPU but roughly one model's worth
+    of RAM, unlike N uvicorn workers which would each load their own ~700MB copy.
+
+    Requires the "fork" start method (Linux/macOS). Use the "process" executor mode
+    on platforms without fork.
+    """
+
+    def __init__(self, workers: int, torch_threads: int, cpu_affinity: Optional[str] = None):
+        """
+        Initialize the pool configuration. Call start() to fork the workers.
+        Args:
+            workers: Number of worker processes
+            torch_threads: torch intra-op threads per worker
+            cpu_affinity: Optional DETECTOR_CPU_AFFINITY value, see parse_cpu_affinity
+        """
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self.cpu_sets = parse_cpu_affinity(cpu_affinity, workers)
+        self.version: Optional[str] = None
+        self._detector: Optional[PromptDetectorService] = None
+
+        self._ctx = multiprocessing.get_context("fork")
+        self._tasks: Optional[multiprocessing.Queue] = None
+        self._results: Optional[multiprocessing.Queue] = None
+        self._processes: List[multiprocessing.Process] = []
+        self._reader: Optional[threading.Thread] = None
+        self._retiring = False
+        self._stopping = threading.Event()
+
+        self._job_ids = itertools.count()
+        self._futures: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        # Worker index holding each started job, so a dead worker only fails its own jobs
+        self._owners: Dict[int, int] = {}
+        self._futures_lock = threading.Lock()
+
+    def start(self, detector: PromptDetectorService) -> None:
+        """
+        Move the detector's weights into shared memory and fork the workers.
+        Args:
+            detector: The loaded detector to serve
+        """
+        detector.model.share_memory()
+        self._detector = detector
+        self.version = detector.version
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._stopping.clear()
+
+        for i in range(self.workers):
+            self._processes.append(self._spawn_worker(detector, i))
+
+        self._reader = threading.Thread(target=self._read_results, name="detector-shared-results", daemon=True)
+        self._reader.start()
+        logger.info(
+            f"Forked {self.workers} shared-memory inference workers for {self.version} "
+            f"(torch_threads={self.torch_threads}, cpus={self.cpu_sets})"
+        )
+
+    def _spawn_worker(self, detector: PromptDetectorService, index: int) -> multiprocessing.Process:
+        """Fork one worker process"""
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(detector, self._tasks, self._results, index, self.torch_threads, self.cpu_sets[index]),
+            name=f"detector-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def shutdown(self) -> None:
+        """
+        Stop the workers once they have finished the batches already queued.
+        Blocks until the workers exit; call it from a thread when retiring a pool
+        while the event loop keeps serving.
+        """
+        # Workers stop at the first None, after every job queued before it
+        self._retiring = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                logger.warning(f"Inference worker {process.name} did not stop, terminating it")
+                process.terminate()
+
+        # The reader exits once it has drained the remaining results
+        self._stopping.set()
+        if self._reader is not None:
+            self._reader.join(timeout=LIVENESS_CHECK_SECONDS * 2)
+
+        self._processes = []
+        self._detector = None
+        self._fail_pending(RuntimeError("Inference workers stopped"))
+        logger.info(f"Stopped shared-memory inference workers for {self.version}")
+
+    async def analyze(self, prompt_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Send one batch to whichever worker is free and wait for its results.
+        Args:
+            prompt_texts: The prompts to analyze
+        Returns:
+            List of analysis result dicts, in the same order as prompt_texts
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = next(self._job_ids)
+        with self._futures_lock:
+            self._futures[job_id] = (loop, future)
+        self._tasks.put((job_id, prompt_texts))
+        return await future
+
+    def _read_results(self) -> None:
+        """Reader thread: hand worker results back to the waiting coroutines"""
+        while True:
+            try:
+                job_id, ok, payload = self._results.get(timeout=LIVENESS_CHECK_SECONDS)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+
+            if ok is None:
+                # A worker took the job; payload is its index
+                with self._futures_lock:
+                    if job_id in self._futures:
+                        self._owners[job_id] = payload
+                continue
+
+            with self._futures_lock:
+                entry = self._futures.pop(job_id, None)
+                self._owners.pop(job_id, None)
+            if entry is None:
+                continue
+            loop, future = entry
+            if ok:
+                loop.call_soon_threadsafe(self._resolve, future, payload, None)
+            else:
+                loop.call_soon_threadsafe(self._resolve, future, None, RuntimeError(payload))
+
+    def _check_workers(self) -> None:
+        """
+        Replace dead workers and fail the jobs they held, since those batches are lost.
+        Jobs held by healthy workers, or still queued, carry on as normal.
+        """
+        if self._retiring:
+            return
+        dead = [i for i, p in enumerate(self._processes) if not p.is_alive()]
+        if not dead:
+            return
+        # Fail the dead workers' jobs before respawning, so the replacement's jobs
+        # under the same index are never mistaken for lost ones
+        with self._futures_lock:
+            lost = [job_id for job_id, owner in self._owners.items() if owner in dead]
+            pending = [self._futures.pop(job_id) for job_id in lost if job_id in self._futures]
+            for job_id in lost:
+                del self._owners[job_id]
+        for loop, future in pending:
+            loop.call_soon_threadsafe(self._resolve, future, None, RuntimeError("Inference worker died"))
+
+        for i in dead:
+            process = self._processes[i]
+            logger.error(f"Inference worker {process.name} exited with code {process.exitcode}, restarting it")
+            self._processes[i] = self._spawn_worker(self._detector, i)
+
+    def _fail_pending(self, error: Exception) -> None:
+        """Fail every job that is still waiting for a result"""
+        with self._futures_lock:
+            pending = list(self._futures.values())
+            self._futures.clear()
+            self._owners.clear()
+        for loop, future in pending:
+            loop.call_soon_threadsafe(self._resolve, future, None, error)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any, error: Optional[Exception]) -> None:
+        """Set a future's outcome on its own event loop, unless the caller gave up"""
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    @property
+    def alive_workers(self) -> int:
+        """Number of worker processes still running"""
+        return sum(1 for p in self._processes if p.is_alive())
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any, AsyncIterator
+
+from app.services.llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeCall:
+    """
+    An LLM call started before the detector's verdict is known.
+
+    The call runs as its own task while the prompt is classified. If the
+    prompt turns out to be clean the caller takes its result (or, in
+    streaming mode, its buffered events); if it is an attack the call is
+    cancelled, which closes the upstream request.
+
+    Usage:
+    ```python
+    call = SpeculativeCall(llm_service, prompt_text)
+    analysis = await batcher.analyze(prompt_text)
+    if analysis["isAttack"]:
+        call.cancel()
+    else:
+        response = await call.result()
+    ```
+    """
+
+    def __init__(self, llm_service: LLMService, prompt: str, stream: bool = False):
+        """
+        Start the LLM call.
+        Args:
+            llm_service: The shared LLMService
+            prompt: The prompt to send
+            stream: Use stream_response and buffer its events instead of generate_response
+        """
+        self.prompt = prompt
+        self.stream = stream
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._events: Optional[asyncio.Queue] = asyncio.Queue() if stream else None
+        if stream:
+            self._task = asyncio.create_task(self._run_stream(llm_service))
+        else:
+            self._task = asyncio.create_task(self._run(llm_service))
+
+    async def _run(self, llm_service: LLMService) -> Dict[str, Any]:
+        try:
+            return await llm_service.generate_response(self.prompt)
+        finally:
+            self.finished = time.perf_counter()
+
+    async def _run_stream(self, llm_service: LLMService) -> None:
+        try:
+            async for event in llm_service.stream_response(self.prompt):
+                await self._events.put(event)
+        finally:
+            self.finished = time.perf_counter()
+
+    @property
+    def done(self) -> bool:
+        """True if the LLM call has already finished"""
+        return self._task.done()
+
+    def elapsed_ms(self, until: float) -> float:
+        """Milliseconds the call ran for up to `until` (a time.perf_counter() value)"""
+        end = min(self.finished, until) if self.finished is not None else until
+        return (end - self.started) * 1000
+
+    def cancel(self) -> bool:
+        """
+        Cancel the call.
+        Returns: True if it was still running, False if it had already finished
+        """
+        if self._task.done():
+            return False
+        self._task.cancel()
+        return True
+
+    async def result(self) -> Dict[str, Any]:
+        """Wait for the response of a non-streaming call"""
+        return await self._task
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Relay the events of a streaming call, including those buffered while the
+        prompt was being classified. Cancels the call if the consumer stops early.
+        """
+        try:
+            while True:
+                event = await self._events.get()
+                yield event
+                if event["type"] in ("done", "error"):
+                    return
+        finally:
+            self.cancel()
+
+
+class ChatMetrics:
+    """
+    Latency and cost metrics for /chat/prompt, used to decide whether
+    speculative mode is worth turning on.
+
+    For each mode (sequential, speculative) clean chats record the time until
+    the response (or, when streaming, the first token) and the detector time.
+    Speculative chats also record:
+    - savedMs: detector time that overlapped with the LLM call, i.e. latency
+      that sequential mode would have added
+    - wasted calls: LLM calls cancelled (or completed and discarded) because
+      the prompt was an attack, with an estimate of the prompt tokens sent
+    Database writes made off the request path record their own duration.
+    """
+
+    MODES = ("sequential", "speculative")
+
+    def __init__(self):
+        self._modes = {
+            mode: {"chats": 0, "latencyMs": 0.0, "detectMs": 0.0, "attacks": 0}
+            for mode in self.MODES
+        }
+        self._speculative = {
+            "started": 0,
+            "used": 0,
+            "cancelled": 0,
+            "completedWasted": 0,
+            "wastedPromptTokensEstimate": 0,
+            "savedMs": 0.0,
+        }
+        self._background_stores = 0
+        self._background_store_failures = 0
+        self._background_store_ms = 0.0
+
+    def record_chat(self, mode: str, detect_ms: float, latency_ms: Optional[float] = None, attack: bool = False) -> None:
+        """
+        Record one chat.
+        Args:
+            mode: "sequential" or "speculative"
+            detect_ms: Time spent waiting for the verdict
+            latency_ms: Time from receiving the request to the response or first token (clean chats)
+            attack: Whether the prompt was rejected
+        """
+        stats = self._modes[mode]
+        stats["detectMs"] += detect_ms
+        if attack:
+            stats["attacks"] += 1
+        elif latency_ms is not None:
+            stats["chats"] += 1
+            stats["latencyMs"] += latency_ms
+
+    def record_speculation(self, call: SpeculativeCall, verdict_at: float, attack: bool) -> None:
+        """
+        Record how a speculative LLM call was used. Only reads the call: the
+        caller cancels it for attacks, after recording.
+        Args:
+            call: The speculative call
+            verdict_at: time.perf_counter() when the verdict arrived
+            attack: Whether the prompt was an attack (the call was wasted)
+        """
+        self._speculative["started"] += 1
+        if attack:
+            if not call.done:
+                self._speculative["cancelled"] += 1
+            else:
+                self._speculative["completedWasted"] += 1
+            # Rough estimate: ~4 characters per token
+            self._speculative["wastedPromptTokensEstimate"] += len(call.prompt) // 4
+        else:
+            self._speculative["used"] += 1
+            self._speculative["savedMs"] += call.elapsed_ms(verdict_at)
+
+    def record_background_store(self, store_ms: float, failed: bool = False) -> None:
+        """Record a database write that ran after the response"""
+        self._background_stores += 1
+        self._background_store_ms += store_ms
+        if failed:
+            self._background_store_failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get chat pipeline metrics.
+        Returns: Dict with per-mode averages, speculation usage and waste, and background store timing
+        """
+        modes = {}
+        for mode, stats in self._modes.items():
+            verdicts = stats["chats"] + stats["attacks"]
+            modes[mode] = {
+                "chats": stats["chats"],
+                "attacks": stats["attacks"],
+                "avgLatencyMs": stats["latencyMs"] / stats["chats"] if stats["chats"] else 0.0,
+                "avgDetectMs": stats["detectMs"] / verdicts if verdicts else 0.0,
+            }
+        speculative = dict(self._speculative)
+        started = speculative["started"]
+        wasted = speculative["cancelled"] + speculative["completedWasted"]
+        speculative["avgSavedMs"] = speculative.pop("savedMs") / speculative["used"] if speculative["used"] else 0.0
+        speculative["wasteRate"] = wasted / started if started else 0.0
+        return {
+            **modes,
+            "speculation": speculative,
+            "backgroundStores": {
+                "count": self._background_stores,
+                "failures": self._background_store_failures,
+                "avgMs": self._background_store_ms / self._background_stores if self._background_stores else 0.0,
+            },
+        }
+
+
+# Create a singleton instance
+_metrics_instance: Optional[ChatMetrics] = None
+
+
+def get_chat_metrics() -> ChatMetrics:
+    """
+    Get the singleton instance of ChatMetrics.
+    Returns: ChatMetrics instance
+    """
+    global _metrics_instance
+    if _metrics_instance is None:
+        _metrics_instance = ChatMetrics()
+    return _metrics_instance
@@ -0,0 +1,319 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from pymongo import UpdateOne
+
+from app.services.database.connection import get_database
+
+logger = logging.getLogger(__name__)
+
+
+def verdict_cache_key(prompt_text: str, model_version: str) -> str:
+    """
+    SHA-256 of the model version and the exact prompt text.
+    The prompt is not normalized: the detector scores the raw text, so two prompts
+    that only look alike (e.g. full-width vs ASCII) must not share a verdict.
+    """
+    digest = hashlib.sha256()
+    digest.update(model_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """
+    VerdictCache remembers detector verdicts for prompts that were already analyzed.
+
+    Entries are keyed by a hash of the exact prompt and the model version,
+    so a hot-swap to another checkpoint never serves verdicts from the old model;
+    the local entries are also dropped as soon as a new model version is seen.
+
+    Features:
+    - LRU eviction bounded by entry count and approximate bytes
+    - Per-entry TTL
+    - Hit/miss/eviction counters
+    - Optional shared MongoDB backend (collection "verdict_cache" with a TTL
+      index) so several API replicas reuse each other's verdicts
+
+    Configuration (environment variables):
+    - VERDICT_CACHE_ENABLED: "true" or "false" (default true)
+    - VERDICT_CACHE_MAX_ENTRIES: Maximum local entries (default 10000)
+    - VERDICT_CACHE_MAX_BYTES: Maximum local size in bytes (default 16MB)
+    - VERDICT_CACHE_TTL_SECONDS: Entry lifetime (default 3600)
+    - VERDICT_CACHE_SHARED: "mongo" to enable the shared backend (default off)
+    """
+
+    SHARED_COLLECTION = "verdict_cache"
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        shared_backend: Optional[str] = None
+    ):
+        """
+        Initialize the cache. Arguments default to the environment variables above.
+        """
+        self.enabled = enabled if enabled is not None else os.getenv("VERDICT_CACHE_ENABLED", "true").lower() == "true"
+        self.max_entries = max_entries or int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "10000"))
+        self.max_bytes = max_bytes or int(os.getenv("VERDICT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("VERDICT_CACHE_TTL_SECONDS", "3600"))
+        self.shared_backend = (shared_backend or os.getenv("VERDICT_CACHE_SHARED", "")).lower() or None
+
+        # key -> (expires_at, result, size in bytes)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._model_version: Optional[str] = None
+        self._shared_index_ready = False
+
+        # Counters
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+        self._shared_errors = 0
+
+    async def get(self, prompt_text: str, model_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached verdict.
+        Args:
+            prompt_text: The prompt being analyzed
+            model_version: Version of the active detector
+        Returns:
+            A copy of the cached result dict, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        self._check_model_version(model_version)
+        key = verdict_cache_key(prompt_text, model_version)
+
+        result = self._get_local(key)
+        if result is not None:
+            return result
+
+        if self.shared_backend == "mongo":
+            result = await self._shared_get(key)
+            if result is not None:
+                self._shared_hits += 1
+                self._store_local(key, result)
+                return copy.deepcopy(result)
+
+        self._misses += 1
+        return None
+
+    async def get_many(self, prompt_texts: List[str], model_version: str) -> List[Optional[Dict[str, Any]]]:
+        """
+        Look up cached verdicts for many prompts at once.
+        Prompts missing locally are read from the shared backend with a single query.
+        Args:
+            prompt_texts: The prompts being analyzed
+            model_version: Version of the active detector
+        Returns:
+            A copy of each cached result dict, or None for each miss, in the same order as prompt_texts
+        """
+        if not self.enabled:
+            return [None] * len(prompt_texts)
+        self._check_model_version(model_version)
+        keys = [verdict_cache_key(text, model_version) for text in prompt_texts]
+        results = [self._get_local(key) for key in keys]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing and self.shared_backend == "mongo":
+            shared = await self._shared_get_many({keys[i] for i in missing})
+            for i in missing:
+                result = shared.get(keys[i])
+                if result is not None:
+                    self._shared_hits += 1
+                    self._store_local(keys[i], result)
+                    results[i] = copy.deepcopy(result)
+
+        self._misses += sum(1 for result in results if result is None)
+        return results
+
+    async def put(self, prompt_text: str, model_version: str, result: Dict[str, Any]) -> None:
+        """
+        Cache a verdict.
+        Args:
+            prompt_text: The analyzed prompt
+            model_version: Version of the detector that produced the result
+            result: The analysis result dict
+        """
+        if not self.enabled:
+            return
+        self._check_model_version(model_version)
+        key = verdict_cache_key(prompt_text, model_version)
+        result = copy.deepcopy(result)
+        self._store_local(key, result)
+
+        if self.shared_backend == "mongo":
+            await self._shared_put(key, model_version, result)
+
+    async def put_many(self, verdicts: List[Tuple[str, Dict[str, Any]]], model_version: str) -> None:
+        """
+        Cache many verdicts; the shared backend gets them in one bulk write.
+        Args:
+            verdicts: (prompt, result dict) pairs
+            model_version: Version of the detector that produced the results
+        """
+        if not self.enabled or not verdicts:
+            return
+        self._check_model_version(model_version)
+        entries = {}
+        for prompt_text, result in verdicts:
+            key = verdict_cache_key(prompt_text, model_version)
+            entries[key] = copy.deepcopy(result)
+            self._store_local(key, entries[key])
+
+        if self.shared_backend == "mongo":
+            await self._shared_put_many(entries, model_version)
+
+    def clear(self) -> None:
+        """Drop every local entry"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def _check_model_version(self, model_version: str) -> None:
+        """Invalidate local entries when the detector's model changes"""
+        if self._model_version != model_version:
+            if self._model_version is not None:
+                logger.info(f"Model changed to {model_version}, clearing {len(self._entries)} cached verdicts")
+                self._invalidations += 1
+            self.clear()
+            self._model_version = model_version
+
+    def _store_local(self, key: str, result: Dict[str, Any]) -> None:
+        """Insert an entry and evict least recently used entries past the bounds"""
+        size = len(key) + len(json.dumps(result))
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result, size)
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        """A copy of a live local entry (counted as a hit), or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result, size = entry
+        if expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return copy.deepcopy(result)
+        self._remove(key)
+        self._expirations += 1
+        return None
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry and release its bytes"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    async def _shared_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read a verdict from the shared MongoDB backend. Backend errors count as misses."""
+        try:
+            db = await get_database()
+            doc = await db[self.SHARED_COLLECTION].find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"result": 1}
+            )
+            return doc["result"] if doc else None
+        except Exception as e:
+            self._shared_errors += 1
+            logger.warning(f"Shared verdict cache read failed: {str(e)}")
+            return None
+
+    async def _shared_get_many(self, keys: set) -> Dict[str, Dict[str, Any]]:
+        """Read many verdicts from the shared MongoDB backend with one $in query. Backend errors count as misses."""
+        try:
+            db = await get_database()
+            cursor = db[self.SHARED_COLLECTION].find(
+                {"_id": {"$in": list(keys)}, "expires_at": {"$gt": datetime.utcnow()}},
+                {"result": 1}
+            )
+            return {doc["_id"]: doc["result"] async for doc in cursor}
+        except Exception as e:
+            self._shared_errors += 1
+            logger.warning(f"Shared verdict cache read failed: {str(e)}")
+            return {}
+
+    async def _shared_put(self, key: str, model_version: str, result: Dict[str, Any]) -> None:
+        """Write a verdict to the shared MongoDB backend. Failures are logged and ignored."""
+        await self._shared_put_many({key: result}, model_version)
+
+    async def _shared_put_many(self, entries: Dict[str, Dict[str, Any]], model_version: str) -> None:
+        """Upsert verdicts into the shared MongoDB backend in one bulk write. Failures are logged and ignored."""
+        try:
+            db = await get_database()
+            collection = db[self.SHARED_COLLECTION]
+            if not self._shared_index_ready:
+                # MongoDB removes documents once expires_at has passed
+                await collection.create_index("expires_at", expireAfterSeconds=0)
+                self._shared_index_ready = True
+            expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            await collection.bulk_write([
+                UpdateOne(
+                    {"_id": key},
+                    {"$set": {"model": model_version, "result": result, "expires_at": expires_at}},
+                    upsert=True
+                )
+                for key, result in entries.items()
+            ], ordered=False)
+        except Exception as e:
+            self._shared_errors += 1
+            logger.warning(f"Shared verdict cache write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache metrics.
+        Returns: Dict with size and hit/miss/eviction counters
+        """
+        lookups = self._hits + self._shared_hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "sharedBackend": self.shared_backend,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self._hits,
+            "sharedHits": self._shared_hits,
+            "misses": self._misses,
+            "hitRate": (self._hits + self._shared_hits) / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "invalidations": self._invalidations,
+            "sharedErrors": self._shared_errors,
+        }
+
+
+# Create a singleton instance
+_cache_instance: Optional[VerdictCache] = None
+
+
+def get_verdict_cache() -> VerdictCache:
+    """
+    Get the singleton instance of VerdictCache.
+    Returns: VerdictCache instance
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = VerdictCache()
+    return _cache_instance
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Set, FrozenSet
+
+logger = logging.getLogger(__name__)
+
+# What happens when a client's queue is full
+DROP_POLICIES = ("oldest", "newest", "disconnect")
+
+
+class FeedSubscriber:
+    """
+    One connected client of the verdict feed.
+
+    Holds the client's filters and a bounded queue of encoded messages. The
+    feed appends to the queue without waiting; the client's own send loop
+    takes messages out with get(), so a slow client only ever delays itself.
+    """
+
+    def __init__(
+        self,
+        attack_types: Optional[FrozenSet[str]],
+        min_confidence: float,
+        queue_size: int,
+        drop_policy: str,
+        attacks_only: bool = False
+    ):
+        self.attack_types = attack_types
+        self.attacks_only = attacks_only
+        self.min_confidence = min_confidence
+        self.drop_policy = drop_policy
+        self.closed = False
+        self.dropped = 0
+        self._queue: deque = deque(maxlen=queue_size if drop_policy == "oldest" else None)
+        self._queue_size = queue_size
+        self._ready = asyncio.Event()
+        # Drops not yet reported to the client
+        self._unreported = 0
+
+    def wants(self, verdict: Dict[str, Any]) -> bool:
+        """Apply the client's filters to a verdict"""
+        if self.attacks_only and not verdict.get("isAttack"):
+            return False
+        if self.attack_types is not None and verdict.get("attackType") not in self.attack_types:
+            return False
+        return (verdict.get("confidence") or 0.0) >= self.min_confidence
+
+    def offer(self, message: str) -> bool:
+        """
+        Queue a message without blocking.
+        Returns: False if the message (or an older one) was dropped
+        """
+        if self.closed:
+            return False
+        full = len(self._queue) >= self._queue_size
+        if full and self.drop_policy == "newest":
+            self._drop()
+            return False
+        if full and self.drop_policy == "disconnect":
+            self._drop()
+            self.close()
+            return False
+        # With "oldest" the deque's maxlen discards the head
+        self._queue.append(message)
+        self._ready.set()
+        if full:
+            self._drop()
+            return False
+        return True
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        self._unreported += 1
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[str]:
+        """
+        Wait for the next message for the client.
+        Returns: The message, or None once the subscriber is closed. After drops,
+                 a {"type": "dropped"} notice comes first so the client knows to refetch.
+        """
+        while not self._queue and not self.closed:
+            self._ready.clear()
+            await self._ready.wait()
+        if self.closed:
+            return None
+        if self._unreported:
+            count, self._unreported = self._unreported, 0
+            return json.dumps({"type": "dropped", "count": count})
+        return self._queue.popleft()
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+
+class VerdictFeed:
+    """
+    VerdictFeed fans out every stored analysis result to the connected
+    /ws/verdicts clients.
+
+    Features:
+    - publish() encodes each verdict once and appends it to the queue of every
+      client whose filters match; it never awaits, so storing a prompt costs
+      the same with one client or thousands
+    - Clients are grouped by attack type filter, so a verdict is only matched
+      against clients that can want it
+    - Per-client bounded queues with a drop policy for slow clients: drop the
+      oldest queued message (default), drop the new message, or disconnect
+    - Counters for published, queued and dropped messages
+
+    Configuration (environment variables):
+    - VERDICT_FEED_MAX_CLIENTS: Connected clients accepted (default 10000)
+    - VERDICT_FEED_QUEUE_SIZE: Default messages queued per client (default 256)
+    - VERDICT_FEED_DROP_POLICY: Default drop policy: oldest, newest or disconnect (default oldest)
+    - VERDICT_FEED_PROMPT_CHARS: Characters of the prompt sent with each verdict (default 500)
+    """
+
+    def __init__(self):
+        self.max_clients = int(os.getenv("VERDICT_FEED_MAX_CLIENTS", "10000"))
+        self.queue_size = int(os.getenv("VERDICT_FEED_QUEUE_SIZE", "256"))
+        self.drop_policy = os.getenv("VERDICT_FEED_DROP_POLICY", "oldest")
+        if self.drop_policy not in DROP_POLICIES:
+            logger.warning(f"Unknown VERDICT_FEED_DROP_POLICY {self.drop_policy}, using oldest")
+            self.drop_policy = "oldest"
+        self.prompt_chars = int(os.getenv("VERDICT_FEED_PROMPT_CHARS", "500"))
+
+        # Clients without an attack type filter, and clients per attack type
+        self._unfiltered: Set[FeedSubscriber] = set()
+        self._by_type: Dict[str, Set[FeedSubscriber]] = {}
+        self._count = 0
+
+        # Counters
+        self._published = 0
+        self._queued = 0
+        self._dropped = 0
+        self._slow_disconnects = 0
+        self._rejected = 0
+
+    def subscribe(
+        self,
+        attack_types: Optional[List[str]] = None,
+        min_confidence: float = 0.0,
+        queue_size: Optional[int] = None,
+        drop_policy: Optional[str] = None,
+        attacks_only: bool = False
+    ) -> Optional[FeedSubscriber]:
+        """
+        Register a client.
+        Args:
+            attack_types: Only verdicts with one of these attack types (None for all, including clean prompts)
+            min_confidence: Only verdicts with at least this confidence
+            queue_size: Messages queued for the client, capped at VERDICT_FEED_QUEUE_SIZE
+            drop_policy: oldest, newest or disconnect (default VERDICT_FEED_DROP_POLICY)
+            attacks_only: Leave out clean prompts
+        Returns:
+            The subscriber, or None if VERDICT_FEED_MAX_CLIENTS are already connected
+        """
+        if self._count >= self.max_clients:
+            self._rejected += 1
+            return None
+        size = max(1, min(queue_size or self.queue_size, self.queue_size))
+        types = frozenset(attack_types) if attack_types else None
+        subscriber = FeedSubscriber(types, min_confidence, size, drop_policy or self.drop_policy, attacks_only)
+        if types is None:
+            self._unfiltered.add(subscriber)
+        else:
+            for attack_type in types:
+                self._by_type.setdefault(attack_type, set()).add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: FeedSubscriber) -> None:
+        subscriber.close()
+        if subscriber.attack_types is None:
+            if subscriber in self._unfiltered:
+                self._unfiltered.discard(subscriber)
+                self._count -= 1
+            return
+        removed = False
+        for attack_type in subscriber.attack_types:
+            group = self._by_type.get(attack_type)
+            if group is not None and subscriber in group:
+                group.discard(subscriber)
+                removed = True
+                if not group:
+                    del self._by_type[attack_type]
+        if removed:
+            self._count -= 1
+
+    def publish(self, document: Dict[str, Any]) -> int:
+        """
+        Send a stored prompt document to every matching client.
+        Args:
+            document: The document as stored (see store_prompt_analysis)
+        Returns:
+            Number of clients the verdict was queued for
+        """
+        if not self._count:
+            return 0
+        created_at = document.get("created_at")
+        verdict = {
+            "id": str(document["_id"]),
+            "prompt": (document.get("prompt") or "")[:self.prompt_chars],
+            "isAttack": document.get("isAttack"),
+            "attackType": document.get("attackType"),
+            "confidence": document.get("confidence"),
+            "matches": document.get("matches", []),
+            "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        }
+        message = None
+        queued = 0
+        self._published += 1
+        typed = self._by_type.get(verdict["attackType"], ()) if verdict["attackType"] is not None else ()
+        for group in (self._unfiltered, typed):
+            # Copy: a "disconnect" drop removes the subscriber from its group
+            for subscriber in list(group):
+                if not subscriber.wants(verdict):
+                    continue
+                if message is None:
+                    # Encoded once, shared by every client
+                    message = json.dumps({"type": "verdict", "data": verdict})
+                if subscriber.offer(message):
+                    queued += 1
+                else:
+                    self._dropped += 1
+                    if subscriber.closed:
+                        self._slow_disconnects += 1
+                        self.unsubscribe(subscriber)
+        self._queued += queued
+        return queued
+
+    def publish_many(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Send a batch of stored prompt documents to the clients.
+        Registered as a write-behind buffer listener, so buffered verdicts reach the
+        clients once MongoDB has them, not when they are queued.
+        Args:
+            documents: The documents as stored
+        """
+        for document in documents:
+            self.publish(document)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get feed metrics.
+        Returns: Dict with client counts and message counters
+        """
+        pending = [subscriber.pending for subscriber in self._unfiltered]
+        for group in self._by_type.values():
+            pending.extend(subscriber.pending for subscriber in group)
+        return {
+            "clients": self._count,
+            "maxClients": self.max_clients,
+            "clientsByType": {attack_type: len(group) for attack_type, group in self._by_type.items()},
+            "published": self._published,
+            "queued": self._queued,
+            "dropped": self._dropped,
+            "slowDisconnects": self._slow_disconnects,
+            "rejected": self._rejected,
+            "maxPending": max(pending, default=0),
+            "queueSize": self.queue_size,
+            "dropPolicy": self.drop_policy,
+        }
+
+
+# Create a singleton instance
+_feed_instance: Optional[VerdictFeed] = None
+
+
+def get_verdict_feed() -> VerdictFeed:
+    """
+    Get the singleton instance of VerdictFeed.
+    Returns: VerdictFeed instance
+    """
+    global _feed_instance
+    if _feed_instance is None:
+        _feed_instance = VerdictFeed()
+    return _feed_instance
@@ -0,0 +1,55 @@
+"""
+Benchmark: cold-start time from process launch to first verdict.
+
+Starts a fresh Python process per run that imports the detector, loads the
+model from the given source and analyzes one prompt, and reports how long
+that took from launch (median and worst of --runs). Compare the Hugging Face
+Hub source with the local model store:
+
+Usage (from the api directory):
+    python -m app.services.model_store fetch
+    python -m benchmarks.bench_cold_start --sources hub,local --runs 3
+
+The running API reports the same measurement as coldStartSeconds in
+GET /detector/status.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import sys
+from app.services.PromptDetectorService import PromptDetectorService
+detector = PromptDetectorService(source=sys.argv[1])
+detector.analyze_prompt("Hello, how are you?")
+"""
+
+
+def cold_start(source: str) -> float:
+    """Seconds from launching a new interpreter to its first verdict"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", CHILD, source], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", default="hub,local", help="Comma separated model sources")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'source':<8}{'median s':>10}{'max s':>8}")
+    for source in args.sources.split(","):
+        try:
+            times = [cold_start(source) for _ in range(args.runs)]
+        except subprocess.CalledProcessError:
+            print(f"{source:<8} failed to load (is the model in the store?)")
+            continue
+        print(f"{source:<8}{statistics.median(times):>10.1f}{max(times):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: memory and latency of the dashboard prompt lists, unbounded vs paginated.
+
+Seeds a local MongoDB with --seed synthetic prompts (skipped if the benchmark
+collection already holds that many), then compares
+- legacy: find() + to_list(length=None), as the list routes used to do
+- paged: fetch_page() walked from the first to the last page with keyset cursors
+reporting peak Python heap (tracemalloc) and time. Paged memory should stay
+flat per page whatever --seed is, and late pages should be as fast as early ones.
+
+Usage (from the api directory, with a local mongod running):
+    python -m benchmarks.bench_dashboard_pages --seed 1000000 --limit 100
+    python -m benchmarks.bench_dashboard_pages --uri mongodb://localhost:27017 --fields isAttack,attackType
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.database.indexes import PROMPT_INDEXES
+from app.services.database.pagination import fetch_page
+
+ATTACK_TYPES = ["prompt-injection", "jailbreak", "unauthorized-access", "data-exfiltration"]
+SEED_BATCH = 10000
+
+
+async def seed(collection, count: int) -> None:
+    # The indexes the API creates at startup
+    await collection.create_indexes(PROMPT_INDEXES)
+    existing = await collection.estimated_document_count()
+    if existing >= count:
+        print(f"Collection already holds {existing} prompts")
+        return
+    print(f"Seeding {count - existing} prompts...")
+    started = datetime.utcnow() - timedelta(days=90)
+    for offset in range(existing, count, SEED_BATCH):
+        documents = []
+        for i in range(offset, min(offset + SEED_BATCH, count)):
+            is_attack = random.random() < 0.2
+            documents.append({
+                "prompt": "lorem ipsum dolor sit amet " * random.randint(5, 60),
+                "isAttack": is_attack,
+                "attackType": random.choice(ATTACK_TYPES) if is_attack else None,
+                "confidence": random.random(),
+                "matches": [],
+                # Coarse timestamps so many prompts share one, exercising the _id tie-break
+                "created_at": started + timedelta(seconds=i // 5),
+            })
+        await collection.insert_many(documents, ordered=False)
+
+
+async def legacy(collection) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    documents = await collection.find({"isAttack": True}).to_list(length=None)
+    for document in documents:
+        document["_id"] = str(document["_id"])
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"legacy  {len(documents):>9} docs  {elapsed:>7.2f} s  peak {peak / 1024 / 1024:>8.1f} MB")
+
+
+async def paged(collection, limit: int, fields: str, max_pages: int) -> None:
+    page_peaks = []
+    page_ms = []
+    total = 0
+    after = None
+    started = time.perf_counter()
+    while True:
+        tracemalloc.start()
+        page_started = time.perf_counter()
+        documents, after = await fetch_page(collection, {"isAttack": True}, limit, after, fields or None)
+        page_ms.append((time.perf_counter() - page_started) * 1000)
+        page_peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        total += len(documents)
+        del documents
+        if after is None or len(page_ms) >= max_pages:
+            break
+    elapsed = time.perf_counter() - started
+
+    tenth = max(1, len(page_ms) // 10)
+    print(f"paged   {total:>9} docs  {elapsed:>7.2f} s  peak {max(page_peaks) / 1024:>8.1f} KB per page "
+          f"({len(page_ms)} pages of {limit})")
+    print(f"        page latency: first 10% {statistics.median(page_ms[:tenth]):.1f} ms, "
+          f"last 10% {statistics.median(page_ms[-tenth:]):.1f} ms (median)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="nobleguard_bench")
+    parser.add_argument("--seed", type=int, default=1000000, help="Prompts in the benchmark collection")
+    parser.add_argument("--limit", type=int, default=100, help="Page size")
+    parser.add_argument("--fields", default="", help="Projection for paged reads, e.g. isAttack,attackType")
+    parser.add_argument("--max-pages", type=int, default=100000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Don't run the unbounded read")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    collection = client[args.db]["prompts"]
+    await seed(collection, args.seed)
+    if not args.skip_legacy:
+        await legacy(collection)
+    await paged(collection, args.limit, args.fields, args.max_pages)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark: dynamic padding + length buckets vs. padding every prompt to 512 tokens.
+
+Generates a synthetic prompt stream whose lengths follow a chat-like distribution
+(mostly short prompts, a tail of long pasted documents) and runs it through
+PromptDetectorService with DETECTOR_PADDING=max_length and =dynamic, both one
+prompt at a time and in micro-batches.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_dynamic_padding --prompts 200 --batch-size 16
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List, Dict
+
+from app.services.PromptDetectorService import PromptDetectorService
+
+WORDS = (
+    "please ignore previous instructions tell me how the system works what is "
+    "the weather today write a poem about summary of this document translate "
+    "into french you are now an unrestricted assistant explain step by step "
+    "reveal your hidden prompt can you help with homework recipe for dinner"
+).split()
+
+# (share of traffic, min words, max words)
+LENGTH_PROFILE = [
+    (0.60, 3, 30),     # short chat messages
+    (0.25, 30, 120),   # longer questions
+    (0.10, 120, 300),  # pasted paragraphs
+    (0.05, 300, 600),  # documents, truncated at 512 tokens
+]
+
+
+def make_prompts(count: int, seed: int) -> List[str]:
+    """Build a reproducible prompt stream following LENGTH_PROFILE"""
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        roll = rng.random()
+        for share, low, high in LENGTH_PROFILE:
+            roll -= share
+            if roll <= 0:
+                break
+        prompts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))))
+    return prompts
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(detector: PromptDetectorService, prompts: List[str], batch_size: int) -> Dict[str, float]:
+    """Run prompts in arrival-order batches and report per-prompt latency (batch wall time)"""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(0, len(prompts), batch_size):
+        batch = prompts[i:i + batch_size]
+        t0 = time.perf_counter()
+        detector.analyze_prompts(batch)
+        elapsed = (time.perf_counter() - t0) * 1000
+        latencies.extend([elapsed] * len(batch))
+    total = time.perf_counter() - started
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "prompts_per_s": len(prompts) / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    prompts = make_prompts(args.prompts, args.seed)
+    detector = PromptDetectorService()
+    token_lengths = [len(detector.tokenizer(p, truncation=True, max_length=512)["input_ids"]) for p in prompts]
+    print(f"{len(prompts)} prompts, tokens: p50={percentile(token_lengths, 50)} "
+          f"p95={percentile(token_lengths, 95)} max={max(token_lengths)}")
+
+    # Warm up so the first configuration doesn't pay for lazy initialisation
+    detector.analyze_prompts(prompts[:4])
+
+    print(f"{'padding':<12}{'batch':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'prompts/s':>11}")
+    for padding in ("max_length", "dynamic"):
+        detector.padding = padding
+        for batch_size in (1, args.batch_size):
+            r = run(detector, prompts, batch_size)
+            print(f"{padding:<12}{batch_size:>6}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+                  f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['prompts_per_s']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
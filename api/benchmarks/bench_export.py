@@ -0,0 +1,106 @@
+"""
+Benchmark: peak RSS and time to first byte of a full prompt export.
+
+Runs each mode in a fresh process against a seeded local MongoDB (see
+bench_dashboard_pages for the seeding) and reports the process's peak RSS,
+time to the first output byte and total time:
+- legacy: to_list(length=None) then json.dumps of the whole list, as a
+  response built from get_all_prompts would
+- ndjson / json / gzip / zstd: the streaming export used by /prompts/export
+Streaming modes should keep the same peak RSS whatever --seed is.
+
+Usage (from the api directory, with a local mongod running):
+    python -m benchmarks.bench_export --seed 1000000
+    python -m benchmarks.bench_export --modes ndjson,gzip --batch-size 500
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.bench_dashboard_pages import seed
+
+
+def _cursor(collection, batch_size: int):
+    return collection.find({}).sort("_id", 1).batch_size(batch_size)
+
+
+async def run_child(uri: str, db: str, mode: str, batch_size: int) -> None:
+    """Export the benchmark collection to nowhere and print one JSON result line"""
+    from app.services.export_stream import encode_documents, compress_stream
+
+    client = AsyncIOMotorClient(uri)
+    collection = client[db]["prompts"]
+    started = time.perf_counter()
+    first_byte = None
+    total = 0
+
+    if mode == "legacy":
+        documents = await _cursor(collection, batch_size).to_list(length=None)
+        for document in documents:
+            document["_id"] = str(document["_id"])
+        body = json.dumps(documents, default=str).encode("utf-8")
+        first_byte = time.perf_counter() - started
+        total = len(body)
+    else:
+        async def documents():
+            async for document in _cursor(collection, batch_size):
+                document["_id"] = str(document["_id"])
+                yield document
+
+        fmt = "json" if mode == "json" else "ndjson"
+        compression = mode if mode in ("gzip", "zstd") else "none"
+        async for chunk in compress_stream(encode_documents(documents(), fmt), compression):
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            total += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    client.close()
+    # ru_maxrss is in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"firstByte": first_byte, "elapsed": elapsed, "bytes": total, "peakMb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="nobleguard_bench")
+    parser.add_argument("--seed", type=int, default=1000000, help="Prompts in the benchmark collection")
+    parser.add_argument("--modes", default="legacy,ndjson,json,gzip,zstd")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_child(args.uri, args.db, args.child, args.batch_size))
+        return
+
+    async def prepare():
+        client = AsyncIOMotorClient(args.uri)
+        await seed(client[args.db]["prompts"], args.seed)
+        client.close()
+    asyncio.run(prepare())
+
+    print(f"{'mode':<8}{'peak RSS MB':>12}{'first byte s':>14}{'total s':>9}{'output MB':>11}")
+    for mode in args.modes.split(","):
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_export", "--uri", args.uri, "--db", args.db,
+             "--batch-size", str(args.batch_size), "--child", mode],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"{mode:<8} failed: {result.stderr.strip().splitlines()[-1] if result.stderr else ''}")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{mode:<8}{stats['peakMb']:>12.0f}{stats['firstByte']:>14.2f}"
+              f"{stats['elapsed']:>9.2f}{stats['bytes'] / 1024 / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
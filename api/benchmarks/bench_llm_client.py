@@ -0,0 +1,122 @@
+"""
+Benchmark: pooled async LLM client vs. the previous requests-in-a-thread client.
+
+Starts benchmarks/llm_stub_server.py, then sends --concurrency simultaneous chats
+through each client and reports latency percentiles, the peak number of threads
+in this process and how many TCP connections the stub accepted.
+
+"threaded" reproduces the old LLMService: a new requests.post per call run in
+asyncio.to_thread, i.e. one default-executor thread and one new connection per
+outstanding call. "pooled" is the current LLMService on a shared httpx.AsyncClient.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_llm_client --concurrency 200 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import List
+
+import requests
+
+from app.services.llm_service import LLMService
+from benchmarks.bench_dynamic_padding import percentile
+
+
+def stub_connections(port: int) -> int:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats") as response:
+        return json.load(response)["connections"]
+
+
+async def threaded_chat(url: str, prompt: str) -> None:
+    payload = {"model": "stub", "prompt": prompt, "max_tokens": 50}
+    response = await asyncio.to_thread(lambda: requests.post(url, json=payload, timeout=30))
+    response.raise_for_status()
+
+
+async def run(client: str, url: str, concurrency: int, rounds: int) -> dict:
+    service = None
+    if client == "pooled":
+        service = LLMService()
+        await service.start()
+
+    latencies: List[float] = []
+    peak_threads = threading.active_count()
+    stop = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not stop.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.005)
+
+    async def chat(i: int):
+        started = time.perf_counter()
+        if service is not None:
+            result = await service.generate_response(f"prompt {i}")
+            if "error" in result:
+                raise RuntimeError(result["error"])
+        else:
+            await threaded_chat(url, f"prompt {i}")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    sampler = asyncio.create_task(sample_threads())
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(chat(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    if service is not None:
+        await service.aclose()
+
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "chats_per_s": len(latencies) / elapsed,
+        "peak_threads": peak_threads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--delay-ms", type=float, default=200, help="Stub completion latency")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}/v1/completions"
+    os.environ["LLM_API_URL"] = url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("LLM_MAX_CONNECTIONS", str(args.concurrency))
+
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.llm_stub_server", "--port", str(args.port), "--delay-ms", str(args.delay_ms)],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        stub.stdout.readline()  # wait until it is listening
+        print(f"{args.concurrency} concurrent chats x {args.rounds} rounds, stub latency {args.delay_ms:.0f} ms")
+        print(f"{'client':<10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'chats/s':>10}{'threads':>9}{'conns':>7}")
+        for client in ("threaded", "pooled"):
+            before = stub_connections(args.port)
+            r = asyncio.run(run(client, url, args.concurrency, args.rounds))
+            # The /stats request itself opens one connection
+            conns = stub_connections(args.port) - before - 1
+            print(f"{client:<10}{r['p50']:>9.0f}{r['p95']:>9.0f}{r['p99']:>9.0f}"
+                  f"{r['chats_per_s']:>10.1f}{r['peak_threads']:>9}{conns:>7}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: time to first token with streaming vs. waiting for the whole completion.
+
+Starts benchmarks/llm_stub_server.py and sends --concurrency simultaneous chats
+through LLMService.generate_response and LLMService.stream_response, reporting
+when the user sees the first text (TTFT) and when the response is complete.
+Without streaming the first text only arrives with the full completion.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_llm_stream --concurrency 50 --delay-ms 300 --token-delay-ms 30
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from app.services.llm_service import LLMService
+from benchmarks.bench_dynamic_padding import percentile
+
+
+async def run(streaming: bool, concurrency: int) -> dict:
+    service = LLMService()
+    await service.start()
+    ttfts, totals = [], []
+
+    async def chat(i: int):
+        started = time.perf_counter()
+        if streaming:
+            first = None
+            async for event in service.stream_response(f"prompt {i}"):
+                if event["type"] == "error":
+                    raise RuntimeError(event["error"])
+                if event["type"] == "token" and first is None:
+                    first = time.perf_counter()
+            ttfts.append((first - started) * 1000)
+        else:
+            result = await service.generate_response(f"prompt {i}")
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            ttfts.append((time.perf_counter() - started) * 1000)
+        totals.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(chat(i) for i in range(concurrency)))
+    await service.aclose()
+    return {
+        "ttft_p50": percentile(ttfts, 50),
+        "ttft_p95": percentile(ttfts, 95),
+        "total_p50": percentile(totals, 50),
+        "total_p95": percentile(totals, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=300, help="Stub latency before the first token")
+    parser.add_argument("--token-delay-ms", type=float, default=30, help="Stub gap between tokens")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    os.environ["LLM_API_URL"] = f"http://127.0.0.1:{args.port}/v1/completions"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.llm_stub_server", "--port", str(args.port),
+         "--delay-ms", str(args.delay_ms), "--token-delay-ms", str(args.token_delay_ms)],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        stub.stdout.readline()  # wait until it is listening
+        print(f"{args.concurrency} concurrent chats, stub first token {args.delay_ms:.0f} ms, "
+              f"then {args.token_delay_ms:.0f} ms per token")
+        print(f"{'mode':<10}{'TTFT p50':>10}{'TTFT p95':>10}{'total p50':>11}{'total p95':>11}")
+        for mode in ("blocking", "streaming"):
+            r = asyncio.run(run(mode == "streaming", args.concurrency))
+            print(f"{mode:<10}{r['ttft_p50']:>10.0f}{r['ttft_p95']:>10.0f}"
+                  f"{r['total_p50']:>11.0f}{r['total_p95']:>11.0f}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Accuracy-parity check and latency/memory benchmark for DETECTOR_PRECISION.
+
+Runs a held-out prompt set through the fp32 detector and through each reduced
+precision (int8, bf16) and reports:
+- label flip rate: share of prompts whose predicted label differs from fp32
+- verdict flip rate: share of prompts whose attack/clean verdict differs from fp32
+- largest confidence difference
+- latency percentiles and model size
+
+Exits with status 1 if any precision's verdict flip rate is above --max-flip-rate,
+so it can gate turning a precision on.
+
+The prompts file is JSONL with a "text" field per line (other fields are ignored).
+Use a real held-out set exported from the training data for release decisions;
+benchmarks/data/heldout_prompts.jsonl is only a smoke-test sample.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_precision --precisions int8,bf16 --max-flip-rate 0.01
+"""
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+import torch
+
+from app.services.PromptDetectorService import PromptDetectorService
+from benchmarks.bench_dynamic_padding import make_prompts, percentile
+
+DEFAULT_PROMPTS_FILE = Path(__file__).parent / "data" / "heldout_prompts.jsonl"
+
+
+def load_prompts(path: Path) -> List[str]:
+    with open(path) as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+def model_size_mb(model: torch.nn.Module) -> float:
+    """Serialized size of the model's state dict, which counts quantized packed weights correctly"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def run(detector: PromptDetectorService, prompts: List[str], batch_size: int):
+    results: List[Dict[str, Any]] = []
+    latencies = []
+    for i in range(0, len(prompts), batch_size):
+        batch = prompts[i:i + batch_size]
+        t0 = time.perf_counter()
+        results.extend(detector.analyze_prompts(batch))
+        latencies.append((time.perf_counter() - t0) * 1000 / len(batch))
+    return results, latencies
+
+
+def label(result: Dict[str, Any]) -> str:
+    return result["attackType"] if result["isAttack"] else "benign"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts-file", type=Path, default=DEFAULT_PROMPTS_FILE)
+    parser.add_argument("--synthetic", type=int, default=100,
+                        help="Extra synthetic prompts added for latency (not for parity)")
+    parser.add_argument("--precisions", default="int8,bf16")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-flip-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    heldout = load_prompts(args.prompts_file)
+    timing_set = heldout + make_prompts(args.synthetic, seed=3)
+
+    reference = PromptDetectorService(precision="fp32")
+    ref_results, _ = run(reference, heldout, args.batch_size)
+    _, ref_latencies = run(reference, timing_set, args.batch_size)
+    rows = [("fp32", 0.0, 0.0, 0.0, ref_latencies, model_size_mb(reference.model))]
+    del reference
+
+    failed = False
+    for precision in args.precisions.split(","):
+        detector = PromptDetectorService(precision=precision)
+        if detector.precision != precision:
+            print(f"{precision}: not supported on this machine, skipped")
+            continue
+        results, _ = run(detector, heldout, args.batch_size)
+        _, latencies = run(detector, timing_set, args.batch_size)
+
+        label_flips = sum(label(a) != label(b) for a, b in zip(ref_results, results)) / len(heldout)
+        verdict_flips = sum(a["isAttack"] != b["isAttack"] for a, b in zip(ref_results, results)) / len(heldout)
+        max_delta = max(abs(a["confidence"] - b["confidence"]) for a, b in zip(ref_results, results))
+        rows.append((precision, label_flips, verdict_flips, max_delta, latencies, model_size_mb(detector.model)))
+        failed = failed or verdict_flips > args.max_flip_rate
+        del detector
+
+    print(f"{len(heldout)} held-out prompts, {len(timing_set)} timed prompts, batch size {args.batch_size}")
+    print(f"{'precision':<10}{'label flips':>12}{'verdict flips':>15}{'max dconf':>11}"
+          f"{'mean ms':>9}{'p95 ms':>9}{'size MB':>9}")
+    for precision, label_flips, verdict_flips, max_delta, latencies, size in rows:
+        print(f"{precision:<10}{label_flips:>12.2%}{verdict_flips:>15.2%}{max_delta:>11.3f}"
+              f"{statistics.mean(latencies):>9.1f}{percentile(latencies, 95):>9.1f}{size:>9.0f}")
+
+    if failed:
+        print(f"FAIL: verdict flip rate above {args.max_flip_rate:.2%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark: storage and list bandwidth of PROMPT_STORAGE=dedup on replayed traffic.
+
+Replays a traffic sample into prompt documents shaped like the ones
+storePrompt writes and measures, without a database:
+- storage: BSON bytes of the prompts collection with every text inline,
+  against the deduplicated prompts plus one prompt_bodies document per
+  distinct text, with and without zlib
+- read bandwidth: JSON bytes of every 100-prompt list page with whole
+  prompts (the old behaviour, or fullPrompts=true) against previews
+- the CPU time compact() adds per stored prompt (hash, compress, copy)
+
+Sizes are logical BSON sizes. WiredTiger compresses blocks on disk (snappy by
+default) in both layouts, so the on-disk gap is smaller; compare collStats
+storageSize on a staging database for the final number. The real saved bytes
+of a running deployment are reported by
+`python -m app.services.database.prompt_bodies report`.
+
+The traffic file is JSONL with a "prompt" or "text" field per line, e.g. a
+/prompts/export download. By default its lines are replayed as often as
+--requests needs, drawn with a Zipf-like skew (--skew) so popular prompts
+repeat like real attack templates do; --as-is replays the file once in order.
+benchmarks/data/heldout_prompts.jsonl only holds short prompts, so
+--templates mixes in long synthetic jailbreak-style templates made by joining
+its attack prompts, sent by --template-share of the requests.
+
+Usage (from the api directory):
+    python -m benchmarks.bench_prompt_dedup --requests 20000
+    python -m benchmarks.bench_prompt_dedup --traffic export.ndjson --as-is --templates 0
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+import bson
+from bson.objectid import ObjectId
+
+from app.services.database.prompt_bodies import (
+    PROMPT_PREVIEW_CHARS, prompt_hash, encode_body, compact_document, preview_document
+)
+
+DEFAULT_TRAFFIC_FILE = Path(__file__).parent / "data" / "heldout_prompts.jsonl"
+ATTACK_TYPES = ["prompt-injection", "jailbreak", "unauthorized-access", "data-exfiltration"]
+PAGE_SIZE = 100
+
+
+def load_traffic(path: Path) -> List[Tuple[str, bool]]:
+    """(prompt, isAttack) per line; lines without a label count as clean"""
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            text = row.get("prompt", row.get("text"))
+            if isinstance(text, str):
+                rows.append((text, bool(row.get("isAttack", row.get("attack", False)))))
+    return rows
+
+
+def make_templates(rows: List[Tuple[str, bool]], count: int, chars: int, rng: random.Random) -> List[Tuple[str, bool]]:
+    """Long attack prompts made of the sample's attack texts, like pasted jailbreak templates"""
+    attacks = [text for text, is_attack in rows if is_attack] or [text for text, _ in rows]
+    templates = []
+    for _ in range(count):
+        parts = []
+        while sum(len(part) + 1 for part in parts) < chars:
+            parts.append(rng.choice(attacks))
+        templates.append((" ".join(parts), True))
+    return templates
+
+
+def replay(rows, templates, requests: int, skew: float, template_share: float, as_is: bool, rng: random.Random):
+    """The replayed sequence of (prompt, isAttack)"""
+    if as_is:
+        return list(rows)
+    # Zipf-like weights: the i-th most popular prompt is sent 1 / (i + 1) ** skew as often as the first
+    weights = [1.0 / (i + 1) ** skew for i in range(len(rows))]
+    template_weights = [1.0 / (i + 1) ** skew for i in range(len(templates))]
+    traffic = []
+    for _ in range(requests):
+        if templates and rng.random() < template_share:
+            traffic.append(rng.choices(templates, template_weights)[0])
+        else:
+            traffic.append(rng.choices(rows, weights)[0])
+    return traffic
+
+
+def make_documents(traffic, rng: random.Random) -> List[Dict[str, Any]]:
+    """Prompt documents as storePrompt builds them, one second apart"""
+    start = datetime.utcnow() - timedelta(seconds=len(traffic))
+    return [
+        {
+            "_id": ObjectId(),
+            "prompt": text,
+            "isAttack": is_attack,
+            "attackType": rng.choice(ATTACK_TYPES) if is_attack else None,
+            "confidence": rng.random(),
+            "matches": [],
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i, (text, is_attack) in enumerate(traffic)
+    ]
+
+
+def storage(documents: List[Dict[str, Any]], min_chars: int, compression: str) -> Dict[str, Any]:
+    """BSON bytes of both collections with dedup, built the way PromptBodyStore.compact writes them"""
+    prompts_bytes = 0
+    hits: Counter = Counter()
+    texts: Dict[str, str] = {}
+    started = time.perf_counter()
+    for document in documents:
+        text = document["prompt"]
+        if len(text) < min_chars:
+            prompts_bytes += len(bson.encode(document))
+            continue
+        digest = prompt_hash(text)
+        if digest not in texts:
+            texts[digest] = text
+        hits[digest] += 1
+        # compact() encodes the body for every batch that sends it; count that cost per prompt
+        encode_body(text, compression)
+        prompts_bytes += len(bson.encode(compact_document(document, digest)))
+    compact_us = (time.perf_counter() - started) / max(1, len(documents)) * 1e6
+
+    now = datetime.utcnow()
+    bodies_bytes = sum(
+        len(bson.encode({"_id": digest, **encode_body(text, compression), "firstSeen": now,
+                         "hits": hits[digest], "lastSeen": now}))
+        for digest, text in texts.items()
+    )
+    return {
+        "prompts": prompts_bytes,
+        "bodies": bodies_bytes,
+        "total": prompts_bytes + bodies_bytes,
+        "distinctBodies": len(texts),
+        "deduplicated": sum(hits.values()),
+        "compactUs": compact_us,
+    }
+
+
+def list_bandwidth(documents: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """JSON bytes of every list page, newest first: whole prompts and previews"""
+    full = preview = 0
+    newest_first = list(reversed(documents))
+    for i in range(0, len(newest_first), PAGE_SIZE):
+        page = [{**document, "_id": str(document["_id"])} for document in newest_first[i:i + PAGE_SIZE]]
+        full += len(json.dumps(page, default=str))
+        preview += len(json.dumps([preview_document(document) for document in page], default=str))
+    return full, preview
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1e6:.2f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traffic", type=Path, default=DEFAULT_TRAFFIC_FILE, help="JSONL with prompt or text per line")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests to replay")
+    parser.add_argument("--as-is", action="store_true", help="Replay the file once, in order")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf skew of prompt popularity")
+    parser.add_argument("--templates", type=int, default=20, help="Long synthetic attack templates to mix in")
+    parser.add_argument("--template-chars", type=int, default=2500)
+    parser.add_argument("--template-share", type=float, default=0.3, help="Share of requests sending a template")
+    parser.add_argument("--min-chars", default="512", help="Comma separated PROMPT_DEDUP_MIN_CHARS values to compare")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = load_traffic(args.traffic)
+    templates = make_templates(rows, args.templates, args.template_chars, rng) if args.templates else []
+    traffic = replay(rows, templates, args.requests, args.skew, args.template_share, args.as_is, rng)
+    documents = make_documents(traffic, rng)
+    distinct = len({text for text, _ in traffic})
+    average = sum(len(text) for text, _ in traffic) / max(1, len(traffic))
+    print(f"{len(traffic)} requests, {distinct} distinct prompts, {average:.0f} characters on average")
+
+    inline = sum(len(bson.encode(document)) for document in documents)
+    print(f"\n{'Storage (BSON)':<22}{'prompts':>12}{'prompt_bodies':>15}{'total':>12}{'saved':>9}")
+    print(f"{'inline':<22}{_mb(inline):>12}{_mb(0):>15}{_mb(inline):>12}")
+    for min_chars in (int(value) for value in args.min_chars.split(",")):
+        min_chars = max(PROMPT_PREVIEW_CHARS + 1, min_chars)
+        for compression in ("none", "zlib"):
+            result = storage(documents, min_chars, compression)
+            saved = 1 - result["total"] / inline if inline else 0.0
+            label = f"dedup min {min_chars} {compression}"
+            print(f"{label:<22}{_mb(result['prompts']):>12}{_mb(result['bodies']):>15}{_mb(result['total']):>12}{saved:>9.1%}   "
+                  f"({result['deduplicated']} prompts -> {result['distinctBodies']} bodies, "
+                  f"compact {result['compactUs']:.1f} us/prompt)")
+
+    full, preview = list_bandwidth(documents)
+    saved = 1 - preview / full if full else 0.0
+    print(f"\nList pages of {PAGE_SIZE} (JSON): whole prompts {_mb(full)}, previews of {PROMPT_PREVIEW_CHARS} "
+          f"characters {_mb(preview)}, saved {saved:.1%}")
+
+
+if __name__ == "__main__":
+    main()
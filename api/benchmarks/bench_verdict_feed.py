@@ -0,0 +1,233 @@
+"""
+Benchmark: /ws/verdicts fan-out to a swarm of local WebSocket clients.
+
+Serves only the verdict feed route with uvicorn in this process and connects
+--clients dashboards from --procs client processes. The server publishes
+--rate synthetic verdicts per second for --duration seconds straight into the
+feed, so the numbers cover the fan-out and the sockets, not the detector.
+A --slow fraction of the clients sleeps --slow-delay seconds per message to
+show that slow clients only lose their own messages (per their drop policy)
+and don't hold up the others.
+
+Reports:
+- time spent in publish() per verdict (the cost added to storing a prompt)
+- delivery latency for fast and slow clients (publish to client receive)
+- verdicts received, drop notices and disconnects per group
+
+Usage (from the api directory):
+    python -m benchmarks.bench_verdict_feed --clients 5000 --rate 50 --duration 20
+    python -m benchmarks.bench_verdict_feed --clients 2000 --slow 0.1 --drop disconnect
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import resource
+import statistics
+import time
+from datetime import datetime
+
+import uvicorn
+import websockets
+from bson.objectid import ObjectId
+from fastapi import FastAPI
+
+from app.routes.dashboard.verdictFeed import router as verdict_feed_router
+from app.services.verdict_feed import get_verdict_feed
+
+ATTACK_TYPES = ["prompt-injection", "jailbreak", "unauthorized-access", "data-exfiltration"]
+# Latency samples each client process sends back per group
+MAX_SAMPLES = 20000
+
+
+def _raise_fd_limit() -> None:
+    """Every client is a socket on both ends; lift the soft open-files limit to the hard one"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def _client(url: str, slow_delay: float, stop_at: float, result: dict) -> None:
+    try:
+        async with websockets.connect(url, open_timeout=60) as websocket:
+            result["connected"] += 1
+            while time.time() < stop_at:
+                try:
+                    raw = await asyncio.wait_for(websocket.recv(), timeout=max(0.1, stop_at - time.time()))
+                except asyncio.TimeoutError:
+                    break
+                message = json.loads(raw)
+                if message["type"] == "dropped":
+                    result["dropNotices"] += 1
+                    result["droppedReported"] += message["count"]
+                    continue
+                result["received"] += 1
+                latency = (datetime.utcnow() - datetime.fromisoformat(message["data"]["created_at"])).total_seconds()
+                if len(result["latencies"]) < MAX_SAMPLES:
+                    result["latencies"].append(latency * 1000)
+                elif random.random() < 0.01:
+                    result["latencies"][random.randrange(MAX_SAMPLES)] = latency * 1000
+                if slow_delay:
+                    await asyncio.sleep(slow_delay)
+    except websockets.ConnectionClosed as e:
+        code = str(e.rcvd.code) if e.rcvd else "none"
+        result["closed"] += 1
+        result["closeCodes"][code] = result["closeCodes"].get(code, 0) + 1
+    except Exception:
+        result["failed"] += 1
+
+
+def _client_process(url: str, count: int, slow_count: int, slow_delay: float, stop_at: float, queue) -> None:
+    """Run `count` clients (the first `slow_count` of them slow) and report per group"""
+    _raise_fd_limit()
+
+    async def run():
+        groups = {}
+        tasks = []
+        for i in range(count):
+            group = "slow" if i < slow_count else "fast"
+            result = groups.setdefault(group, {
+                "clients": 0, "connected": 0, "received": 0, "dropNotices": 0, "droppedReported": 0,
+                "closed": 0, "failed": 0, "closeCodes": {}, "latencies": []
+            })
+            result["clients"] += 1
+            tasks.append(asyncio.create_task(_client(url, slow_delay if group == "slow" else 0.0, stop_at, result)))
+            if i % 200 == 199:
+                # Don't flood the listen backlog
+                await asyncio.sleep(0.05)
+        await asyncio.gather(*tasks)
+        return groups
+
+    queue.put(asyncio.run(run()))
+
+
+async def _publish(rate: float, duration: float) -> list:
+    """Publish synthetic verdicts at `rate` per second; returns publish() times in ms"""
+    feed = get_verdict_feed()
+    timings = []
+    interval = 1.0 / rate
+    next_at = time.perf_counter()
+    end = next_at + duration
+    while time.perf_counter() < end:
+        is_attack = random.random() < 0.3
+        document = {
+            "_id": ObjectId(),
+            "prompt": "lorem ipsum dolor sit amet " * random.randint(1, 20),
+            "isAttack": is_attack,
+            "attackType": random.choice(ATTACK_TYPES) if is_attack else None,
+            "confidence": random.random(),
+            "matches": [],
+            "created_at": datetime.utcnow(),
+        }
+        started = time.perf_counter()
+        feed.publish(document)
+        timings.append((time.perf_counter() - started) * 1000)
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    return timings
+
+
+def _merge(groups: list) -> dict:
+    """Add up one client group's results from every client process"""
+    merged = {"closeCodes": {}, "latencies": []}
+    for group in groups:
+        for key, value in group.items():
+            if key == "closeCodes":
+                for code, count in value.items():
+                    merged["closeCodes"][code] = merged["closeCodes"].get(code, 0) + count
+            elif key == "latencies":
+                merged["latencies"].extend(value)
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _report(name: str, group: dict, published: int) -> None:
+    latencies = group["latencies"]
+    per_client = group["received"] / max(1, group["connected"])
+    print(f"{name:<5} clients {group['connected']:>6}/{group['clients']:<6} "
+          f"received/client {per_client:>8.1f} of {published}  "
+          f"latency p50 {_percentile(latencies, 0.5):>7.1f} ms  p99 {_percentile(latencies, 0.99):>7.1f} ms  "
+          f"drop notices {group['dropNotices']}  closed {group['closed']} {group['closeCodes'] or ''}  "
+          f"failed {group['failed']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--procs", type=int, default=4, help="Client processes")
+    parser.add_argument("--rate", type=float, default=50, help="Verdicts published per second")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of publishing")
+    parser.add_argument("--slow", type=float, default=0.05, help="Fraction of slow clients")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="Seconds a slow client spends per message")
+    parser.add_argument("--filter", default="", help="Query string for every client, e.g. attackType=jailbreak&minConfidence=0.5")
+    parser.add_argument("--drop", default="oldest", help="Drop policy: oldest, newest or disconnect")
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    _raise_fd_limit()
+
+    app = FastAPI()
+    app.include_router(verdict_feed_router)
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=args.port, log_level="warning", ws="websockets", backlog=4096
+    ))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    query = f"queueSize={args.queue_size}&drop={args.drop}" + (f"&{args.filter}" if args.filter else "")
+    url = f"ws://127.0.0.1:{args.port}/ws/verdicts?{query}"
+    connect_budget = 5 + args.clients / 500
+    stop_at = time.time() + connect_budget + args.duration + 5
+    slow_total = int(args.clients * args.slow)
+    # Spawn: forked children would inherit this process's running event loop
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    processes = []
+    for i in range(args.procs):
+        count = args.clients // args.procs + (1 if i < args.clients % args.procs else 0)
+        slow_count = slow_total // args.procs + (1 if i < slow_total % args.procs else 0)
+        process = context.Process(
+            target=_client_process, args=(url, count, slow_count, args.slow_delay, stop_at, queue)
+        )
+        process.start()
+        processes.append(process)
+
+    feed = get_verdict_feed()
+    deadline = time.perf_counter() + connect_budget
+    while feed.stats()["clients"] < args.clients and time.perf_counter() < deadline:
+        await asyncio.sleep(0.2)
+    print(f"{feed.stats()['clients']} clients connected, publishing {args.rate:g}/s for {args.duration:g} s")
+
+    timings = await _publish(args.rate, args.duration)
+    stats = feed.stats()
+
+    results = []
+    for _ in processes:
+        results.append(await asyncio.get_running_loop().run_in_executor(None, queue.get))
+    for process in processes:
+        process.join()
+    server.should_exit = True
+    await serving
+
+    print(f"publish() per verdict: p50 {_percentile(timings, 0.5):.3f} ms, p99 {_percentile(timings, 0.99):.3f} ms, "
+          f"mean {statistics.mean(timings):.3f} ms ({len(timings)} verdicts)")
+    for name in ("fast", "slow"):
+        groups = [result[name] for result in results if name in result]
+        if groups:
+            _report(name, _merge(groups), len(timings))
+    print(f"feed: queued {stats['queued']}, dropped {stats['dropped']}, slow disconnects {stats['slowDisconnects']}, "
+          f"rejected {stats['rejected']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
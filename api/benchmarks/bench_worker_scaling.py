@@ -0,0 +1,92 @@
+"""
+Benchmark: detector throughput vs. number of shared-memory inference workers.
+
+Loads the detector once, then for each worker count forks a SharedModelWorkerPool
+(DETECTOR_EXECUTOR=shared), keeps every worker busy with batches of prompts and
+reports throughput plus the memory the workers add on top of the parent.
+Memory is proportional set size (PSS), which splits shared pages between the
+processes that map them, so shared weights are only counted once in total.
+
+Usage (from the api directory, Linux):
+    python -m benchmarks.bench_worker_scaling --workers 1,2,4 --seconds 20
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+
+from app.services.PromptDetectorService import PromptDetectorService
+from app.services.inference_pool import InferencePool
+from benchmarks.bench_dynamic_padding import make_prompts
+
+
+def pss_mb(pid: int) -> float:
+    """Proportional set size of a process in MB (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+async def measure(detector: PromptDetectorService, workers: int, threads: int,
+                  prompts: List[str], batch_size: int, seconds: float) -> dict:
+    pool = InferencePool(mode="shared", workers=workers, torch_threads=threads)
+    pool.start(detector)
+    batches = [prompts[i:i + batch_size] for i in range(0, len(prompts), batch_size)]
+
+    # Warm up every worker once
+    await asyncio.gather(*(pool.analyze(detector, batches[0]) for _ in range(workers)))
+
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(offset: int):
+        nonlocal done
+        i = offset
+        while time.perf_counter() < deadline:
+            batch = batches[i % len(batches)]
+            await pool.analyze(detector, batch)
+            done += len(batch)
+            i += workers
+
+    started = time.perf_counter()
+    # Two clients per worker so a worker never waits on the IPC round trip
+    await asyncio.gather(*(client(i) for i in range(workers * 2)))
+    elapsed = time.perf_counter() - started
+
+    worker_pss = sum(pss_mb(p.pid) for p in pool._shared_pool._processes)
+    await asyncio.to_thread(pool.shutdown)
+    return {"prompts_per_s": done / elapsed, "workers_pss_mb": worker_pss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated worker counts")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="torch threads per worker (default: CPU count / workers)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--prompts", type=int, default=256)
+    args = parser.parse_args()
+
+    prompts = make_prompts(args.prompts, seed=11)
+    detector = PromptDetectorService()
+    print(f"parent PSS after model load: {pss_mb(os.getpid()):.0f} MB, CPUs: {os.cpu_count()}")
+    print(f"{'workers':>8}{'threads':>9}{'prompts/s':>12}{'speedup':>9}{'workers PSS MB':>16}")
+
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+        r = asyncio.run(measure(detector, workers, threads, prompts, args.batch_size, args.seconds))
+        baseline = baseline or r["prompts_per_s"]
+        print(f"{workers:>8}{threads:>9}{r['prompts_per_s']:>12.1f}"
+              f"{r['prompts_per_s'] / baseline:>9.2f}{r['workers_pss_mb']:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
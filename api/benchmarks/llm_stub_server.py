@@ -0,0 +1,123 @@
+"""
+Minimal local stand-in for the OpenAI completions API, for LLM client benchmarks.
+
+Answers every POST with a completions-shaped JSON body after --delay-ms, keeps
+connections alive, and reports how many TCP connections it has accepted at
+GET /stats. Only plain HTTP/1.1 is spoken.
+
+Requests with "stream": true get the completion as server-sent events over a
+chunked response instead: the first token after --delay-ms, then one token
+every --token-delay-ms, then "data: [DONE]".
+
+Usage (from the api directory):
+    python -m benchmarks.llm_stub_server --port 8089 --delay-ms 200 --token-delay-ms 20
+    LLM_API_URL=http://127.0.0.1:8089/v1/completions OPENAI_API_KEY=stub uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+
+stats = {"connections": 0, "open_connections": 0, "requests": 0}
+
+STUB_TOKENS = "This is a stub completion streamed one token at a time from the local server.".split()
+
+
+def completion(text: str) -> bytes:
+    return json.dumps({
+        "id": "cmpl-stub",
+        "object": "text_completion",
+        "model": "stub",
+        "choices": [{"index": 0, "text": text, "finish_reason": "stop"}],
+    }).encode("utf-8")
+
+
+def chunk(data: bytes) -> bytes:
+    """One HTTP/1.1 chunked-transfer chunk"""
+    return f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n"
+
+
+async def stream_completion(writer: asyncio.StreamWriter, delay: float, token_delay: float) -> None:
+    writer.write(
+        b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+        b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n"
+    )
+    await writer.drain()
+    await asyncio.sleep(delay)
+    for i, token in enumerate(STUB_TOKENS):
+        if i:
+            await asyncio.sleep(token_delay)
+        event = {
+            "id": "cmpl-stub",
+            "object": "text_completion",
+            "model": "stub",
+            "choices": [{"index": 0, "text": " " + token, "finish_reason": None}],
+        }
+        writer.write(chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8")))
+        await writer.drain()
+    writer.write(chunk(b"data: [DONE]\n\n") + chunk(b""))
+    await writer.drain()
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 delay: float, token_delay: float) -> None:
+    stats["connections"] += 1
+    stats["open_connections"] += 1
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, path, _ = request_line.split(" ", 2)
+            headers = {
+                name.strip().lower(): value.strip()
+                for name, _, value in (line.partition(":") for line in header_lines if line)
+            }
+            length = int(headers.get("content-length", "0"))
+            request_body = await reader.readexactly(length) if length else b""
+
+            if method == "GET" and path == "/stats":
+                body = json.dumps(stats).encode("utf-8")
+            elif request_body and json.loads(request_body).get("stream"):
+                stats["requests"] += 1
+                await stream_completion(writer, delay, token_delay)
+                continue
+            else:
+                stats["requests"] += 1
+                await asyncio.sleep(delay)
+                body = completion(" This is a stub completion.")
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        stats["open_connections"] -= 1
+        writer.close()
+
+
+async def serve(host: str, port: int, delay_ms: float, token_delay_ms: float) -> None:
+    server = await asyncio.start_server(
+        lambda r, w: handle(r, w, delay_ms / 1000, token_delay_ms / 1000), host, port, backlog=1024
+    )
+    print(f"LLM stub listening on http://{host}:{port} (delay {delay_ms:.0f} ms)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay-ms", type=float, default=200, help="Latency before the response (or first token)")
+    parser.add_argument("--token-delay-ms", type=float, default=20, help="Gap between streamed tokens")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.delay_ms, args.token_delay_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,27 @@
 import React, { useEffect } from 'react';
 import { usePromptsApi } from '../../hooks/usePromptsApi';
+import { useVerdictFeed } from '../../hooks/useVerdictFeed';
 import '../../dashboard.css';
 
 const AttackRows: React.FC = () => {
   const { getAttacks, attacksState } = usePromptsApi();
-  const { data: attacks, loading, error } = attacksState;
+  const { data: fetched, loading, error } = attacksState;
 
-  // Fetch all attacks on component mount
+  // New attacks are pushed as they are stored; refetch if the feed missed some
+  const { verdicts } = useVerdictFeed({
+    attacksOnly: true,
+    onDropped: () => getAttacks({ limit: 50 })
+  });
+
+  // Fetch the most recent attacks on component mount
   useEffect(() => {
-    getAttacks();
+    getAttacks({ limit: 50 });
   }, []);
 
+  const attacks = fetched
+    ? [...verdicts, ...fetched.filter(attack => !verdicts.some(live => live._id === attack._id))].slice(0, 50)
+    : null;
+
   return (
     <section className="attack-rows">
       <h2>Recent Attack Details</h2>
@@ -37,7 +48,7 @@ const AttackRows: React.FC = () => {
                 .map((attack) => (
                 <tr key={attack._id}>
                   <td className="attack-type">{attack.attackType || 'Unknown'}</td>
-                  <td className="attack-prompt">{attack.prompt}</td>
+                  <td className="attack-prompt">{attack.prompt}{attack.promptTruncated ? '…' : ''}</td>
                   <td className="attack-confidence">{attack.confidence ? `${(attack.confidence * 100).toFixed(1)}%` : 'N/A'}</td>
                   <td className="attack-date">{new Date(attack.created_at).toLocaleDateString()}</td>
                 </tr>
@@ -3,23 +3,15 @@ import { usePromptsApi } from '../../hooks/usePromptsApi';
 import '../../dashboard.css';
 
 const AttacksPanel: React.FC = () => {
-  const { getAttacks, attacksState } = usePromptsApi();
-  const { data: attacks, loading, error } = attacksState;
+  const { getStats, statsState } = usePromptsApi();
+  const { data: stats, loading, error } = statsState;
 
-  // Fetch all attacks on component mount
+  // Attack counts per type are grouped by the API on component mount
   useEffect(() => {
-    getAttacks();
+    getStats();
   }, []);
 
-  // Calculate attack type distribution
-  const attackTypes: Record<string, number> = {};
-  
-  if (attacks) {
-    attacks.forEach(attack => {
-      const type = attack.attackType || 'unknown';
-      attackTypes[type] = (attackTypes[type] || 0) + 1;
-    });
-  }
+  const attackTypes: Record<string, number> = stats?.byType || {};
 
   return (
     <section className="attacks-panel">
@@ -29,9 +21,9 @@ const AttacksPanel: React.FC = () => {
         <div className="loading-indicator">Loading attack data...</div>
       ) : error ? (
         <div className="error-message">{error}</div>
-      ) : attacks && attacks.length > 0 ? (
+      ) : stats && stats.attacks > 0 ? (
         <div className="simple-stats">
-          <p>Number of Attacks: {attacks.length}</p>
+          <p>Number of Attacks: {stats.attacks}</p>
           
           <h3>Attacks by Type:</h3>
           <ul className="simple-attack-list">
@@ -3,25 +3,18 @@ import { usePromptsApi } from '../../hooks/usePromptsApi';
 import '../../dashboard.css';
 
 const PromptsOverview: React.FC = () => {
-  const { getAllPrompts, allPromptsState } = usePromptsApi();
-  const { data: prompts, loading, error } = allPromptsState;
+  const { getStats, statsState } = usePromptsApi();
+  const { data: stats, loading, error } = statsState;
 
+  // Totals are counted by the API, no prompts are downloaded
   useEffect(() => {
-    getAllPrompts();
+    getStats();
   }, []);
 
-  // Log prompts data for debugging
-  useEffect(() => {
-    if (prompts) {
-      console.log('Prompts data:', prompts);
-      console.log('First prompt example:', prompts[0]);
-    }
-  }, [prompts]);
-
   // Calculate statistics
-  const totalPrompts = prompts?.length || 0;
-  const attackPrompts = prompts?.filter(p => p.isAttack)?.length || 0;
-  const attackPercentage = totalPrompts > 0 ? (attackPrompts / totalPrompts) * 100 : 0;
+  const totalPrompts = stats?.total || 0;
+  const attackPrompts = stats?.attacks || 0;
+  const attackPercentage = (stats?.attackRate || 0) * 100;
 
   return (
     <section className="prompts-overview">
@@ -31,7 +24,7 @@ const PromptsOverview: React.FC = () => {
         <div className="loading-indicator">Loading prompts data...</div>
       ) : error ? (
         <div className="error-message">{error}</div>
-      ) : prompts ? (
+      ) : stats ? (
         <div className="simple-stats">
           <p>Total Prompts: {totalPrompts}</p>
           <p>Total Attacks: {attackPrompts}</p>
@@ -1,5 +1,34 @@
 import { useState } from 'react';
-import { Message, ApiResponse } from '../types/chat';
+import { Message, ApiResponse, StreamEvent } from '../types/chat';
+
+// Parse a server-sent events body and call onEvent for each complete event
+async function readEventStream(
+  body: ReadableStream<Uint8Array>,
+  onEvent: (event: StreamEvent) => void
+) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    const events = buffer.split('\n\n');
+    buffer = events.pop() || '';
+    for (const raw of events) {
+      let type = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event:')) type = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (data) onEvent({ type, ...JSON.parse(data) } as StreamEvent);
+    }
+  }
+}
 
 export function useChat() {
   // State for chat messages and input text
@@ -33,7 +62,8 @@ export function useChat() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Accept': 'application/json'
+          // Clean prompts are answered with a token stream, attacks with JSON
+          'Accept': 'text/event-stream, application/json'
         },
         body: JSON.stringify({
           text: userInput
@@ -50,6 +80,32 @@ export function useChat() {
         throw new Error(`API returned ${response.status}: ${errorText || response.statusText}`);
       }
 
+      // Streamed LLM response: show tokens as they arrive
+      const contentType = response.headers.get('content-type') || '';
+      if (contentType.includes('text/event-stream') && response.body) {
+        let botIndex = -1;
+        setMessages(prev => {
+          botIndex = prev.length;
+          return [...prev, { role: 'assistant', content: '' }];
+        });
+        const updateBotMessage = (update: (content: string) => string) => {
+          setMessages(prev => prev.map((message, index) =>
+            index === botIndex ? { ...message, content: update(message.content) } : message
+          ));
+        };
+
+        await readEventStream(response.body, event => {
+          if (event.type === 'token') {
+            updateBotMessage(content => content + event.text);
+          } else if (event.type === 'done') {
+            updateBotMessage(() => event.generated_text);
+          } else if (event.type === 'error') {
+            updateBotMessage(content => `${content}${content ? '\n\n' : ''}Error: ${event.error}`);
+          }
+        });
+        return;
+      }
+
       const data: ApiResponse = await response.json();
       console.log('Received data:', data);
 
@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { Prompt, ApiState, AttackType } from '../types/prompts';
+import { Prompt, ApiState, AttackType, PageOptions, PromptStats } from '../types/prompts';
 
 // Use environment variable for API URL, fallback to localhost for local dev
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5000';
@@ -29,6 +29,12 @@ export const usePromptsApi = () => {
     error: null
   });
 
+  const [statsState, setStatsState] = useState<ApiState<PromptStats>>({
+    data: null,
+    loading: false,
+    error: null
+  });
+
   /**
    * Generic function to make API requests with proper error handling
    */
@@ -50,15 +56,46 @@ export const usePromptsApi = () => {
     return await response.json();
   };
 
+  /**
+   * Fetch a paginated prompt list. The API returns one page at a time, newest
+   * first, with the next page's cursor in the X-Next-Cursor header.
+   */
+  const fetchPages = async (endpoint: string, options: PageOptions = {}): Promise<Prompt[]> => {
+    const params = new URLSearchParams();
+    if (options.limit) params.set('limit', String(options.limit));
+    if (options.fields) params.set('fields', options.fields.join(','));
+    if (options.fullPrompts) params.set('fullPrompts', 'true');
+    if (options.since) params.set('since', options.since);
+    if (options.until) params.set('until', options.until);
+
+    const prompts: Prompt[] = [];
+    let cursor: string | null = null;
+    do {
+      if (cursor) params.set('after', cursor);
+      const response = await fetch(`${API_BASE_URL}${endpoint}?${params.toString()}`, {
+        headers: { 'Accept': 'application/json' }
+      });
+      if (!response.ok) {
+        const errorText = await response.text();
+        console.error(`API Error (${response.status}):`, errorText);
+        throw new Error(`API returned ${response.status}: ${errorText || response.statusText}`);
+      }
+      prompts.push(...await response.json());
+      cursor = options.allPages ? response.headers.get('X-Next-Cursor') : null;
+    } while (cursor);
+
+    return prompts;
+  };
+
   /**
    * Fetch all prompts from the API
    */
-  const getAllPrompts = async (): Promise<Prompt[]> => {
+  const getAllPrompts = async (options: PageOptions = {}): Promise<Prompt[]> => {
     try {
       setAllPromptsState({ ...allPromptsState, loading: true, error: null });
       console.log('Fetching all prompts...');
       
-      const data = await fetchFromApi<Prompt[]>('/prompts');
+      const data = await fetchPages('/prompts', options);
       console.log('Received prompts:', data);
       
       setAllPromptsState({ data, loading: false, error: null });
@@ -75,12 +112,12 @@ export const usePromptsApi = () => {
   /**
    * Fetch only attack prompts from the API
    */
-  const getAttacks = async (): Promise<Prompt[]> => {
+  const getAttacks = async (options: PageOptions = {}): Promise<Prompt[]> => {
     try {
       setAttacksState({ ...attacksState, loading: true, error: null });
       console.log('Fetching attack prompts...');
       
-      const data = await fetchFromApi<Prompt[]>('/prompts/attacks');
+      const data = await fetchPages('/prompts/attacks', options);
       console.log('Received attack prompts:', data);
       
       setAttacksState({ data, loading: false, error: null });
@@ -97,12 +134,12 @@ export const usePromptsApi = () => {
   /**
    * Fetch only clean (non-attack) prompts from the API
    */
-  const getCleanPrompts = async (): Promise<Prompt[]> => {
+  const getCleanPrompts = async (options: PageOptions = {}): Promise<Prompt[]> => {
     try {
       setCleanPromptsState({ ...cleanPromptsState, loading: true, error: null });
       console.log('Fetching clean prompts...');
       
-      const data = await fetchFromApi<Prompt[]>('/prompts/clean');
+      const data = await fetchPages('/prompts/clean', options);
       console.log('Received clean prompts:', data);
       
       setCleanPromptsState({ data, loading: false, error: null });
@@ -138,18 +175,45 @@ export const usePromptsApi = () => {
     }
   };
 
+  /**
+   * Fetch dashboard statistics (totals, counts per attack type, confidence
+   * histograms, time series) computed by the API instead of downloading prompts
+   */
+  const getStats = async (since?: string, until?: string, bucket = 'day'): Promise<PromptStats | null> => {
+    try {
+      setStatsState({ ...statsState, loading: true, error: null });
+      const params = new URLSearchParams({ bucket });
+      if (since) params.set('since', since);
+      if (until) params.set('until', until);
+
+      const data = await fetchFromApi<PromptStats>(`/prompts/stats?${params.toString()}`);
+      console.log('Received prompt stats:', data);
+
+      setStatsState({ data, loading: false, error: null });
+      return data;
+    } catch (error) {
+      const errorMessage = error instanceof Error ? error.message : 'Unknown error fetching prompt stats';
+      console.error('Error fetching prompt stats:', errorMessage);
+
+      setStatsState({ data: null, loading: false, error: errorMessage });
+      return null;
+    }
+  };
+
   return {
     // Functions
     getAllPrompts,
     getAttacks,
     getCleanPrompts,
     getAttacksByType,
+    getStats,
     
     // States
     allPromptsState,
     attacksState,
     cleanPromptsState,
     attacksByTypeState,
+    statsState,
   };
 };
 
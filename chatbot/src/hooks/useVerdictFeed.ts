@@ -0,0 +1,75 @@
+import { useState, useEffect, useRef } from 'react';
+import { Prompt, VerdictMessage, VerdictFeedOptions } from '../types/prompts';
+
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5000';
+
+/**
+ * Live verdicts from /ws/verdicts, newest first.
+ * Reconnects with backoff; after a reconnect or a "dropped" notice the
+ * onDropped callback runs so the caller can refetch what it missed.
+ */
+export const useVerdictFeed = (options: VerdictFeedOptions = {}) => {
+  const [verdicts, setVerdicts] = useState<Prompt[]>([]);
+  const [connected, setConnected] = useState(false);
+  const onDropped = useRef(options.onDropped);
+  onDropped.current = options.onDropped;
+
+  const keep = options.keep ?? 50;
+  const params = new URLSearchParams();
+  if (options.attackTypes?.length) params.set('attackType', options.attackTypes.join(','));
+  if (options.attacksOnly) params.set('attacksOnly', 'true');
+  if (options.minConfidence) params.set('minConfidence', String(options.minConfidence));
+  const url = `${API_BASE_URL.replace(/^http/, 'ws')}/ws/verdicts?${params.toString()}`;
+
+  useEffect(() => {
+    let socket: WebSocket | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let retryDelay = 1000;
+    let closed = false;
+    let reconnecting = false;
+
+    const connect = () => {
+      socket = new WebSocket(url);
+      socket.onopen = () => {
+        setConnected(true);
+        retryDelay = 1000;
+        // Verdicts stored while we were away never reach us
+        if (reconnecting) onDropped.current?.();
+      };
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'dropped') {
+          onDropped.current?.();
+          return;
+        }
+        const verdict = message.data as VerdictMessage;
+        const prompt: Prompt = {
+          _id: verdict.id,
+          prompt: verdict.prompt,
+          isAttack: verdict.isAttack,
+          attackType: verdict.attackType ?? undefined,
+          confidence: verdict.confidence,
+          matches: verdict.matches,
+          created_at: verdict.created_at
+        };
+        setVerdicts(prev => [prompt, ...prev].slice(0, keep));
+      };
+      socket.onclose = () => {
+        setConnected(false);
+        if (closed) return;
+        reconnecting = true;
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket?.close();
+    };
+  }, [url, keep]);
+
+  return { verdicts, connected };
+};
@@ -29,3 +29,8 @@ export interface ApiResponse {
   [key: string]: any;
 }
 
+// Define server-sent events of a streamed LLM response
+export type StreamEvent =
+  | { type: 'token'; text: string }
+  | { type: 'done'; generated_text: string; ttftMs?: number; totalMs?: number }
+  | { type: 'error'; error: string };
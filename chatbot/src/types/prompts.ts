@@ -2,7 +2,9 @@
 
 export interface Prompt {
   _id: string;
-  prompt: string;
+  prompt: string;            // a preview unless fetched with fullPrompts
+  promptLength?: number;     // characters in the whole prompt
+  promptTruncated?: boolean; // prompt holds only the first PROMPT_PREVIEW_CHARS
   isAttack: boolean;
   attackType?: string;
   confidence?: number;
@@ -10,6 +12,29 @@ export interface Prompt {
   created_at: string;
 }
 
+export interface PageOptions {
+  limit?: number;          // prompts per page (API default 100, max 1000)
+  fields?: string[];       // only return these fields, e.g. ['isAttack']
+  since?: string;          // ISO date, inclusive
+  until?: string;          // ISO date, exclusive
+  allPages?: boolean;      // follow X-Next-Cursor until the last page
+  fullPrompts?: boolean;   // whole prompt texts instead of previews
+}
+
+// Response of /prompts/stats, computed by the database
+export interface PromptStats {
+  window: { since: string | null; until: string | null; bucket: string };
+  total: number;
+  attacks: number;
+  clean: number;
+  attackRate: number;
+  firstPromptAt: string | null;
+  lastPromptAt: string | null;
+  byType: Record<string, number>;
+  confidence: { bins: number[]; attacks: number[]; clean: number[] };
+  series: { start: string; total: number; attacks: number }[];
+}
+
 export interface ApiState<T> {
   data: T | null;
   loading: boolean;
@@ -18,3 +43,22 @@ export interface ApiState<T> {
 
 export type AttackType = 'prompt_injection' | 'jailbreak' | 'unauthorized_access' | 'data_exfiltration' | 'other';
 
+
+// Message pushed by /ws/verdicts for each newly stored prompt
+export interface VerdictMessage {
+  id: string;
+  prompt: string;          // truncated to VERDICT_FEED_PROMPT_CHARS
+  isAttack: boolean;
+  attackType: string | null;
+  confidence: number;
+  matches: string[];
+  created_at: string;
+}
+
+export interface VerdictFeedOptions {
+  attackTypes?: string[];  // only these attack types
+  attacksOnly?: boolean;   // leave out clean prompts
+  minConfidence?: number;  // 0 to 1
+  keep?: number;           // verdicts kept in memory, newest first (default 50)
+  onDropped?: () => void;  // the server dropped messages for us, refetch the lists
+}